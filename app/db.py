@@ -1,10 +1,16 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 from fastapi import FastAPI, Depends, HTTPException
 from pydantic import BaseModel
 
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
 
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -13,6 +19,14 @@ DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
 DB_PORT = int(os.getenv("DB_PORT", "5432"))
 DB_NAME = os.getenv("DB_NAME", "testdb")
 
+# pool par process : connexions Postgres max = workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # attente max d'une connexion libre (s)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # âge max d'une connexion (s), -1 = jamais
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 = pas de limite
+
 url = URL.create(
     drivername="postgresql+psycopg2",
     username=DB_USER,
@@ -24,15 +38,103 @@ url = URL.create(
     query={"client_encoding": "utf8"},
 )
 
+
+class _CheckoutStats:
+    """
+    Mesure de l'attente au checkout d'un QueuePool :
+    - nombre de checkouts, attente moyenne / max, checkouts ayant attendu
+    - timeouts (pool saturé pendant DB_POOL_TIMEOUT)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = self.waited = self.timeouts = 0
+        self._wait_total = self._wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        wait = time.perf_counter() - started
+        with self._stats_lock:
+            self.checkouts += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            if wait > 0.005:
+                self.waited += 1
+        return conn
+
+    def stats(self) -> dict:
+        capacity = self.size() + self._max_overflow
+        with self._stats_lock:
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "saturation": round(self.checkedout() / capacity, 4) if capacity > 0 else None,
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self._wait_total / self.checkouts * 1000, 3) if self.checkouts else None,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(_CheckoutStats, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutStats, AsyncAdaptedQueuePool):
+    pass
+
+
+connect_args = {"connect_timeout": DB_CONNECT_TIMEOUT}
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
 engine = create_engine(
     url,
     echo=False,
     pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args=connect_args,
     future=True,
 )
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# --- accès asynchrone (asyncpg) : mêmes réglages de pool, pool distinct ---
+async_url = url.set(drivername="postgresql+asyncpg", query={})
+
+async_connect_args = {"timeout": DB_CONNECT_TIMEOUT}
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+async_engine = create_async_engine(
+    async_url,
+    echo=False,
+    pool_pre_ping=True,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args=async_connect_args,
+)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -40,6 +142,31 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@contextmanager
+def session_scope(db: Session | None = None):
+    """Réutilise la session fournie (celle de la requête) ou en ouvre une, fermée en sortie"""
+    if db is not None:
+        yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def pool_stats() -> dict:
+    return {
+        "sync": engine.pool.stats(),
+        "async": async_engine.sync_engine.pool.stats(),
+        "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
 # --- Auth simplifiée (ex: vous décoderez un JWT en vrai) ---
 # class CurrentUser(BaseModel):
 #     id: int
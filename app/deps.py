@@ -1,19 +1,39 @@
 # app/deps.py
+import hashlib
+import os
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
 from app.security import decode_token
+from app.src.services.cache import get_cache
+
+# comptes autorisés sur les routes /admin/* (ids séparés par des virgules ; vide = personne)
+ADMIN_USER_IDS = {int(i) for i in os.getenv("ADMIN_USER_IDS", "").split(",") if i.strip()}
+
+# durée maximale de confiance d'un token vérifié (plafonnée par son exp)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
 
 bearer = HTTPBearer(auto_error=False)
 
-class CurrentUser(BaseModel):
-    id: int
-    email: str | None = None  # on peut enrichir ensuite
+# sha256(token) -> CurrentUser ; un token expiré sort du cache à son exp
+_verified_tokens = get_cache("tokens", ttl=TOKEN_CACHE_TTL, max_bytes=8 * 2**20)
 
-def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> CurrentUser:
-    if creds is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing credentials")
-    token = creds.credentials
+
+class CurrentUser:
+    """Utilisateur authentifié : objet léger à slots, partagé entre les requêtes d'un même token"""
+    __slots__ = ("id", "email")
+
+    def __init__(self, id: int, email: str | None = None):  # on peut enrichir ensuite
+        self.id = id
+        self.email = email
+
+    def __repr__(self) -> str:
+        return f"CurrentUser(id={self.id!r}, email={self.email!r})"
+
+
+def _verify(token: str) -> tuple[CurrentUser, float]:
+    """Vérification complète (signature HMAC + exp) ; retourne l'utilisateur et la durée de validité restante"""
     try:
         payload = decode_token(token)
     except Exception:
@@ -21,4 +41,29 @@ def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> C
     sub = payload.get("sub")
     if not sub:
         raise HTTPException(status_code=401, detail="Invalid token payload")
-    return CurrentUser(id=int(sub))
+    remaining = payload["exp"] - time.time() if "exp" in payload else TOKEN_CACHE_TTL
+    return CurrentUser(id=int(sub)), remaining
+
+
+async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> CurrentUser:
+    """
+    - Token déjà vérifié (cache "tokens", clé sha256) : pas de nouvelle vérification de signature
+    - Sinon jwt.decode puis mise en cache jusqu'à min(exp, TOKEN_CACHE_TTL)
+    - Coroutine : pas de passage par le threadpool pour chaque requête authentifiée
+    """
+    if creds is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing credentials")
+    key = hashlib.sha256(creds.credentials.encode()).digest()
+    user = _verified_tokens.get(key)
+    if user is not None:
+        return user
+    user, remaining = _verify(creds.credentials)
+    if remaining > 0:
+        _verified_tokens.set(key, user, ttl=min(remaining, TOKEN_CACHE_TTL))
+    return user
+
+
+async def get_admin_user(me: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    if me.id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return me
@@ -1,24 +1,43 @@
 # app/main.py uvicorn app.main:app --reload
-import numpy as np
-from fastapi import FastAPI, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
+import asyncio
+import os
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Header, Query, Response, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy import text
 from datetime import datetime
 from sqlalchemy.orm import Session
-from app.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db, get_async_db, async_engine, AsyncSessionLocal, pool_stats
 from app.src.services.schemas import RegisterIn, LoginIn, TokenOut, UserOut, WalletRowOut, WalletCreateIn, Indice, \
-    TickerResponse, ErrorResponse, Balance, Favorite, PortfolioFlow, BalanceIn
-from app.security import hash_password, verify_password, create_token_pair, decode_token
-from app.deps import get_current_user, CurrentUser
+    TickerResponse, ErrorResponse, Balance, Favorite, PortfolioFlow, BalanceIn, IndicatorsBatchIn, \
+    PortfolioPosition, PortfolioSummary, PortfolioRisk
+from app.security import hash_password, verify_password, needs_rehash, create_token_pair, decode_token
+from app.deps import get_current_user, get_admin_user, CurrentUser
 from app.src.services.schemas import RefreshIn
-from app.src.services.compute import ticker_indicators, convert_numpy_types, get_indexes_list, indexes_metrics, \
-    update_indexes_metrics
+from app.src.services.indicators import clean_indicators, compute_indicators, compute_metrics, indicator_flight, \
+    stream_indicators, version_flight
+from app.src.services.metric_graph import METRICS
+from app.src.services.executors import ExecutorSaturated, executor_stats, run_io, run_hash, shutdown_hashing
+from app.src.services.compute_pool import COMPUTE_POOL
+from app.src.services.indexes import refresher
+from app.src.services.live_quotes import hub, Subscriber, LIVE_MAX_TICKERS, LIVE_SEND_TIMEOUT
+from app.src.services.cache import cache_stats, invalidate, invalidate_matching
+from app.src.services.ticker_metrics import favorite_rows, refresh_ticker_metrics
+from app.src.services.portfolio import apply_wallet_row, current_price, describe_rows, portfolio_valuation, \
+    portfolio_risk_report
+from app.src.services.responses import FastJSONResponse, ndjson_line
+from app.src.services.pagination import WALLET_PAGE_SIZE, WALLET_PAGE_MAX, decode_cursor, encode_cursor, \
+    page_etag, etag_matches
 # connexion frontend
 from fastapi.middleware.cors import CORSMiddleware
 
+# attente maximale d'un lot de cotations sur /home/stream
+HOME_STREAM_TIMEOUT = float(os.getenv("HOME_STREAM_TIMEOUT", "30"))
+
 app = FastAPI(title="Stock Analysis API",
             description="My first API for stock analysis",
-            version="1.0.0")
+            version="1.0.0",
+            default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,8 +45,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Link"],  # pagination de /api/me/wallet
 )
 
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": f"Serveur saturé, réessayez: {exc}"},
+                        headers={"Retry-After": "1"})
+
+
+@app.on_event("startup")
+def start_index_refresher():
+    refresher.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    refresher.stop()
+    COMPUTE_POOL.shutdown()
+    shutdown_hashing()
+    await hub.shutdown()
+    await async_engine.dispose()
+
+
+def _followed_rows(db: Session) -> list:
+    """Lecture seule de la table indexes ; relance un rafraîchissement en fond si elle est périmée"""
+    if refresher.is_stale():
+        refresher.trigger()
+    rows = db.execute(text("SELECT ticker, full_name, price, performance FROM indexes")).mappings().all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Indexes not found")
+    as_of = refresher.as_of.isoformat() if refresher.as_of else None
+    return [{**r, "as_of": as_of} for r in rows]
+
+
 # ----point entry----
 @app.get("/")
 def root():
@@ -43,48 +94,57 @@ def root():
 
 # ---------- Auth ----------
 @app.post("/auth/register", response_model=UserOut, status_code=201)
-def register(body: RegisterIn, db: Session = Depends(get_db)):
+async def register(body: RegisterIn, db: AsyncSession = Depends(get_async_db)):
     # email unique ?
-    exists = db.execute(text("SELECT id FROM users WHERE email = :e"), {"e": body.email}).first()
+    exists = (await db.execute(text("SELECT id FROM users WHERE email = :e"), {"e": body.email})).first()
     if exists:
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
-    # insertion avec hash direct
+    # insertion avec hash direct (bcrypt : pool "hash" dédié, hors de la boucle d'événements)
     first_name = body.first_name.strip()
     last_name = body.last_name.strip()
-    db.execute(
+    password_hash = await run_hash(hash_password, body.password)
+    await db.execute(
         text(
             "INSERT INTO users (email, password_hash, name, surname) "
             "VALUES (:e, :p, :fn, :ln)"
         ),
-        {"e": body.email, "p": hash_password(body.password), "fn": first_name, "ln": last_name},
+        {"e": body.email, "p": password_hash, "fn": first_name, "ln": last_name},
     )
-    user_row = db.execute(
+    user_row = (await db.execute(
         text("SELECT id, email, name, surname FROM users WHERE email = :e"),
         {"e": body.email},
-    ).mappings().one()
-    db.commit()
+    )).mappings().one()
+    await db.commit()
     return UserOut(**user_row)
 
 
+async def _rehash_password(user_id: int, password: str):
+    """Migration vers bcrypt_sha256 / BCRYPT_ROUNDS, après l'envoi de la réponse de login"""
+    try:
+        new_hash = await run_hash(hash_password, password)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                text("UPDATE users SET password_hash = :p WHERE id = :i"),
+                {"p": new_hash, "i": user_id},
+            )
+            await db.commit()
+    except Exception as e:
+        # type seul : le message d'une erreur SQLAlchemy contient les paramètres (le nouveau hash)
+        print(f"❌ Erreur rehash user {user_id}: {type(e).__name__}")
+
+
 @app.post("/auth/login", response_model=TokenOut)
-def login(body: LoginIn, db: Session = Depends(get_db)):
-    row = db.execute(
+async def login(body: LoginIn, background: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(
         text("SELECT id, password_hash FROM users WHERE email = :e"),
         {"e": body.email},
-    ).first()
-    if not row or not verify_password(body.password, row.password_hash):
+    )).first()
+    if not row or not await run_hash(verify_password, body.password, row.password_hash):
         raise HTTPException(status_code=401, detail="Email ou mot de passe invalide")
-    # 🔁 migration transparente vers bcrypt_sha256 si besoin
-    from app.security import needs_rehash, hash_password
+    # 🔁 migration transparente vers bcrypt_sha256 si besoin : hors du chemin de la réponse
     if needs_rehash(row.password_hash):
-        new_hash = hash_password(body.password)
-        db.execute(
-            text("UPDATE users SET password_hash = :p WHERE id = :i"),
-            {"p": new_hash, "i": row.id},
-        )
-        db.commit()
+        background.add_task(_rehash_password, row.id, body.password)
     access, refresh = create_token_pair(row.id)
-    print('access', access)
     return TokenOut(access_token=access, refresh_token=refresh)
 
 
@@ -105,30 +165,68 @@ def refresh(body: RefreshIn):
 # ---------- Endpoints /home... ----------
 @app.get("/home", response_model=list[Indice])
 def get_followed(db: Session = Depends(get_db)):
-    a = get_indexes_list()
-    b = indexes_metrics(a)
-    update_indexes_metrics(b)
-    rows = db.execute(text("SELECT ticker, full_name, price, performance FROM indexes")).mappings().all()
-    if not rows:
-        raise HTTPException(status_code=404, detail="Indexes not found")
-    return [dict(r) for r in rows]
+    return _followed_rows(db)
 
 
-@app.post("/home/{ticker}", response_model=Indice, status_code=201)
-def add_followed(ticker: str, db: Session = Depends(get_db)):
+@app.get("/home/stream")
+async def stream_followed(db: Session = Depends(get_db)):
+    """
+    NDJSON : les lignes en base tout de suite ({"event": "cached", ...Indice}),
+    puis chaque lot de cotations rafraîchi ({"event": "update", ...Indice}), {"event": "error", "detail"}
+    si le rafraîchissement n'a rien écrit, puis {"event": "done", "as_of"}
+    """
+    updates = refresher.subscribe()
     try:
+        # on n'attend des mises à jour que si un rafraîchissement est en cours ou va l'être
+        waiting = refresher.active and (refresher.running or refresher.is_stale())
+        rows = await run_io(_followed_rows, db)
+    except BaseException:
+        refresher.unsubscribe(updates)
+        raise
+    names = {r["ticker"]: r["full_name"] for r in rows}
+
+    def line(event: dict) -> bytes:
+        return ndjson_line(event)
+
+    async def lines():
+        try:
+            for row in rows:
+                yield line({"event": "cached", **row})
+            as_of = rows[0]["as_of"] if rows else None
+            while waiting:
+                try:
+                    event = await asyncio.wait_for(updates.get(), timeout=HOME_STREAM_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if event["event"] == "done":
+                    as_of = event["as_of"]
+                    break
+                if event["event"] == "error":
+                    yield line(event)
+                    break
+                now = datetime.now().isoformat()
+                for row in event["rows"]:
+                    if row["ticker"] in names:
+                        yield line({"event": "update", **row, "full_name": names[row["ticker"]], "as_of": now})
+            yield line({"event": "done", "as_of": as_of})
+        finally:
+            refresher.unsubscribe(updates)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-        clean_metrics = ticker_indicators(ticker)
-        metrics = convert_numpy_types(clean_metrics)
 
-        check = db.execute(text('SELECT ticker from indexes')).mappings().fetchall()
+@app.post("/home/{ticker}", response_model=Indice, status_code=201)
+def add_followed(ticker: str, db: Session = Depends(get_db)):
+    try:
+        # seules les métriques affichées par /home sont calculées
+        metrics = clean_indicators(ticker.upper(), metrics=["Full Name", "Price", "Ticker performance"])
 
-        if any(item['ticker'] == ticker.upper() for item in check):
-            raise HTTPException(status_code=404, detail="Ticker already on list")
+        # la contrainte unique sur indexes.ticker remplace la lecture de toute la table
         row = db.execute(
             text("""
                 INSERT INTO indexes (ticker, full_name, price, performance)
                 VALUES (:t, :f, :pc, :pr)
+                ON CONFLICT (ticker) DO NOTHING
                 RETURNING ticker, full_name, price, performance
                 """),
                 {
@@ -140,9 +238,12 @@ def add_followed(ticker: str, db: Session = Depends(get_db)):
             ).mappings().fetchone()
         db.commit()
         if not row:
-            raise HTTPException(status_code=500, detail="Failed to add index")
+            raise HTTPException(status_code=404, detail="Ticker already on list")
+        refresher.trigger()
 
         return dict(row)
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error adding index: {str(e)}")
@@ -150,13 +251,7 @@ def add_followed(ticker: str, db: Session = Depends(get_db)):
 
 @app.delete("/home/{id}", response_model=list[Indice])
 def remove_followed(db: Session = Depends(get_db)):
-    a = get_indexes_list()
-    b = indexes_metrics(a)
-    update_indexes_metrics(b)
-    rows = db.execute(text("SELECT ticker, full_name, price, performance FROM indexes")).mappings().all()
-    if not rows:
-        raise HTTPException(status_code=404, detail="Indexes not found")
-    return [dict(r) for r in rows]
+    return _followed_rows(db)
 
 
 
@@ -168,21 +263,66 @@ def get_news(db: Session = Depends(get_db)):
     return [dict(r) for r in rows]
 
 
+# ---------- Live ----------
+@app.websocket("/ws/quotes")
+async def live_quotes(websocket: WebSocket):
+    """
+    Client -> {"subscribe": [tickers]} / {"unsubscribe": [tickers]}
+    Serveur -> [{ticker, price, eve_price, performance, seq, ts}, ...] à chaque variation
+    """
+    await websocket.accept()
+    sub = Subscriber()
+    hub.connections += 1
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+            add = [t.strip().upper() for t in message.get("subscribe") or [] if isinstance(t, str) and t.strip()]
+            room = max(0, LIVE_MAX_TICKERS - len(sub.tickers))
+            if len(add) > room:
+                await websocket.send_json({"error": f"{LIVE_MAX_TICKERS} tickers maximum par connexion"})
+            hub.subscribe(sub, add[:room])
+            remove = [t.strip().upper() for t in message.get("unsubscribe") or [] if isinstance(t, str)]
+            hub.unsubscribe(sub, remove)
+
+    async def send():
+        while True:
+            batch = await sub.next_batch()
+            try:
+                await asyncio.wait_for(websocket.send_json(batch), timeout=LIVE_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                hub.slow_disconnects += 1
+                await websocket.close(code=1013)
+                return
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.unsubscribe(sub)
+        hub.connections -= 1
+        hub.conflated += sub.conflated
+
 # ---------- Endpoints /api/me/... ----------
 @app.get("/api/me", response_model=UserOut)
-def get_me(me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    row = db.execute(
+async def get_me(me: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(
         text("SELECT id, email, first_name, last_name FROM users WHERE id = :i"),
         {"i": me.id},
-    ).mappings().first()
+    )).mappings().first()
     if not row:
         raise HTTPException(status_code=404, detail="User not found")
     return UserOut(**row)
 
 
 @app.get("/api/me/balance", response_model=Balance)
-def get_my_balance(me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    row = db.execute(
+async def get_my_balance(me: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(
         text("""
             SELECT principal
             FROM users
@@ -190,64 +330,59 @@ def get_my_balance(me: CurrentUser = Depends(get_current_user), db: Session = De
             
         """),
         {"uid": me.id},
-    ).mappings().fetchone()
+    )).mappings().fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Balance not found")
     return row
 
 
 @app.post("/api/me/balance/{amount}", response_model=BalanceIn, status_code=201)
-def set_my_balance(amount: float, me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    row = db.execute(
+async def set_my_balance(amount: float, me: CurrentUser = Depends(get_current_user),
+                         db: AsyncSession = Depends(get_async_db)):
+    row = await db.execute(
         text("""
             UPDATE users SET principal = principal + :p 
             WHERE id = :uid
             """),
         {"uid": me.id, "p": amount})
-    db.commit()
+    await db.commit()
 
-    row = db.execute(
+    row = (await db.execute(
         text("""SELECT principal AS amount
                 FROM users
                 WHERE id = :uid
              """),
         {"uid": me.id}
-    ).mappings().fetchone()
+    )).mappings().fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Balance not found")
     return row
 
 
 @app.get("/api/me/favorite", response_model=list[Favorite])
-def get_favorite(me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = db.execute(text('''
-    SELECT ticker, full_name, price, performance FROM stocks
-    WHERE favorite = true AND
-    user_id = :uid
-    '''),
-        {"uid": me.id},
-    ).mappings().all()
+async def get_favorite(me: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    rows = await favorite_rows(db, me.id)
     if not rows:
         raise HTTPException(status_code=404, detail="favorite not found")
-    return [dict(r) for r in rows]
+    return rows
 
 
 @app.delete("/api/me/favorite/{ticker}", response_model=list[Favorite])
-def remove_favorite(
+async def remove_favorite(
         ticker: str,
         me: CurrentUser = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # 1. Vérifier si le stock existe
-        stock = db.execute(
+        stock = (await db.execute(
             text("""
                 SELECT principal, favorite 
                 FROM stocks 
                 WHERE ticker = :t AND user_id = :uid
             """),
             {"uid": me.id, "t": ticker.upper()}
-        ).mappings().fetchone()
+        )).mappings().fetchone()
 
         if not stock:
             raise HTTPException(status_code=404, detail="Stock not found")
@@ -260,7 +395,7 @@ def remove_favorite(
             )
 
         # 3. Mettre à jour le favori pour CE ticker uniquement
-        db.execute(
+        await db.execute(
             text("""
                 UPDATE stocks 
                 SET favorite = false
@@ -268,304 +403,174 @@ def remove_favorite(
             """),
             {"uid": me.id, "t": ticker.upper()}
         )
-        db.commit()
+        await db.commit()
 
         # 4. Retourner la liste mise à jour des favoris
-        rows = db.execute(
-            text("""
-                SELECT ticker, full_name, price, performance 
-                FROM stocks
-                WHERE favorite = true AND user_id = :uid
-            """),
-            {"uid": me.id}
-        ).mappings().all()
-
-        return [dict(r) for r in rows]
+        return await favorite_rows(db, me.id)
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error removing favorite: {str(e)}")
 
 
 @app.post("/api/me/favorite/{ticker}", response_model=Favorite, status_code=201)
-def add_favorite(
+async def add_favorite(
         ticker,
         me: CurrentUser = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Ajoute un stock aux favoris avec tous ses indicateurs"""
 
     try:
-        # 1. Récupérer les indicateurs du ticker
-        indicators = get_ticker_indicators(
-            ticker=ticker,
-            p=0.05,
-            n=14,
-            rf_ann=0.02
-        )
-
-        data = indicators.data
+        # 1. Métriques partagées du ticker (ticker_metrics) : recalculées seulement si périmées
+        await refresh_ticker_metrics(db, ticker.upper())
 
-        # 2. Vérifier si le stock existe déjà pour cet utilisateur
-        existing = db.execute(
+        # 2. Une ligne par (user_id, ticker) : la contrainte unique tient lieu de vérification
+        await db.execute(
             text("""
-                SELECT id FROM stocks 
-                WHERE ticker = :ticker AND user_id = :uid
+                INSERT INTO stocks (user_id, ticker, favorite)
+                VALUES (:uid, :ticker, true)
+                ON CONFLICT (user_id, ticker) DO UPDATE SET favorite = true
             """),
             {"ticker": ticker.upper(), "uid": me.id}
-        ).fetchone()
-
-        if existing:
-            # Mettre à jour le favori
-            db.execute(
-                text("""
-                    UPDATE stocks 
-                    SET favorite = true,
-                        price = :price,
-                        performance = :performance,
-                        eve_price = :eve_price,
-                        full_name = :full_name,
-                        sector = :sector,
-                        industry = :industry,
-                        type = :type,
-                        market = :market,
-                        benchmark = :benchmark,
-                        eps = :eps,
-                        total_return = :total_return,
-                        market_return = :market_return,
-                        expected_return_capm = :expected_return,
-                        cagr = :cagr,
-                        ebitda = :ebitda,
-                        pe_ratio = :pe_ratio,
-                        book_value = :book_value,
-                        pb_ratio = :pb_ratio,
-                        roe = :roe,
-                        fin_cash_flow_yield = :fin_cash_flow_yield,
-                        duration_dividend = :duration_dividend,
-                        duration_fin_cash_flow = :duration_fin_cash_flow,
-                        duration_earnings = :duration_earnings,
-                        rsi = :rsi,
-                        daily_risk = :daily_risk,
-                        annual_risk = :annual_risk,
-                        max_drawdown = :max_drawdown,
-                        var95 = :var95,
-                        "cVar95" = :cvar95,
-                        annual_volatility = :annual_volatility,
-                        beta_1y = :beta_1y,
-                        daily_alpha = :daily_alpha,
-                        alpha_1y_pct = :alpha_1y_pct,
-                        "R_square_1y" = :r_square,
-                        "Tracking_Error_1y" = :tracking_error,
-                        "IR_1y" = :ir,
-                        treynor = :treynor,
-                        sharpe_1y = :sharpe,
-                        sortino_1y = :sortino,
-                        shares_outstanding = :shares_outstanding
-                    WHERE ticker = :ticker AND user_id = :uid
-                """),
-                {
-                    "ticker": ticker.upper(),
-                    "uid": me.id,
-                    "price": data.get("Price"),
-                    "performance": data.get("Ticker performance"),
-                    "eve_price": data.get("Ticker eve price"),
-                    "full_name": data.get("Full Name"),
-                    "sector": data.get("sector"),
-                    "industry": data.get("industry"),
-                    "type": data.get("type"),
-                    "market": data.get("market"),
-                    "benchmark": data.get("Benchmark"),
-                    "eps": data.get("eps"),
-                    "total_return": data.get("ticker total return"),
-                    "market_return": data.get("market return"),
-                    "expected_return": data.get("expected return"),
-                    "cagr": data.get("cagr"),
-                    "ebitda": data.get("ebitda"),
-                    "pe_ratio": data.get("price earning ratio"),
-                    "book_value": data.get("book value"),
-                    "pb_ratio": data.get("price to book ratio"),
-                    "roe": data.get("roe"),
-                    "fin_cash_flow_yield": data.get("financial cash flow yield"),
-                    "duration_dividend": data.get("duration dividends"),
-                    "duration_fin_cash_flow": data.get("duration financial cash flow"),
-                    "duration_earnings": data.get("duration earning"),
-                    "rsi": data.get("rsi"),
-                    "daily_risk": data.get("daily volatility"),
-                    "annual_risk": data.get("annual volatility"),
-                    "max_drawdown": data.get("drawdown"),
-                    "var95": data.get("var95"),
-                    "cvar95": data.get("cvar95"),
-                    "annual_volatility": data.get("annual volatility"),
-                    "beta_1y": data.get("ticker beta 1year"),
-                    "daily_alpha": data.get("daily alpha"),
-                    "alpha_1y_pct": data.get("alpha 1year percent"),
-                    "r_square": data.get("R²"),
-                    "tracking_error": data.get("tracking error"),
-                    "ir": data.get("information ratio"),
-                    "treynor": data.get("treynor"),
-                    "sharpe": data.get("sharpe ratio"),
-                    "sortino": data.get("sortino"),
-                    "shares_outstanding": data.get("shares outstanding")
-                }
-            )
-        else:
-            # Insérer un nouveau stock
-            db.execute(
-                text("""
-                    INSERT INTO stocks (
-                        user_id, ticker, full_name, sector, industry, type, 
-                        market, benchmark, price, performance, eve_price, 
-                        eps, total_return, market_return, expected_return_capm,
-                        cagr, ebitda, pe_ratio, book_value, pb_ratio, roe,
-                        fin_cash_flow_yield, duration_dividend, duration_fin_cash_flow,
-                        duration_earnings, rsi, daily_risk, annual_risk, max_drawdown,
-                        var95, "cVar95", annual_volatility, beta_1y, daily_alpha,
-                        alpha_1y_pct, "R_square_1y", "Tracking_Error_1y", "IR_1y",
-                        treynor, sharpe_1y, sortino_1y, shares_outstanding, favorite
-                    ) VALUES (
-                        :uid, :ticker, :full_name, :sector, :industry, :type,
-                        :market, :benchmark, :price, :performance, :eve_price,
-                        :eps, :total_return, :market_return, :expected_return,
-                        :cagr, :ebitda, :pe_ratio, :book_value, :pb_ratio, :roe,
-                        :fin_cash_flow_yield, :duration_dividend, :duration_fin_cash_flow,
-                        :duration_earnings, :rsi, :daily_risk, :annual_risk, :max_drawdown,
-                        :var95, :cvar95, :annual_volatility, :beta_1y, :daily_alpha,
-                        :alpha_1y_pct, :r_square, :tracking_error, :ir,
-                        :treynor, :sharpe, :sortino, :shares_outstanding, true
-                    )
-                """),
-                {
-                    "uid": me.id,
-                    "ticker": ticker.upper(),
-                    "full_name": data.get("Full Name"),
-                    "sector": data.get("sector"),
-                    "industry": data.get("industry"),
-                    "type": data.get("type"),
-                    "market": data.get("market"),
-                    "benchmark": data.get("Benchmark"),
-                    "price": data.get("Price"),
-                    "performance": data.get("Ticker performance"),
-                    "eve_price": data.get("Ticker eve price"),
-                    "eps": data.get("eps"),
-                    "total_return": data.get("ticker total return"),
-                    "market_return": data.get("market return"),
-                    "expected_return": data.get("expected return"),
-                    "cagr": data.get("cagr"),
-                    "ebitda": data.get("ebitda"),
-                    "pe_ratio": data.get("price earning ratio"),
-                    "book_value": data.get("book value"),
-                    "pb_ratio": data.get("price to book ratio"),
-                    "roe": data.get("roe"),
-                    "fin_cash_flow_yield": data.get("financial cash flow yield"),
-                    "duration_dividend": data.get("duration dividends"),
-                    "duration_fin_cash_flow": data.get("duration financial cash flow"),
-                    "duration_earnings": data.get("duration earning"),
-                    "rsi": data.get("rsi"),
-                    "daily_risk": data.get("daily volatility"),
-                    "annual_risk": data.get("annual volatility"),
-                    "max_drawdown": data.get("drawdown"),
-                    "var95": data.get("var95"),
-                    "cvar95": data.get("cvar95"),
-                    "annual_volatility": data.get("annual volatility"),
-                    "beta_1y": data.get("ticker beta 1year"),
-                    "daily_alpha": data.get("daily alpha"),
-                    "alpha_1y_pct": data.get("alpha 1year percent"),
-                    "r_square": data.get("R²"),
-                    "tracking_error": data.get("tracking error"),
-                    "ir": data.get("information ratio"),
-                    "treynor": data.get("treynor"),
-                    "sharpe": data.get("sharpe ratio"),
-                    "sortino": data.get("sortino"),
-                    "shares_outstanding": data.get("shares outstanding")
-                }
-            )
-        db.commit()
+        )
+        await db.commit()
         # 3. Retourner le stock ajouté
-        result = db.execute(
-            text("""
-                SELECT ticker, full_name, price, performance 
-                FROM stocks
-                WHERE ticker = :ticker AND user_id = :uid
-            """),
-            {"ticker": ticker.upper(), "uid": me.id}
-        ).mappings().fetchone()
-        return dict(result)
+        return (await favorite_rows(db, me.id, ticker))[0]
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error adding favorite: {str(e)}")
 
 
 
+def _wallet_row(row) -> dict:
+    return {"id": row["id"], "ticker": row["ticker"], "quantity": row["quantity"],
+            "price_at_buy": row["price_at_buy"], "created_at": row["created_at"].isoformat(timespec="seconds")}
+
+
 @app.get("/api/me/wallet", response_model=list[WalletRowOut])
-async def get_my_wallet(me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = db.execute(
-        text("""
-            SELECT id, ticker, quantity, to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS') AS created_at
+async def get_my_wallet(
+        limit: int = Query(WALLET_PAGE_SIZE, ge=1, le=WALLET_PAGE_MAX),
+        cursor: str | None = Query(None, description="X-Next-Cursor de la page précédente"),
+        if_none_match: str | None = Header(None),
+        me: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Lignes du portefeuille, plus récentes d'abord, par pages de `limit` :
+    - page suivante : X-Next-Cursor (et Link rel="next") à repasser dans `cursor`
+    - ETag / If-None-Match : 304 si la page n'a pas changé
+    """
+    params = {"uid": me.id, "lim": limit + 1}
+    after = ""
+    if cursor:
+        try:
+            params["c_at"], params["c_id"] = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        after = "AND (created_at, id) < (:c_at, :c_id)"
+    rows = (await db.execute(
+        text(f"""
+            SELECT id, ticker, quantity, price_at_buy, created_at
             FROM wallet
-            WHERE user_id = :uid
-            ORDER BY created_at DESC
+            WHERE user_id = :uid {after}
+            ORDER BY created_at DESC, id DESC
+            LIMIT :lim
         """),
-        {"uid": me.id},
-    ).mappings().all()
-    return [dict(r) for r in rows]
+        params,
+    )).mappings().all()
+
+    page = [_wallet_row(r) for r in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1]["created_at"], rows[limit - 1]["id"]) if len(rows) > limit else None
+    etag = page_etag(page, next_cursor)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'</api/me/wallet?limit={limit}&cursor={next_cursor}>; rel="next"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(page, headers=headers)
 
 
 @app.post("/api/me/wallet", response_model=WalletRowOut, status_code=201)
-def add_to_wallet(body: WalletCreateIn, me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
-    db.execute(
-        text("INSERT INTO wallet (user_id, ticker, quantity) VALUES (:u, :t, :q)"),
-        {"u": me.id, "t": body.ticker.upper(), "q": body.quantity},
-    )
-    new_row = db.execute(
+async def add_to_wallet(body: WalletCreateIn, me: CurrentUser = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_async_db)):
+    ticker = body.ticker.upper()
+    # prix d'achat : celui fourni, sinon la cotation courante (base du P&L)
+    price_at_buy = body.price_at_buy if body.price_at_buy is not None else await current_price(ticker)
+    new_row = (await db.execute(
         text("""
-            SELECT id, ticker, quantity, to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS') AS created_at
-            FROM wallet
-            WHERE user_id = :u
-            ORDER BY id DESC
-            LIMIT 1
+            WITH ins AS (
+                INSERT INTO wallet (user_id, ticker, quantity, price_at_buy) VALUES (:u, :t, :q, :p)
+                RETURNING id, ticker, quantity, price_at_buy, created_at
+            )
+            SELECT ins.*, m.full_name, m.sector
+            FROM ins
+            LEFT JOIN LATERAL (
+                SELECT tm.full_name, tm.sector FROM ticker_metrics tm
+                WHERE tm.ticker = ins.ticker ORDER BY tm.as_of DESC LIMIT 1
+            ) m ON true
         """),
-        {"u": me.id},
-    ).mappings().one()
-    db.commit()
-    return dict(new_row)
+        {"u": me.id, "t": ticker, "q": body.quantity, "p": price_at_buy},
+    )).mappings().one()
+    await db.commit()
+    # ticker non suivi : pas de ligne ticker_metrics, nom / secteur depuis les fondamentaux
+    [new_row] = await describe_rows([dict(new_row)])
+    apply_wallet_row(me.id, new_row)
+    return _wallet_row(new_row)
 
 
 @app.delete("/api/me/wallet/{row_id}", status_code=204)
-def delete_wallet_row(row_id: int, me: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_wallet_row(row_id: int, me: CurrentUser = Depends(get_current_user),
+                            db: AsyncSession = Depends(get_async_db)):
     # Sécurité: ne supprimer que si la ligne appartient à l'utilisateur
-    deleted = db.execute(
-        text("DELETE FROM wallet WHERE id = :id AND user_id = :u"),
+    deleted = (await db.execute(
+        text("DELETE FROM wallet WHERE id = :id AND user_id = :u RETURNING id, ticker, quantity, price_at_buy"),
         {"id": row_id, "u": me.id},
-    )
-    if deleted.rowcount == 0:
+    )).mappings().first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Ligne introuvable")
-    db.commit()
+    await db.commit()
+    apply_wallet_row(me.id, deleted, sign=-1)
     return
 
 
-@app.get("/api/me/portfolios", response_model=list[Indice])
-def get_wallet_distribuion(db: Session = Depends(get_db)):
-    rows = db.execute(text("SELECT ticker, full_name, price, performance FROM indexes")).mappings().all()
+@app.get("/api/me/portfolios", response_model=list[PortfolioPosition])
+async def get_wallet_distribuion(me: CurrentUser = Depends(get_current_user),
+                                 db: AsyncSession = Depends(get_async_db)):
+    """Positions agrégées par ticker : valeur, poids, P&L contre le prix d'achat moyen"""
+    rows, _ = await portfolio_valuation(db, me.id)
     if not rows:
-        raise HTTPException(status_code=404, detail="Indexes not found")
-    return [dict(r) for r in rows]
+        raise HTTPException(status_code=404, detail="Wallet is empty")
+    return FastJSONResponse(rows)
 
 
-@app.get("/api/me/summary", response_model=list[Indice])
-def get_wallet_summary(db: Session = Depends(get_db)):
-    rows = db.execute(text("SELECT ticker, full_name, price, performance FROM indexes")).mappings().all()
-    if not rows:
-        raise HTTPException(status_code=404, detail="Indexes not found")
-    return [dict(r) for r in rows]
+@app.get("/api/me/summary", response_model=PortfolioSummary)
+async def get_wallet_summary(me: CurrentUser = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_async_db)):
+    """Valeur totale, P&L, variation du jour et répartition sectorielle du portefeuille"""
+    _, summary = await portfolio_valuation(db, me.id)
+    return summary
+
+
+@app.get("/api/me/risk", response_model=PortfolioRisk)
+async def get_wallet_risk(
+        p: float = Query(0.05, ge=0.001, le=0.5, description="Queue de distribution (0.05 = VaR 95%)"),
+        horizon: int = Query(1, ge=1, le=252, description="Horizon en séances"),
+        me: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """VaR / CVaR, volatilité et contributions marginales au risque des positions du portefeuille"""
+    return await portfolio_risk_report(db, me.id, p, horizon)
 
 
 @app.get("/api/me/data_viz/{ticker}", response_model=list[Indice])
-def get_dataframe(db: Session = Depends(get_db)):
-    rows = db.execute(text("SELECT ticker, full_name, price, performance FROM indexes")).mappings().all()
+async def get_dataframe(db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(text("SELECT ticker, full_name, price, performance FROM indexes"))).mappings().all()
     if not rows:
         raise HTTPException(status_code=404, detail="Indexes not found")
     return [dict(r) for r in rows]
@@ -577,7 +582,7 @@ def get_dataframe(db: Session = Depends(get_db)):
         500: {"model": ErrorResponse, "description": "Erreur serveur"}
               }
 )
-def get_ticker_indicators(
+async def get_ticker_indicators(
         ticker: str,
         p: float = Query(0.05, ge=0.01, le=0.5, description="Percentile pour VaR (default: 0.05)"),
         n: int = Query(14, ge=5, le=100, description="Période pour RSI (default: 14)"),
@@ -585,35 +590,24 @@ def get_ticker_indicators(
 ):
 
     try:
-        # Appel de votre fonction
-        indicators = ticker_indicators(
-            ticker=ticker.upper(),
-            p=p,
-            n=n,
-            rf_ann=rf_ann
-        )
-
-        indicators_clean = convert_numpy_types(indicators)
-
-        # Gestion des valeurs infinies et NaN
-        for key, value in indicators_clean.items():
-            if isinstance(value, float):
-                if np.isnan(value):
-                    indicators_clean[key] = None
-                elif np.isinf(value):
-                    indicators_clean[key] = "Infinity" if value > 0 else "-Infinity"
+        result = await compute_indicators(ticker.upper(), p, n, rf_ann)
 
-        return TickerResponse(
-            ticker=ticker.upper(),
-            timestamp=datetime.now().isoformat(),
-            data=indicators_clean
-        )
+        # données produites par le moteur : pas de re-validation TickerResponse, sérialisation orjson
+        return FastJSONResponse({
+            "ticker": ticker.upper(),
+            "timestamp": datetime.now().isoformat(),
+            "as_of": result["as_of"],
+            "cached": result["cached"],
+            "data": result["data"],
+        })
 
     except KeyError as e:
         raise HTTPException(
             status_code=404,
             detail=f"Ticker '{ticker}' introuvable ou données manquantes: {str(e)}"
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -621,6 +615,20 @@ def get_ticker_indicators(
         )
 
 
+@app.post("/indicators/batch")
+async def get_indicators_batch(body: IndicatorsBatchIn, me: CurrentUser = Depends(get_current_user)):
+    """
+    NDJSON : une ligne par ticker dès que son calcul est terminé
+    {ticker, status, data, as_of, cached} ou {ticker, status, error}
+    Authentifié : jusqu'à 500 tickers par appel, téléchargements et calculs compris
+    """
+    async def lines():
+        async for item in stream_indicators(body.tickers, body.p, body.n, body.rf_ann):
+            yield ndjson_line(item)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.get("/ticker/{ticker}/metric/{metric_name}")
 async def get_specific_metric(
         ticker: str,
@@ -631,28 +639,26 @@ async def get_specific_metric(
 ):
 
     try:
-        indicators = ticker_indicators(ticker.upper(), p, n, rf_ann)
-        indicators_clean = convert_numpy_types(indicators)
-
-        if metric_name not in indicators_clean:
-            available_metrics = list(indicators_clean.keys())
+        if metric_name not in METRICS:
             raise HTTPException(
                 status_code=404,
-                detail=f"Métrique '{metric_name}' non trouvée. Métriques disponibles: {available_metrics[:10]}..."
+                detail=f"Métrique '{metric_name}' non trouvée. Métriques disponibles: {METRICS[:10]}..."
             )
 
-        value = indicators_clean[metric_name]
-        if isinstance(value, float) and np.isnan(value):
-            value = None
+        # seul le sous-graphe de la métrique est téléchargé et calculé
+        result = await compute_metrics(ticker.upper(), [metric_name], p, n, rf_ann)
+        indicators_clean = result["data"]
 
-        return {
+        return FastJSONResponse({
             "ticker": ticker.upper(),
             "metric": metric_name,
-            "value": value,
-            "timestamp": datetime.now().isoformat()
-        }
+            "value": indicators_clean[metric_name],
+            "timestamp": datetime.now().isoformat(),
+            "as_of": result["as_of"],
+            "cached": result["cached"]
+        })
 
-    except HTTPException:
+    except (HTTPException, ExecutorSaturated):
         raise
     except Exception as e:
         raise HTTPException(
@@ -667,4 +673,46 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+
+# ---------- Endpoints /admin/... ----------
+@app.get("/admin/executors")
+def get_executor_stats(me: CurrentUser = Depends(get_admin_user)):
+    return {
+        "executors": executor_stats(),
+        "compute_pool": COMPUTE_POOL.stats(),
+        "live_quotes": hub.stats(),
+        "coalescing": [indicator_flight.stats(), version_flight.stats()],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/admin/db/pool")
+def get_db_pool_stats(me: CurrentUser = Depends(get_admin_user)):
+    return {
+        "pool": pool_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/admin/cache")
+def get_cache_stats(me: CurrentUser = Depends(get_admin_user)):
+    return {
+        "caches": cache_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.delete("/admin/cache/{namespace}")
+def invalidate_cache(namespace: str, key: str | None = None, me: CurrentUser = Depends(get_admin_user)):
+    """
+    Vide un namespace, ou seulement les clés désignées par ?key= :
+    ticker (AAPL, y compris dans les clés composées de "indicators"), user_id ("positions"),
+    empreinte sha256 en hexadécimal ("tokens")
+    """
+    try:
+        removed = invalidate(namespace) if key is None else invalidate_matching(namespace, key)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Cache '{namespace}' introuvable")
+    return {"namespace": namespace, "removed": removed}
+
 # uvicorn app.main:app --reload
@@ -0,0 +1,131 @@
+-- app/migrations/001_ticker_metrics.sql   psql "$DATABASE_URL" -f app/migrations/001_ticker_metrics.sql
+-- Métriques de marché sorties de stocks (une copie par utilisateur) vers ticker_metrics
+-- (une ligne par ticker et par date). Idempotent ; tout ou rien.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ticker_metrics (
+    ticker                 varchar(32)  NOT NULL,
+    as_of                  date         NOT NULL,
+    full_name              varchar(255),
+    sector                 varchar(64),
+    industry               varchar(128),
+    type                   varchar(32),
+    market                 varchar(32),
+    benchmark              varchar(32),
+    price                  numeric(18, 6),
+    eve_price              numeric,
+    performance            numeric,
+    eps                    numeric,
+    total_return           numeric,
+    market_return          numeric,
+    market_annual_return   numeric,
+    expected_return_capm   numeric,
+    shares_outstanding     numeric,
+    cagr                   numeric,
+    ebitda                 numeric,
+    pe_ratio               numeric,
+    book_value             numeric,
+    pb_ratio               numeric,
+    return_                numeric,
+    roe                    numeric,
+    fin_cash_flow_yield    numeric,
+    duration_dividend      varchar(32),
+    duration_fin_cash_flow varchar(32),
+    duration_earnings      varchar(32),
+    rsi                    numeric,
+    daily_risk             numeric,
+    annual_risk            numeric,
+    max_drawdown           numeric,
+    var95                  numeric,
+    cvar95                 numeric,
+    annual_volatility      numeric,
+    beta_1y                numeric,
+    daily_alpha            numeric,
+    alpha_1y_pct           numeric,
+    r_square_1y            numeric,
+    tracking_error_1y      numeric,
+    ir_1y                  numeric,
+    treynor                numeric,
+    sharpe_1y              numeric,
+    sortino_1y             numeric,
+    updated_at             timestamp    NOT NULL DEFAULT now(),
+    -- la clé primaire sert aussi la lecture "dernière ligne du ticker" (parcours inverse)
+    PRIMARY KEY (ticker, as_of)
+);
+
+-- reprise : la ligne la plus récente de chaque ticker, si stocks a encore ses colonnes de métriques
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'stocks' AND column_name = 'sharpe_1y') THEN
+        INSERT INTO ticker_metrics (
+            ticker, as_of, full_name, sector, industry, type, market, benchmark,
+            price, eve_price, performance, eps, total_return, market_return, market_annual_return,
+            expected_return_capm, shares_outstanding, cagr, ebitda, pe_ratio, book_value, pb_ratio,
+            return_, roe, fin_cash_flow_yield, duration_dividend, duration_fin_cash_flow,
+            duration_earnings, rsi, daily_risk, annual_risk, max_drawdown, var95, cvar95,
+            annual_volatility, beta_1y, daily_alpha, alpha_1y_pct, r_square_1y, tracking_error_1y,
+            ir_1y, treynor, sharpe_1y, sortino_1y, updated_at
+        )
+        SELECT DISTINCT ON (upper(ticker))
+            upper(ticker), created_at::date, full_name, sector, industry, type, market, benchmark,
+            price, eve_price, performance, eps, total_return, market_return, market_annual_return,
+            expected_return_capm, shares_outstanding, cagr, ebitda, pe_ratio, book_value, pb_ratio,
+            return_, roe, fin_cash_flow_yield, duration_dividend, duration_fin_cash_flow,
+            duration_earnings, rsi, daily_risk, annual_risk, max_drawdown, var95, "cVar95",
+            annual_volatility, beta_1y, daily_alpha, alpha_1y_pct, "R_square_1y", "Tracking_Error_1y",
+            "IR_1y", treynor, sharpe_1y, sortino_1y, created_at
+        FROM stocks
+        ORDER BY upper(ticker), created_at DESC
+        ON CONFLICT (ticker, as_of) DO NOTHING;
+    END IF;
+END $$;
+
+ALTER TABLE stocks
+    DROP COLUMN IF EXISTS full_name,
+    DROP COLUMN IF EXISTS sector,
+    DROP COLUMN IF EXISTS industry,
+    DROP COLUMN IF EXISTS type,
+    DROP COLUMN IF EXISTS market,
+    DROP COLUMN IF EXISTS benchmark,
+    DROP COLUMN IF EXISTS price,
+    DROP COLUMN IF EXISTS eve_price,
+    DROP COLUMN IF EXISTS performance,
+    DROP COLUMN IF EXISTS eps,
+    DROP COLUMN IF EXISTS total_return,
+    DROP COLUMN IF EXISTS market_return,
+    DROP COLUMN IF EXISTS market_annual_return,
+    DROP COLUMN IF EXISTS expected_return_capm,
+    DROP COLUMN IF EXISTS shares_outstanding,
+    DROP COLUMN IF EXISTS cagr,
+    DROP COLUMN IF EXISTS ebitda,
+    DROP COLUMN IF EXISTS pe_ratio,
+    DROP COLUMN IF EXISTS book_value,
+    DROP COLUMN IF EXISTS pb_ratio,
+    DROP COLUMN IF EXISTS return_,
+    DROP COLUMN IF EXISTS roe,
+    DROP COLUMN IF EXISTS fin_cash_flow_yield,
+    DROP COLUMN IF EXISTS duration_dividend,
+    DROP COLUMN IF EXISTS duration_fin_cash_flow,
+    DROP COLUMN IF EXISTS duration_earnings,
+    DROP COLUMN IF EXISTS rsi,
+    DROP COLUMN IF EXISTS daily_risk,
+    DROP COLUMN IF EXISTS annual_risk,
+    DROP COLUMN IF EXISTS max_drawdown,
+    DROP COLUMN IF EXISTS var95,
+    DROP COLUMN IF EXISTS "cVar95",
+    DROP COLUMN IF EXISTS annual_volatility,
+    DROP COLUMN IF EXISTS beta_1y,
+    DROP COLUMN IF EXISTS daily_alpha,
+    DROP COLUMN IF EXISTS alpha_1y_pct,
+    DROP COLUMN IF EXISTS "R_square_1y",
+    DROP COLUMN IF EXISTS "Tracking_Error_1y",
+    DROP COLUMN IF EXISTS "IR_1y",
+    DROP COLUMN IF EXISTS treynor,
+    DROP COLUMN IF EXISTS sharpe_1y,
+    DROP COLUMN IF EXISTS sortino_1y;
+
+-- liste des favoris d'un utilisateur
+CREATE INDEX IF NOT EXISTS ix_stocks_user_favorite ON stocks (user_id, favorite);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- app/migrations/002_stocks_user_ticker_unique.sql   psql "$DATABASE_URL" -f app/migrations/002_stocks_user_ticker_unique.sql
+-- Une ligne stocks par (user_id, ticker) : permet INSERT ... ON CONFLICT dans add_favorite.
+-- Les doublons éventuels ne sont pas fusionnés automatiquement (principal, quantités...) :
+-- la migration s'arrête et les liste.
+BEGIN;
+
+DO $$
+DECLARE
+    duplicates int;
+BEGIN
+    SELECT count(*) INTO duplicates
+    FROM (SELECT 1 FROM stocks GROUP BY user_id, ticker HAVING count(*) > 1) d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION '% couples (user_id, ticker) en double dans stocks : à fusionner avant la migration '
+                        '(SELECT user_id, ticker, array_agg(id) FROM stocks GROUP BY 1, 2 HAVING count(*) > 1)',
+                        duplicates;
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_stocks_user_ticker ON stocks (user_id, ticker);
+
+COMMIT;
@@ -0,0 +1,9 @@
+-- app/migrations/003_wallet_keyset_index.sql   psql "$DATABASE_URL" -f app/migrations/003_wallet_keyset_index.sql
+-- Pagination de /api/me/wallet sur (created_at, id) : l'index porte la clé de tri complète,
+-- la page suivante est un parcours d'index borné, sans tri.
+BEGIN;
+
+DROP INDEX IF EXISTS ix_wallet_user_created;
+CREATE INDEX ix_wallet_user_created ON wallet (user_id, created_at DESC, id DESC);
+
+COMMIT;
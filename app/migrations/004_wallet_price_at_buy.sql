@@ -0,0 +1,8 @@
+-- app/migrations/004_wallet_price_at_buy.sql   psql "$DATABASE_URL" -f app/migrations/004_wallet_price_at_buy.sql
+-- Prix d'achat par ligne wallet : base du P&L de /api/me/summary et /api/me/portfolios.
+-- Les lignes existantes restent à NULL (coût inconnu) : elles sont valorisées mais sans P&L.
+BEGIN;
+
+ALTER TABLE wallet ADD COLUMN IF NOT EXISTS price_at_buy numeric(18, 6);
+
+COMMIT;
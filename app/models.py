@@ -1,11 +1,11 @@
 # app/models.py
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from xmlrpc.client import Boolean
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Boolean, Integer, ForeignKey, Numeric, DateTime, func, Index
+from sqlalchemy import String, Boolean, Integer, ForeignKey, Numeric, Date, DateTime, func, Index
 
 
 class Base(DeclarativeBase):
@@ -46,6 +46,7 @@ class Wallet(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False)
     ticker: Mapped[str] = mapped_column(String(32), index=True, nullable=False)
     quantity: Mapped[float] = mapped_column(Numeric(18,6), nullable=False)
+    price_at_buy: Mapped[float] = mapped_column(Numeric(18,6), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=False),  # mets timezone=True si tu préfères
         server_default=func.now(),
@@ -70,19 +71,13 @@ class Transaction(Base):
 
 
 class Stocks(Base):
+    """Données propres à un utilisateur ; les métriques de marché sont dans ticker_metrics"""
     __tablename__ = "stocks"
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False)
     wallet: Mapped[str] = mapped_column(String(32), nullable=True)
-    full_name: Mapped[str] = mapped_column(String(32),  nullable=True)
     ticker: Mapped[str] = mapped_column(String(32), nullable=False)
-    sector: Mapped[str] = mapped_column(String(32), nullable=True)
-    industry: Mapped[str] = mapped_column(String(32),  nullable=True)
-    type: Mapped[str] = mapped_column(String(32),  nullable=True)
-    market: Mapped[str] = mapped_column(String(32),  nullable=True)
-    benchmark: Mapped[str] = mapped_column(String(32), nullable=True)
     weight: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
-    price: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
     rate: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
     principal: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
     market_worth: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
@@ -91,6 +86,28 @@ class Stocks(Base):
     rate_at_buy: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
     principal_at_buy: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
     yld: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
+    favorite: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    soldout: Mapped[bool] = mapped_column(Boolean, default=True, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),  # mets timezone=True si tu préfères
+        server_default=func.now(),
+        nullable=False,
+    )
+    user: Mapped["User"] = relationship("User")
+
+
+class TickerMetrics(Base):
+    """Métriques de marché d'un ticker, une ligne par (ticker, date) partagée par tous les utilisateurs"""
+    __tablename__ = "ticker_metrics"
+    ticker: Mapped[str] = mapped_column(String(32), primary_key=True)
+    as_of: Mapped[date] = mapped_column(Date, primary_key=True)
+    full_name: Mapped[str] = mapped_column(String(255), nullable=True)
+    sector: Mapped[str] = mapped_column(String(64), nullable=True)
+    industry: Mapped[str] = mapped_column(String(128), nullable=True)
+    type: Mapped[str] = mapped_column(String(32), nullable=True)
+    market: Mapped[str] = mapped_column(String(32), nullable=True)
+    benchmark: Mapped[str] = mapped_column(String(32), nullable=True)
+    price: Mapped[int] = mapped_column(Numeric(18, 6), nullable=True)
     eve_price: Mapped[int] = mapped_column(Numeric(), nullable=True)
     performance: Mapped[int] = mapped_column(Numeric(), nullable=True)
     eps: Mapped[int] = mapped_column(Numeric(), nullable=True)
@@ -115,24 +132,23 @@ class Stocks(Base):
     annual_risk: Mapped[int] = mapped_column(Numeric(), nullable=True)
     max_drawdown: Mapped[int] = mapped_column(Numeric(), nullable=True)
     var95: Mapped[int] = mapped_column(Numeric(), nullable=True)
-    cVar95: Mapped[int] = mapped_column(Numeric(), nullable=True)
+    cvar95: Mapped[int] = mapped_column(Numeric(), nullable=True)
     annual_volatility: Mapped[int] = mapped_column(Numeric(), nullable=True)
     beta_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
     daily_alpha: Mapped[int] = mapped_column(Numeric(), nullable=True)
     alpha_1y_pct: Mapped[int] = mapped_column(Numeric(), nullable=True)
-    R_square_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
-    Tracking_Error_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
-    IR_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
+    r_square_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
+    tracking_error_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
+    ir_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
     treynor: Mapped[int] = mapped_column(Numeric(), nullable=True)
     sharpe_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
     sortino_1y: Mapped[int] = mapped_column(Numeric(), nullable=True)
-    favorite: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    soldout: Mapped[bool] = mapped_column(Boolean, default=True, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=False),  # mets timezone=True si tu préfères
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False),
         server_default=func.now(),
         nullable=False,
     )
-    user: Mapped["User"] = relationship("User")
 
-Index("ix_wallet_user_created", Wallet.user_id, Wallet.created_at)
+Index("ix_wallet_user_created", Wallet.user_id, Wallet.created_at.desc(), Wallet.id.desc())
+Index("ix_stocks_user_favorite", Stocks.user_id, Stocks.favorite)
+Index("ux_stocks_user_ticker", Stocks.user_id, Stocks.ticker, unique=True)
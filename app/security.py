@@ -4,7 +4,16 @@ from passlib.context import CryptContext
 from typing import Tuple
 
 
-pwd_ctx = CryptContext(schemes=["bcrypt_sha256", "bcrypt"], deprecated="auto")
+# coût bcrypt (2^rounds itérations) : un hash plus faible est refait au prochain login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_ctx = CryptContext(
+    schemes=["bcrypt_sha256", "bcrypt"],
+    deprecated="auto",
+    bcrypt_sha256__rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__rounds=BCRYPT_ROUNDS,
+)
 
 JWT_SECRET = os.getenv("JWT_SECRET", "CHANGEMOI-super-secret")
 JWT_ALGO = "HS256"
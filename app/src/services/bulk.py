@@ -0,0 +1,69 @@
+# app/src/services/bulk.py
+"""
+Écritures multi-lignes en un aller-retour : N lignes -> une instruction
+(UPDATE ... FROM (VALUES ...) ou INSERT ... VALUES ... ON CONFLICT), découpée
+en paquets de BULK_CHUNK_ROWS lignes pour borner la taille de la requête.
+Le commit reste à l'appelant.
+"""
+from __future__ import annotations
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "1000"))
+
+
+def _chunks(rows: list, size: int):
+    for i in range(0, len(rows), max(1, size)):
+        yield rows[i:i + size]
+
+def values_list(rows: list, columns: list, casts: dict | None = None) -> tuple[str, dict]:
+    """'(:r0_a, :r0_b), (:r1_a, :r1_b)...' et ses paramètres ; casts : {colonne: type SQL}"""
+    casts = casts or {}
+    tuples, params = [], {}
+    for i, row in enumerate(rows):
+        names = []
+        for column in columns:
+            name = f"r{i}_{column}"
+            params[name] = row.get(column)
+            names.append(f"CAST(:{name} AS {casts[column]})" if column in casts else f":{name}")
+        tuples.append(f"({', '.join(names)})")
+    return ", ".join(tuples), params
+
+
+def bulk_update(db: Session, table: str, rows: list, key: str, columns: list,
+                casts: dict | None = None, chunk_size: int = BULK_CHUNK_ROWS) -> int:
+    """UPDATE table SET col = v.col FROM (VALUES ...) v WHERE table.key = v.key ; retourne le nombre de lignes"""
+    updated = 0
+    for chunk in _chunks(rows, chunk_size):
+        values, params = values_list(chunk, [key, *columns], casts)
+        result = db.execute(text(f"""
+            UPDATE {table} AS t
+            SET {", ".join(f"{c} = v.{c}" for c in columns)}
+            FROM (VALUES {values}) AS v({key}, {", ".join(columns)})
+            WHERE t.{key} = v.{key}
+        """), params)
+        updated += result.rowcount
+    return updated
+
+
+def bulk_upsert(db: Session, table: str, rows: list, keys: list, columns: list,
+                casts: dict | None = None, update: bool = True, chunk_size: int = BULK_CHUNK_ROWS) -> int:
+    """
+    INSERT ... VALUES (...), (...) ON CONFLICT (keys) DO UPDATE (ou DO NOTHING si update=False)
+    Retourne le nombre de lignes insérées ou modifiées
+    """
+    written = 0
+    all_columns = [*keys, *columns]
+    on_conflict = (f"DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in columns)}"
+                   if update and columns else "DO NOTHING")
+    for chunk in _chunks(rows, chunk_size):
+        values, params = values_list(chunk, all_columns, casts)
+        result = db.execute(text(f"""
+            INSERT INTO {table} ({", ".join(all_columns)})
+            VALUES {values}
+            ON CONFLICT ({", ".join(keys)}) {on_conflict}
+        """), params)
+        written += result.rowcount
+    return written
@@ -0,0 +1,212 @@
+# app/src/services/cache.py
+from __future__ import annotations
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_MISSING = object()
+
+
+def _sizeof(value, _depth: int = 0) -> int:
+    """Estimation de l'empreinte mémoire d'une valeur mise en cache"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if _depth < 3 and isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k, _depth + 1) + _sizeof(v, _depth + 1)
+                                          for k, v in value.items())
+    if _depth < 3 and isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v, _depth + 1) for v in value)
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    Cache mémoire d'un namespace :
+    - expiration par entrée (ttl du namespace ou ttl passé à set)
+    - éviction LRU dès que la taille estimée dépasse max_bytes
+    - compteurs hits / misses / evictions / expirations
+    """
+
+    def __init__(self, namespace: str, ttl: float, max_bytes: int, sizeof=_sizeof):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: OrderedDict = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, size = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            with self._lock:
+                self.evictions += 1
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._data:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, key=_MISSING) -> int:
+        """Supprime une clé, ou tout le namespace sans argument ; retourne le nombre d'entrées retirées"""
+        with self._lock:
+            if key is _MISSING:
+                removed = len(self._data)
+                self._data.clear()
+                self.bytes = 0
+                return removed
+            item = self._data.pop(key, None)
+            if item is None:
+                return 0
+            self.bytes -= item[2]
+            return 1
+
+    def invalidate_matching(self, predicate) -> int:
+        """Supprime les entrées dont la clé vérifie predicate(key) ; retourne leur nombre"""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                self.bytes -= self._data.pop(k)[2]
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ---------- registre des namespaces ----------
+_registry: dict[str, TTLCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(namespace: str, ttl: float, max_bytes: int, sizeof=_sizeof) -> TTLCache:
+    """
+    Namespace partagé ; CACHE_<NAMESPACE>_TTL et CACHE_<NAMESPACE>_MAX_BYTES
+    surchargent les valeurs par défaut
+    """
+    with _registry_lock:
+        if namespace not in _registry:
+            env = namespace.upper()
+            _registry[namespace] = TTLCache(
+                namespace,
+                ttl=float(os.getenv(f"CACHE_{env}_TTL", ttl)),
+                max_bytes=int(os.getenv(f"CACHE_{env}_MAX_BYTES", max_bytes)),
+                sizeof=sizeof,
+            )
+        return _registry[namespace]
+
+def cache_stats() -> list:
+    with _registry_lock:
+        caches = list(_registry.values())
+    return [c.stats() for c in caches]
+
+def invalidate(namespace: str, key=_MISSING) -> int:
+    cache = _registry.get(namespace)
+    if cache is None:
+        raise KeyError(namespace)
+    return cache.invalidate(key)
+
+
+def key_matches(key, text: str) -> bool:
+    """
+    Désignation textuelle d'une clé de cache (route d'admin) :
+    - str : égalité sans casse (ticker) ; int : valeur décimale (user_id)
+    - bytes : hexadécimal (empreinte sha256 du namespace "tokens")
+    - tuple : l'un de ses éléments correspond (ex. ticker des clés "indicators")
+    """
+    if isinstance(key, str):
+        return key.upper() == text.upper()
+    if isinstance(key, bool):
+        return False
+    if isinstance(key, int):
+        return str(key) == text
+    if isinstance(key, bytes):
+        return key.hex() == text.lower()
+    if isinstance(key, tuple):
+        return any(key_matches(k, text) for k in key)
+    return False
+
+
+def invalidate_matching(namespace: str, text: str) -> int:
+    cache = _registry.get(namespace)
+    if cache is None:
+        raise KeyError(namespace)
+    return cache.invalidate_matching(lambda k: key_matches(k, text))
+
+
+def _call_key(args: tuple, kwargs: dict):
+    # un seul argument positionnel (le cas des helpers par ticker) : la clé est l'argument lui-même
+    if len(args) == 1 and not kwargs:
+        return args[0]
+    return args, tuple(sorted(kwargs.items()))
+
+def cached(namespace: str, ttl: float, max_bytes: int, sizeof=_sizeof, copy: bool = False):
+    """
+    Décorateur : mémorise le résultat par arguments dans le namespace donné.
+    copy=True : chaque appel reçoit une copie (DataFrame / Series), un appelant qui la modifie
+    en place ne corrompt pas l'entrée partagée
+    """
+    cache = get_cache(namespace, ttl, max_bytes, sizeof)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _call_key(args, kwargs)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = fn(*args, **kwargs)
+                cache.set(key, value)
+            return value.copy() if copy else value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.invalidate
+        wrapper.cache_invalidate = lambda *args, **kwargs: cache.invalidate(_call_key(args, kwargs))
+        return wrapper
+
+    return decorator
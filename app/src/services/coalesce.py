@@ -0,0 +1,37 @@
+# app/src/services/coalesce.py
+import asyncio
+
+
+class SingleFlight:
+    """
+    - Appels concurrents sur une même clé : un seul calcul en vol, résultat partagé
+    - Le calcul tourne dans sa propre tâche : un client qui se déconnecte ne l'annule pas pour les autres
+    - Le résultat n'est pas conservé une fois le calcul terminé (voir les caches pour ça)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict = {}
+        self.leaders = self.followers = 0
+
+    async def do(self, key, fn):
+        """fn : fonction sans argument qui retourne la coroutine à exécuter"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.followers
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "computations": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_ratio": round(self.followers / calls, 4) if calls else None,
+        }
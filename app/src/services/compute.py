@@ -7,21 +7,26 @@ from fastapi import Depends
 from datetime import datetime, timedelta
 import yfinance as yf
 import tradingview_ta as ta
-import time, pathlib
-from functools import lru_cache
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 from sqlalchemy.testing.plugin.plugin_base import before_test
 
-from app.db import SessionLocal
+from app.db import session_scope
+from app.src.services.history import load_history
+from app.src.services.fundamentals import fundamentals_snapshot
+from app.src.services.cache import cached, get_cache
+from app.src.services.bulk import bulk_update
 
 # from app.db import get_db
 
-DATA_DIR = pathlib.Path("data_cache")
-DATA_DIR.mkdir(exist_ok=True)
-
 N_TRADING = 252
 RF_ANN_DEFAULT = 0.02
 
+# cotations groupées : taille des lots yf.download et nombre de lots en parallèle
+QUOTES_CHUNK_SIZE = int(os.getenv("QUOTES_CHUNK_SIZE", "20"))
+QUOTES_MAX_WORKERS = int(os.getenv("QUOTES_MAX_WORKERS", "4"))
+
 INDEX_TICKERS = {
     # 🇺🇸 USA
     "S&P 500": {"index": "^GSPC", "etf": "SPY"},
@@ -217,30 +222,107 @@ suffix_map = {
         }
 
 
-# ---------- Cache disque : download + sauvegarde parquet ----------
-def _cache_path(ticker: str) -> pathlib.Path:
-    return DATA_DIR / f"{ticker.upper()}_history.parquet"
-
-
-
-# --- acces info ---
-@lru_cache(maxsize=256)
+# --- acces info (caches mémoire : app.src.services.cache) ---
+# yf.Ticker garde ses propres réponses (fast_info...) : on le renouvelle pour ne pas servir des prix figés
+@cached("yf_ticker", ttl=900, max_bytes=256 * 2**16, sizeof=lambda t: 2**16)
 def _yf_ticker(ticker: str) -> yf.Ticker:
     return yf.Ticker(ticker)
 
-@lru_cache(maxsize=256)
+@cached("history_close", ttl=3600, max_bytes=128 * 2**20, copy=True)
 def _history_close(ticker: str, period: str = "10y", auto_adjust: bool = True) -> pd.Series:
-    hist = _yf_ticker(ticker).history(period=period, auto_adjust=auto_adjust)
+    if not auto_adjust or not period.endswith("y"):
+        # le dataset ne stocke que des clôtures ajustées journalières
+        hist = _yf_ticker(ticker).history(period=period, auto_adjust=auto_adjust)
+        if hist.empty or "Close" not in hist.columns:
+            return pd.Series(dtype=float)
+        return hist["Close"].rename(ticker)
+    hist = load_history(ticker, "1d", lookback=pd.DateOffset(years=int(period[:-1])), columns=["Close"])
     if hist.empty or "Close" not in hist.columns:
         return pd.Series(dtype=float)
-    return hist["Close"].rename(ticker)
+    return hist.set_index("Date")["Close"].rename(ticker)
 
-@lru_cache(maxsize=512)
+@cached("dividends", ttl=12 * 3600, max_bytes=16 * 2**20, copy=True)
 def _dividends(ticker: str) -> pd.Series:
     div = _yf_ticker(ticker).dividends
     return div if isinstance(div, pd.Series) else pd.Series(dtype=float)
 
 
+# --- cotations groupées ---
+def _download_quotes(tickers: list) -> dict:
+    """Dernier prix et clôture de veille d'un lot de tickers en un seul yf.download"""
+    try:
+        data = yf.download(tickers, period="5d", interval="1d", group_by="ticker",
+                           auto_adjust=False, threads=False, progress=False)
+    except Exception as e:
+        print(f"❌ Erreur cotations {tickers}: {e}")
+        return {}
+    if data is None or data.empty:
+        return {}
+
+    quotes = {}
+    for ticker in tickers:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                close = data[ticker]["Close"]
+            elif len(tickers) == 1:
+                close = data["Close"]
+            else:
+                continue
+        except KeyError:
+            continue
+        # les séances diffèrent selon les places : on ne garde que les barres du ticker
+        close = close.dropna()
+        if close.empty:
+            continue
+        quotes[ticker] = {
+            "price": float(close.iloc[-1]),
+            "eve_price": float(close.iloc[-2]) if len(close) > 1 else None,
+        }
+    return quotes
+
+_quotes_cache = get_cache("quotes", ttl=60, max_bytes=4 * 2**20)
+
+def iter_batch_quotes(tickers: list, chunk_size: int = QUOTES_CHUNK_SIZE,
+                      max_workers: int = QUOTES_MAX_WORKERS):
+    """
+    - Comme batch_quotes, mais produit (tickers du lot, {ticker: quote}) dès qu'un lot est prêt
+    - Les cotations déjà en cache forment le premier lot
+    """
+    tickers = list(dict.fromkeys(t for t in tickers if t))
+    quotes = {}
+    missing = []
+    for ticker in tickers:
+        quote = _quotes_cache.get(ticker)
+        if quote is None:
+            missing.append(ticker)
+        else:
+            quotes[ticker] = quote
+    if quotes:
+        yield list(quotes), quotes
+    chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = {pool.submit(_download_quotes, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk_quotes = future.result()
+            for ticker, quote in chunk_quotes.items():
+                _quotes_cache.set(ticker, quote)
+            yield futures[future], chunk_quotes
+
+def batch_quotes(tickers: list, chunk_size: int = QUOTES_CHUNK_SIZE,
+                 max_workers: int = QUOTES_MAX_WORKERS) -> dict:
+    """
+    - Récupère prix et clôture de veille pour N tickers (cache "quotes" d'abord)
+    - Un téléchargement par lot de chunk_size tickers, au plus max_workers lots en parallèle
+    - Retourne {ticker: {"price", "eve_price"}} ; les tickers en échec sont absents
+    """
+    quotes = {}
+    for _, chunk_quotes in iter_batch_quotes(tickers, chunk_size, max_workers):
+        quotes.update(chunk_quotes)
+    return quotes
+
+
 def ticker_benchmark(ticker: str)-> dict:
     ticker = ticker.upper().strip()
     try:
@@ -258,312 +340,46 @@ def ticker_benchmark(ticker: str)-> dict:
 
 
 # --- market ---
+@cached("market", ttl=24 * 3600, max_bytes=2**20)
 def ticker_market(ticker: str) -> str:
-    t = _yf_ticker(ticker)
     exchange = None
     try:
-        fi = t.fast_info
-        exchange = getattr(fi, "exchange", None) or fi.get("exchange")
+        info = fundamentals_snapshot(ticker)["info"]
+        exchange = info.get("exchange") or info.get("fullExchangeName")
     except Exception:
         pass
     if exchange is None:
         try:
-            info = t.get_info()
-            exchange = exchange or info.get("fullExchangeName") or info.get("exchange")
+            fi = _yf_ticker(ticker).fast_info
+            exchange = getattr(fi, "exchange", None) or fi.get("exchange")
         except Exception:
             pass
     return exchange
 
 
 # --- download full history ---
+@cached("history_max", ttl=300, max_bytes=256 * 2**20, copy=True)
 def ticker_max_history(ticker: str, max_age_hours: int = 24) -> pd.DataFrame:
     """
-    - Utilise un cache Parquet local
-    - Rafraîchit si fichier > max_age_hours
+    - Lit le dataset Parquet partitionné (app.src.services.history)
+    - Si vérifié il y a plus de max_age_hours : ne télécharge que les barres manquantes
     """
-    p = _cache_path(ticker)
-    now = time.time()
-    if p.exists() and (now - p.stat().st_mtime) < max_age_hours * 3600:
-        df = pd.read_parquet(p)
-    else:
-        df = _yf_ticker(ticker).history(period="max")
-        if df.empty:
-            return df
-        df = df.reset_index()
-        df["Date"] = pd.to_datetime(df["Date"])
-        keep = [c for c in ["Date","Open","High","Low","Close","Adj Close","Volume"] if c in df.columns]
-        df = df[keep]
-        df.to_parquet(p, index=False)
-    return df
+    return load_history(ticker, "1d", max_age=max_age_hours * 3600)
 
+@cached("history_1y", ttl=300, max_bytes=128 * 2**20, copy=True)
 def _yrl_history(ticker: str) -> pd.DataFrame:
-    p = _cache_path(ticker)
-    now = pd.Timestamp.now(tz="America/New_York")
-    start = now - pd.Timedelta(days=252)
-    if p.exists():
-        df = pd.read_parquet(p)
-        # df.mask((df['Date'] >= now) & (df['Date'] <= start))
-    else:
-        df = _yf_ticker(ticker).history(period="1y", interval="1d")
-        if df.empty:
-            return df
-        df = df.reset_index()
-        df["Date"] = pd.to_datetime(df["Date"])
-        keep = [c for c in ["Date","Open","High","Low","Close","Volume"] if c in df.columns]
-        df = df[keep]
-        df.to_parquet(p, index=False)
-    return df
+    """Dernière année de barres journalières : seules les partitions concernées sont lues"""
+    return load_history(ticker, "1d", lookback=pd.DateOffset(years=1))
 
 
 # --- indicators ----
 def ticker_indicators(ticker: str, p = 0.05, n = 14, rf_ann = 0.02) -> dict:
-    ticker_eve_price: float
-    t = _yf_ticker(ticker)
-    fi = t.fast_info
-
-    # fundamentals
-    fin_q = safe_df(t.quarterly_income_stmt)
-    fin_a = safe_df(t.financials)
-    bs_q = safe_df(t.quarterly_balance_sheet)
-    bs_a = safe_df(t.balance_sheet)
-    cf_q = safe_df(t.quarterly_cashflow)
-    cf_a = safe_df(t.cashflow)
-
-    # --- status ---
-    long_name: str = t.info['longName']
-    ticker_price: int = getattr(fi, "last_price", None)
-    ticker_eve_price = fi.get("previous_close")
-    market = ticker_benchmark(ticker)['index']
-    print("market", market)
-    market_ticker = ticker_market(ticker)
-    print("market ticker", market_ticker)
-    epss = t.income_stmt.loc['Diluted EPS', :].iloc[0]
-    sector = t.info.get("sector")
-    industry = t.info.get("industry")
-    classe = t.info.get("quoteType")
-    print("type: ", classe)
-    payout_ratio = t.info["payoutRatio"]
-    shares_outstanding = t.info['sharesOutstanding']
-    market_cap = t.info.get("marketCap", None)
-    eps_ttm = t.info.get("trailingEps", None)
-
-    if ticker_eve_price is None:
-        try:
-            # hist = t.history(period="10d", interval="1d", auto_adjust=False)
-            hist = _yrl_history(ticker)
-            if not hist.empty:
-                ticker_eve_price = hist["Close"].iloc[-2]
-        except Exception:
-            pass
-
-    ticker_performance = (ticker_eve_price - ticker_price) / ticker_eve_price
-
-    # --- dividends ---
-    dividends = t.dividends
-    if dividends is None or dividends.empty:
-        hist = t.history(period="10y", auto_adjust=False)
-        dividends = hist["Dividends"]
-    div_ttm = trailing_12m_dividend(dividends)
-    dividend_yield = (div_ttm / ticker_price) if (div_ttm and ticker_price) else None
-
-    # FCF TTM (fallback annuel
-    financial_cash_flow_ttm = None
-    fcf_ttm = ttm_sum(cf_q, "Free Cash Flow")
-    if np.isnan(fcf_ttm) and not (cf_a is None or cf_a.empty) and "Free Cash Flow" in cf_a.index:
-        financial_cash_flow_ttm = float(cf_a.loc["Free Cash Flow"].iloc[0])
-
-    # Net Income TTM
-    ni_ttm = ttm_sum(fin_q, "Net Income")
-    if np.isnan(ni_ttm) and not (fin_a is None or fin_a.empty) and "Net Income" in fin_a.index:
-        ni_ttm = float(fin_a.loc["Net Income"].iloc[0])
-
-    # Equity (dernier bilan)
-    equity = None
-    if not (bs_a is None or bs_a.empty) and "Stockholders Equity" in bs_a.index:
-        equity = float(bs_a.loc["Stockholders Equity"].iloc[0])
-    elif not (bs_q is None or bs_q.empty) and "Stockholders Equity" in bs_q.index:
-        equity = float(bs_q.loc["Stockholders Equity"].iloc[0])
-
-    # ROE ≈ NI_TTM / Equity
-    roe = (ni_ttm / equity) if (not np.isnan(ni_ttm) and not np.isnan(equity) and equity != 0) else None
-
-    # P/E (trailing)
-    pe = t.info.get("trailingPE", None)
-    if (not pe) and (eps_ttm and eps_ttm != 0):
-        pe = ticker_price / eps_ttm
-
-    # P/CF (par action) -> Price / (FCF/share)
-    price_to_cash_flow_ratio = None
-    if (not np.isnan(fcf_ttm)) and (not np.isnan(shares_outstanding)) and shares_outstanding > 0:
-        fcf_per_share = fcf_ttm / shares_outstanding
-        if fcf_per_share != 0:
-            price_to_cash_flow_ratio = ticker_price / fcf_per_share
-
-    # Earnings yield (utile pour duration)
-    earning_yield = earnings_yield_from_info(t.info, ticker_price)
-
-    # FCF yield = FCF / MarketCap
-    financial_cash_flow_yield = (fcf_ttm / market_cap) if (
-            not np.isnan(fcf_ttm) and not np.isnan(market_cap) and market_cap > 0) else None
-
-    # --- dataframe element ---
-    ticker_df = _yrl_history(ticker)
-    close = ticker_df["Close"]
-    market_df = _yrl_history(market)
-    market_close = market_df["Close"]
-
-    # ---- performance ----
-    ebitda = t.income_stmt.loc['EBITDA', :].iloc[0]
-
-    ticker_total_return = close.iloc[-1] / close.iloc[0] - 1
-    market_returns =  market_close.iloc[-1] / market_close.iloc[0] - 1
-    price_earning_ratio = ticker_price / epss
-    book_value = t.info['bookValue']
-    price_to_book_ratio =ticker_price / book_value
-    ticker_return = close.pct_change()
-    market_return = market_close.pct_change()
-    ticker_log_return = np.log(close).diff()
-
-    # --- volatility ---
-    common = ticker_return.dropna().index.intersection(market_return.dropna().index)
-    ticker_series = ticker_return.loc[common]
-    market_series = market_return.loc[common]
-    annual_volatility = ticker_return.rolling(window=20).std().iloc[-1] * np.sqrt(N_TRADING) * 100
-
-    # --- drawdown ---
-    px_1y = close.iloc[-N_TRADING:]
-    cummax = px_1y.cummax()
-    drawdown = px_1y / cummax - 1.0
-    drawdown = drawdown.min() * 100
-
-    # --- var ---
-    var95 = np.percentile(ticker_return.dropna(), 100 * p) * 100
-    cvar95 = ticker_return[ticker_return <= np.percentile(ticker_return.dropna(), 100 * p)].mean() * 100
-
-    # --- RSI ---
-    delta = close.diff()
-    gain = delta.clip(lower=0.0)
-    loss = -delta.clip(upper=0.0)
-    avg_gain = gain.ewm(alpha=1 / n, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / n, adjust=False).mean()
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    rsi14 = 100 - (100 / (1 + rs))
-    rsi = rsi14.iloc[-1]
-
-    # --- beta ---
-    x = np.vstack([np.ones(len(market_series)), market_series.values]).T  # [const, marché]
-    y = ticker_series.values
-    beta = np.linalg.lstsq(x, y, rcond=None)[0]
-    daily_alpha, ticker_beta_1y = beta[0], beta[1]
-
-    # R²
-    y_hat = x @ beta
-    ss_res = ((y - y_hat) ** 2).sum()
-    ss_tot = ((y - y.mean()) ** 2).sum()
-    r2_1y = 1 - ss_res / ss_tot
-
-    # Annual alpha
-    alpha_1y_pct = ((1 + daily_alpha) ** N_TRADING - 1) * 100
-
-    # tracking error & info ratio
-    active = ticker_series - market_series
-    te_1y = active.std() * np.sqrt(N_TRADING) * 100  # en %
-
-    # Information Ratio = (Perf ann relative) / TE
-    rel_ann = ((1 + ticker_series.mean()) ** N_TRADING - 1) - ((1 + market_series.mean()) ** N_TRADING - 1)
-    ir_1y = rel_ann / (te_1y / 100) if te_1y != 0 else None
-
-    # treynor
-    er_ann = (1 + ticker_series.mean()) ** N_TRADING - 1
-    treynor = (er_ann - rf_ann) / ticker_beta_1y if ticker_beta_1y != 0 else None
-
-    # sharpe ratio
-    rf_daily = (1 + rf_ann) ** (1 / N_TRADING) - 1
-    excess = market_series - rf_daily
-    sharpe_1y = (excess.mean() / excess.std()) * np.sqrt(N_TRADING)
-
-    # sortino
-    neg = excess.copy()
-    neg[neg > 0] = 0
-    semidev = np.sqrt((neg ** 2).mean())
-    sortino_1y = (excess.mean() * np.sqrt(N_TRADING)) / semidev if semidev != 0 else None
-
-    # expected return
-    market_annual = (1 + market_series.mean()) ** N_TRADING - 1
-    expected_return_capm = rf_ann + ticker_beta_1y * (market_annual - rf_ann)
-    g_sgr = estimate_g_sgr(roe, payout_ratio)
-
-    # Duration proxies
-    duration_div = equity_duration_proxy(dividend_yield, g_sgr)
-    duration_fcf = equity_duration_proxy(financial_cash_flow_yield, g_sgr)
-    duration_earning = equity_duration_proxy(earning_yield, g_sgr)
-
-    # 3) Sensibilité aux taux (rate beta)
-    beta_rate = rate_beta_10y(ticker, market)
-
-    # yield
-    df = ticker_df.copy()
-    df["return"] = df['Close'].pct_change()
-    df["log_return"] = np.log1p(df["return"])
-    df = df.dropna(subset=["return", "log_return"])
-
-    n_years = (df["Date"].iloc[-1] - df["Date"].iloc[0]).days / 365.25
-    growth_rate = (1 + ticker_total_return) ** (1 / n_years) - 1 if n_years > 0 else None
-
-    volatility_daily = df["log_return"].std(ddof=1)
-    volalitity_annual = volatility_daily * np.sqrt(N_TRADING) if pd.notna(volatility_daily) else np.nan
-
-    return {
-                "Full Name": long_name,
-                "sector": sector,
-                "industry": industry,
-                "type": classe,
-                "Price": round(ticker_price,2),
-                "Ticker eve price": round(ticker_eve_price,2),
-                "Ticker performance": round(ticker_performance*100,2),
-                "market": market,
-                "Benchmark": market_ticker,
-                "eps": epss,
-                "payout ratio": payout_ratio,
-
-                "ebitda": ebitda,
-                "shares outstanding": shares_outstanding,
-                "ticker total return": round(ticker_total_return,4),
-                "market return": round(market_returns,4),
-                "price earning ratio": round(price_earning_ratio,2),
-                "book value": book_value,
-                "price to book ratio": round(price_to_book_ratio,2),
-
-
-                "expected return": round(expected_return_capm,4),
-                "cagr": round(growth_rate,4),
-                "roe" : round(roe*100,2),
-                "dividend yield": dividend_yield,
-                "financial cash flow": financial_cash_flow_ttm,
-                "Price to Cash Flow Ratio": price_to_cash_flow_ratio,
-                "earning yield": round(earning_yield*100,2),
-                "financial cash flow yield": financial_cash_flow_yield,
-                "duration dividends": duration_div,
-                "duration financial cash flow": duration_fcf,
-                "duration earning": duration_earning,
-                "market sensibility": beta_rate,
-
-                "annual volatility": volalitity_annual,
-                "daily volatility": volatility_daily,
-                "drawdown": drawdown,
-                "var95": var95,
-                "cvar95": cvar95,
-                "rsi": rsi,
-                "daily alpha": daily_alpha,
-                "ticker beta 1year": ticker_beta_1y,
-                "R²": r2_1y,
-                "alpha 1year percent": alpha_1y_pct,
-                "tracking error": te_1y,
-                "information ratio": ir_1y,
-                "treynor": treynor,
-                "sharpe ratio": sharpe_1y,
-                "sortino": sortino_1y,
-    }
+    """
+    - Toutes les métriques de metric_graph, dans l'ordre historique
+    - /ticker/{ticker}/metric/{name} n'évalue que le sous-graphe nécessaire (compute_metrics)
+    """
+    from app.src.services.metric_graph import evaluate  # metric_graph importe ce module
+    return evaluate(ticker, p=p, n=n, rf_ann=rf_ann)
 
 
 def ttm_sum(df: pd.DataFrame, row_name: str) -> float:
@@ -615,22 +431,21 @@ def compute_beta_alpha(xr: pd.Series, xm: pd.Series):
     r2 = 1 - ((y - y_hat)**2).sum() / ((y - y.mean())**2).sum()
     return a, b, r2
 
-def rate_beta_10y(ticker: str, market: str) -> float:
-    y10 = _history_close(market)
-    stock_ret = _history_close(ticker)
+def rate_beta(stock_ret: pd.Series, y10: pd.Series) -> float:
     y10 = y10 / 100.0
     # stock_ret = stock_ret.diff()
     dy = y10.diff()
     idx = stock_ret.dropna().index.intersection(dy.dropna().index)
-    print('data idx', idx)
     if len(idx) < 60:
-        print('lenght market', len(idx))
         return None
     X = np.vstack([np.ones(len(idx)), dy.loc[idx].values]).T
     y = stock_ret.loc[idx].values
     a, b = np.linalg.lstsq(X, y, rcond=None)[0]
     return b
 
+def rate_beta_10y(ticker: str, market: str) -> float:
+    return rate_beta(_history_close(ticker), _history_close(market))
+
 def convert_numpy_types(obj):
     """Convertit les types numpy en types Python natifs pour la sérialisation JSON"""
     if isinstance(obj, np.integer):
@@ -646,81 +461,66 @@ def convert_numpy_types(obj):
     return obj
 
 
-def indexes_metrics(indexes: list) -> list:
-    """Calcule les métriques (prix et performance) pour chaque ticker"""
+def quote_rows(tickers: list, quotes: dict) -> list:
+    """Prix et performance de chaque ticker depuis ses cotations ; None si la cotation manque"""
     results = []
 
-    for ticker in indexes:
-        try:
-            # Récupération du prix actuel
-            price = _yf_ticker(ticker).fast_info.last_price
-            eve_price = None
-            performance = None
-
-            # Récupération du prix de veille
-            try:
-                hist = _yrl_history(ticker)
-                if not hist.empty:
-                    eve_price = hist["Close"].iloc[-2]
-                    # Calcul de la performance
-                    if eve_price and eve_price != 0:
-                        performance = ((price - eve_price) / eve_price) * 100
-
-
-            except Exception:
-                pass
-            # convert_numpy_types(performance)
-            # convert_numpy_types(price)
-            results.append({
-                "ticker": ticker,
-                "price": float(price),
-                "performance": float(performance)
-            })
+    for ticker in tickers:
+        quote = quotes.get(ticker) or {}
+        price = quote.get("price")
+        eve_price = quote.get("eve_price")
 
-        except Exception as e:
-            # En cas d'erreur sur un ticker, on l'ajoute quand même avec des valeurs None
+        # En cas d'erreur sur un ticker, on l'ajoute quand même avec des valeurs None
+        if price is None or not eve_price:
             results.append({
                 "ticker": ticker,
                 "price": None,
                 "performance": None
             })
+            continue
+
+        results.append({
+            "ticker": ticker,
+            "price": price,
+            "performance": ((price - eve_price) / eve_price) * 100
+        })
     return results
 
 
-def get_indexes_list() -> list:
-    """Récupère la liste des tickers depuis la base de données"""
-    db = SessionLocal()  # Créer directement une session
-    try:
+def indexes_metrics(indexes: list) -> list:
+    """Calcule les métriques (prix et performance) pour chaque ticker à partir des cotations groupées"""
+    return quote_rows(indexes, batch_quotes(indexes))
+
+
+def get_indexes_list(db: Session | None = None) -> list:
+    """Récupère la liste des tickers depuis la base de données (session fournie ou dédiée)"""
+    with session_scope(db) as db:
         rows = db.execute(text("SELECT ticker FROM indexes;")).mappings().fetchall()
         return [row['ticker'] for row in rows if row['ticker']]
-    finally:
-        db.close()
 
 
-def update_indexes_metrics(metrics: list):
-    db = SessionLocal()
-    try:
-        # Mettre à jour
-        for metric in metrics:
-            if metric["price"] is not None:
-                db.execute(
-                    text("""
-                        UPDATE indexes 
-                        SET price = :price, 
-                            performance = :performance
-                        WHERE ticker = :ticker
-                    """),
-                    metric
-                )
-
-        db.commit()
-        print("✅ Base de données mise à jour avec succès!")
+def update_indexes_metrics(metrics: list | None = None, db: Session | None = None) -> int:
+    """
+    Écrit prix et performance dans indexes en une instruction (calculés depuis les cotations groupées si absents).
+    Retourne le nombre de lignes écrites : 0 si aucune cotation ou si l'écriture échoue.
+    """
+    with session_scope(db) as db:
+        if metrics is None:
+            metrics = indexes_metrics(get_indexes_list(db))
+        rows = [m for m in metrics if m["price"] is not None]
+        if not rows:
+            return 0
+        try:
+            bulk_update(db, "indexes", rows, key="ticker", columns=["price", "performance"],
+                        casts={"price": "numeric", "performance": "numeric"})
+            db.commit()
+            print("✅ Base de données mise à jour avec succès!")
+            return len(rows)
 
-    except Exception as e:
-        db.rollback()
-        print(f"❌ Erreur: {e}")
-    finally:
-        db.close()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Erreur: {e}")
+            return 0
 
 
 
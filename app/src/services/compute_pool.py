@@ -0,0 +1,219 @@
+# app/src/services/compute_pool.py
+"""
+Calcul des indicateurs hors du process uvicorn : les entrées déjà téléchargées
+(resolve_inputs) sont copiées une fois dans un bloc de mémoire partagée, le process
+de calcul les relit sans pickling des tableaux et renvoie le dict d'indicateurs.
+Le GIL du worker web reste libre pour l'auth, le wallet, etc.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from app.src.services.executors import ExecutorSaturated
+
+# process de calcul par worker uvicorn (défaut : la moitié des cœurs, au moins 1).
+# Chaque worker crée son propre pool : avec plusieurs workers, viser COMPUTE_PROCESSES x workers <= cœurs.
+# 0 = désactivé explicitement : calcul dans le pool CPU (threads) du process web, sous son GIL.
+COMPUTE_PROCESSES = int(os.getenv("COMPUTE_PROCESSES", str(max(1, (os.cpu_count() or 2) // 2))))
+COMPUTE_QUEUE = int(os.getenv("COMPUTE_QUEUE", "64"))
+
+_ALIGN = 64
+
+
+# ---------- sérialisation vers la mémoire partagée ----------
+def _export_array(values, arrays: list):
+    """Tableau numérique/date -> référence dans le bloc, sinon valeurs picklées"""
+    if isinstance(values, pd.DatetimeIndex) or isinstance(getattr(values, "dtype", None), pd.DatetimeTZDtype):
+        index = pd.DatetimeIndex(values)
+        tz = index.tz
+        if tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        arrays.append(index.to_numpy())
+        return ("arr", len(arrays) - 1, tz)
+    arr = np.asarray(values)
+    if arr.dtype.kind in "biufcmM":
+        arrays.append(np.ascontiguousarray(arr))
+        return ("arr", len(arrays) - 1, None)
+    return ("obj", getattr(values, "array", values))
+
+def _export_index(index: pd.Index, arrays: list):
+    if isinstance(index, pd.RangeIndex):
+        return ("range", index.start, index.stop, index.step, index.name)
+    return ("index", _export_array(index, arrays), index.name)
+
+def _export(value, arrays: list):
+    if isinstance(value, pd.DataFrame):
+        return ("frame", [(c, _export_array(value[c], arrays)) for c in value.columns],
+                _export_index(value.index, arrays))
+    if isinstance(value, pd.Series):
+        return ("series", _export_array(value, arrays), _export_index(value.index, arrays), value.name)
+    if isinstance(value, tuple):
+        return ("tuple", [_export(v, arrays) for v in value])
+    return ("raw", value)
+
+
+def _import_array(ref, buf, layout: list):
+    if ref[0] == "obj":
+        return ref[1]
+    _, i, tz = ref
+    offset, dtype, shape = layout[i]
+    arr = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset).copy()
+    if tz is not None:
+        return pd.DatetimeIndex(arr).tz_localize("UTC").tz_convert(tz)
+    return arr
+
+def _import_index(ref, buf, layout: list) -> pd.Index:
+    if ref[0] == "range":
+        return pd.RangeIndex(ref[1], ref[2], ref[3], name=ref[4])
+    return pd.Index(_import_array(ref[1], buf, layout), name=ref[2])
+
+def _import(desc, buf, layout: list):
+    kind = desc[0]
+    if kind == "frame":
+        index = _import_index(desc[2], buf, layout)
+        return pd.DataFrame({c: _import_array(ref, buf, layout) for c, ref in desc[1]}, index=index)
+    if kind == "series":
+        return pd.Series(_import_array(desc[1], buf, layout), index=_import_index(desc[2], buf, layout),
+                         name=desc[3])
+    if kind == "tuple":
+        return tuple(_import(d, buf, layout) for d in desc[1])
+    return desc[1]
+
+
+def pack_inputs(inputs: dict) -> tuple[shared_memory.SharedMemory, dict, list]:
+    """Copie les tableaux des entrées dans un nouveau bloc ; à libérer avec release()"""
+    arrays: list = []
+    spec = {name: _export(value, arrays) for name, value in inputs.items()}
+    layout, size = [], 0
+    for arr in arrays:
+        size = -(-size // _ALIGN) * _ALIGN
+        layout.append((size, arr.dtype.str, arr.shape))
+        size += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for arr, (offset, dtype, shape) in zip(arrays, layout):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = arr
+    return shm, spec, layout
+
+def unpack_inputs(shm_name: str, spec: dict, layout: list) -> dict:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        return {name: _import(desc, shm.buf, layout) for name, desc in spec.items()}
+    finally:
+        shm.close()
+
+def release(shm: shared_memory.SharedMemory):
+    shm.close()
+    shm.unlink()
+
+
+# ---------- côté process de calcul ----------
+def _warm():
+    # imports lourds (pandas, yfinance, graphe) payés au démarrage du process, pas au premier job
+    import app.src.services.indicators  # noqa: F401
+
+def _job(ticker: str, p: float, n: int, rf_ann: float, metrics, shm_name: str, spec: dict, layout: list) -> dict:
+    from app.src.services.indicators import clean_indicators
+    return clean_indicators(ticker, p, n, rf_ann, metrics, unpack_inputs(shm_name, spec, layout))
+
+
+# ---------- côté web ----------
+class ComputePool:
+    """
+    - Pool de `processes` process (spawn), au plus processes + max_queue jobs en cours
+    - submit() lève ExecutorSaturated au-delà, comme BoundedExecutor
+    - Démarré au premier job
+    """
+
+    def __init__(self, name: str, processes: int, max_queue: int):
+        self.name = name
+        self.processes = processes
+        self.max_queue = max_queue
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(max(processes, 1) + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = self.completed = self.failed = self.rejected = 0
+        self.shm_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_warm,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def submit(self, ticker: str, p: float, n: int, rf_ann: float, inputs: dict,
+               metrics: list | None = None) -> Future:
+        """Job : ticker + paramètres + entrées pré-téléchargées -> dict d'indicateurs nettoyé"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(f"{self.name}: {self.processes + self.max_queue} calculs déjà en cours")
+        try:
+            shm, spec, layout = pack_inputs(inputs)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.shm_bytes += shm.size
+        try:
+            future = self._executor().submit(_job, ticker, p, n, rf_ann, metrics, shm.name, spec, layout)
+        except Exception:
+            self._finish(shm, ok=False)
+            raise
+        future.add_done_callback(
+            lambda f: self._finish(shm, ok=not f.cancelled() and f.exception() is None))
+        return future
+
+    def _finish(self, shm: shared_memory.SharedMemory, ok: bool):
+        # le bloc n'est libéré qu'une fois le process de calcul terminé avec lui
+        release(shm)
+        with self._lock:
+            self.in_flight -= 1
+            self.shm_bytes -= shm.size
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "processes": self.processes,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "shm_bytes": self.shm_bytes,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+COMPUTE_POOL = ComputePool("compute", COMPUTE_PROCESSES, COMPUTE_QUEUE)
+
+
+async def run_compute(ticker: str, p: float, n: int, rf_ann: float, inputs: dict,
+                      metrics: list | None = None) -> dict:
+    return await asyncio.wrap_future(COMPUTE_POOL.submit(ticker, p, n, rf_ann, inputs, metrics))
@@ -0,0 +1,198 @@
+# app/src/services/covariance.py
+"""
+Covariance EWMA des rendements journaliers, une seule matrice pour tous les tickers déjà demandés
+(univers partagé entre portefeuilles, chaque requête en lit le sous-bloc de ses tickers) :
+- construite une fois sur EWMA_LOOKBACK_DAYS de clôtures (dataset Parquet)
+- un ticker encore inconnu ajoute seulement ses lignes / colonnes, le bloc existant est gardé
+- ensuite mises à jour séance par séance (cov = lam * cov + (1 - lam) r rᵀ) quand une barre arrive,
+  sans relire tout l'historique
+- seules les séances terminées (datées d'avant aujourd'hui) entrent : la barre partielle du jour,
+  qui bouge jusqu'à la clôture, serait sinon figée dans la matrice
+- historique ré-ajusté (split, dividende) : la dernière clôture appliquée ne correspond plus, reconstruction
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.src.services.cache import get_cache
+from app.src.services.history import ADJUSTMENT_TOLERANCE, history_close_matrix
+from app.src.services.risk import ewma_covariance, ewma_update, ewma_weights, simple_returns
+
+EWMA_LAMBDA = float(os.getenv("EWMA_LAMBDA", "0.94"))
+EWMA_LOOKBACK_DAYS = int(os.getenv("EWMA_LOOKBACK_DAYS", "730"))
+# intervalle minimal entre deux recherches de nouvelles barres (ou deux reconstructions sans historique)
+EWMA_CHECK_SECONDS = float(os.getenv("EWMA_CHECK_SECONDS", "300"))
+
+
+def completed_sessions(close: pd.DataFrame) -> pd.DataFrame:
+    """Séances antérieures à la date du jour (dates locales des places, cf. history_close_matrix)"""
+    return close[close.index < pd.Timestamp.today().normalize()]
+
+
+class CovarianceSnapshot:
+    """Sous-bloc copié sous le verrou : ne bouge plus quand la matrice partagée est mise à jour"""
+    __slots__ = ("tickers", "cov", "covered", "lam", "bars", "last_date")
+
+    def __init__(self, tickers: list, cov: np.ndarray, covered: np.ndarray, lam: float, bars: int,
+                 last_date: pd.Timestamp | None):
+        self.tickers = tickers
+        self.cov = cov
+        self.covered = covered
+        self.lam = lam
+        self.bars = bars
+        self.last_date = last_date
+
+
+class EwmaCovariance:
+    """
+    - cov : covariance EWMA (tickers x tickers) à la date last_date
+    - last_close : dernière clôture connue de chaque ticker (rendement de la prochaine séance)
+    - refresh(tickers) : ajoute les tickers inconnus, puis applique les séances terminées postérieures
+      à last_date, au plus une fois par EWMA_CHECK_SECONDS
+    - snapshot(tickers) : copie du sous-bloc de ces tickers, à lire hors du verrou
+    """
+
+    def __init__(self, tickers: list = (), lam: float = EWMA_LAMBDA):
+        self.tickers = list(tickers)
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        self.lam = lam
+        self.cov = np.zeros((len(self.tickers), len(self.tickers)))
+        self.last_close = np.full(len(self.tickers), np.nan)
+        self.last_date: pd.Timestamp | None = None
+        self.bars = self.updates = 0
+        self.checked = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.cov.nbytes + self.last_close.nbytes)
+
+    @property
+    def covered(self) -> np.ndarray:
+        """Tickers ayant au moins une clôture"""
+        return ~np.isnan(self.last_close)
+
+    def build(self, close: pd.DataFrame):
+        """Initialisation sur un historique complet (dates x tickers)"""
+        close = completed_sessions(close.reindex(columns=self.tickers).sort_index())
+        self.cov = ewma_covariance(simple_returns(close), self.lam)
+        self.last_close = close.ffill().iloc[-1].to_numpy(dtype=float) if len(close) \
+            else np.full(len(self.tickers), np.nan)
+        self.last_date = close.index[-1] if len(close) else None
+        self.bars = len(close)
+
+    def extend(self, tickers: list, close: pd.DataFrame):
+        """
+        Ajoute des tickers à une matrice déjà construite : seules leurs colonnes (covariances avec
+        tout l'univers) sont calculées, sur les séances jusqu'à last_date ; le bloc existant ne bouge pas
+        """
+        new = [t for t in dict.fromkeys(tickers) if t not in self._index]
+        if not new:
+            return
+        n = len(self.tickers)
+        self.tickers += new
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        close = completed_sessions(close.reindex(columns=self.tickers).sort_index())
+        close = close[close.index <= self.last_date]
+        r = np.nan_to_num(simple_returns(close))
+        cov = np.zeros((len(self.tickers), len(self.tickers)))
+        cov[:n, :n] = self.cov
+        if len(r):
+            block = (r * ewma_weights(len(r), self.lam)[:, None]).T @ r[:, n:]
+            cov[:, n:] = block
+            cov[n:, :] = block.T
+        self.cov = cov
+        added = close.iloc[:, n:].ffill().iloc[-1].to_numpy(dtype=float) if len(close) \
+            else np.full(len(new), np.nan)
+        self.last_close = np.concatenate([self.last_close, added])
+
+    def update(self, close: pd.DataFrame) -> int:
+        """Applique les séances terminées postérieures à last_date ; retourne le nombre de séances ajoutées"""
+        close = completed_sessions(close.reindex(columns=self.tickers).sort_index())
+        if self.last_date is not None:
+            close = close[close.index > self.last_date]
+        for date, row in zip(close.index, close.to_numpy(dtype=float)):
+            quoted = ~np.isnan(row)
+            r = np.zeros(len(row))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r[quoted] = row[quoted] / self.last_close[quoted] - 1
+            ewma_update(self.cov, r, self.lam)
+            self.last_close[quoted] = row[quoted]
+            self.last_date = date
+        self.bars += len(close)
+        self.updates += len(close)
+        return len(close)
+
+    def adjusted(self, close: pd.DataFrame) -> bool:
+        """La clôture de last_date a changé depuis son application (historique ré-ajusté)"""
+        if self.last_date not in close.index:
+            return False
+        stored = close.reindex(columns=self.tickers).loc[self.last_date].to_numpy(dtype=float)
+        both = ~np.isnan(stored) & self.covered
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gap = np.abs(stored[both] / self.last_close[both] - 1)
+        return bool((gap > ADJUSTMENT_TOLERANCE).any())
+
+    def _rebuild(self) -> int:
+        self.build(history_close_matrix(self.tickers, start=_lookback_start()))
+        self.updates = 0
+        self.checked = time.monotonic()
+        return self.bars
+
+    def refresh(self, tickers: list = (), max_age: float = EWMA_CHECK_SECONDS) -> int:
+        """Retourne le nombre de séances appliquées (toutes en cas de reconstruction)"""
+        with self._lock:
+            new = [t for t in dict.fromkeys(tickers) if t not in self._index]
+            if self.last_date is None:
+                # aucun historique encore : nouvelle tentative pour un nouveau ticker ou après max_age
+                if new:
+                    self.tickers += new
+                    self._index = {t: i for i, t in enumerate(self.tickers)}
+                elif time.monotonic() - self.checked < max_age:
+                    return 0
+                return self._rebuild()
+            if new:
+                self.extend(new, history_close_matrix(self.tickers + new, start=_lookback_start()))
+            if time.monotonic() - self.checked < max_age:
+                return 0
+            self.checked = time.monotonic()
+            close = history_close_matrix(self.tickers, start=self.last_date)
+            if self.adjusted(close):
+                return self._rebuild()
+            return self.update(close)
+
+    def snapshot(self, tickers: list) -> CovarianceSnapshot:
+        with self._lock:
+            cols = [self._index[t] for t in tickers]
+            return CovarianceSnapshot(list(tickers), self.cov[np.ix_(cols, cols)], self.covered[cols],
+                                      self.lam, self.bars, self.last_date)
+
+
+def _lookback_start() -> pd.Timestamp:
+    return pd.Timestamp.today().normalize() - pd.Timedelta(days=EWMA_LOOKBACK_DAYS)
+
+
+# une seule entrée : l'univers est reconstruit chaque jour (ce qui borne aussi sa taille)
+_covariances = get_cache("covariance", ttl=24 * 3600, max_bytes=256 * 2**20, sizeof=lambda s: s.nbytes)
+_covariances_lock = threading.Lock()
+UNIVERSE = "universe"
+
+
+def covariance_for(tickers: list) -> CovarianceSnapshot:
+    """Sous-bloc à jour pour ces tickers, copié ; bloquant : pool CPU/I-O"""
+    tickers = list(dict.fromkeys(tickers))
+    with _covariances_lock:
+        state = _covariances.get(UNIVERSE)
+        if state is None:
+            state = EwmaCovariance()
+            _covariances.set(UNIVERSE, state)
+    size = len(state.tickers)
+    state.refresh(tickers)
+    if len(state.tickers) != size:
+        with _covariances_lock:
+            _covariances.set(UNIVERSE, state)  # taille de la matrice agrandie
+    return state.snapshot(tickers)
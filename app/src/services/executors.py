@@ -0,0 +1,134 @@
+# app/src/services/executors.py
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+IO_QUEUE = int(os.getenv("IO_QUEUE", "64"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+CPU_QUEUE = int(os.getenv("CPU_QUEUE", "32"))
+# hachage bcrypt : file dédiée pour qu'une rafale de logins ne prive pas les autres routes de threads
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_QUEUE = int(os.getenv("HASH_QUEUE", "64"))
+HASH_PROCESSES = int(os.getenv("HASH_PROCESSES", "0"))  # > 0 : hachage dans des process (spawn)
+
+
+class ExecutorSaturated(RuntimeError):
+    """File d'attente pleine : la requête est refusée plutôt que mise en attente sans fin"""
+
+
+class BoundedExecutor:
+    """
+    - Pool de threads dédié avec au plus max_workers + max_queue tâches en cours
+    - submit() lève ExecutorSaturated au-delà
+    - stats() : profondeur de file, tâches actives, attente moyenne/max en file
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.queued = self.active = 0
+        self.submitted = self.completed = self.failed = self.rejected = 0
+        self._wait_total = self._wait_max = 0.0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(f"{self.name}: {self.max_workers + self.max_queue} tâches déjà en cours")
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+        enqueued_at = time.perf_counter()
+
+        def run():
+            waited = time.perf_counter() - enqueued_at
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        future = self._pool.submit(run)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self.submitted - self.queued
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else None,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# I/O amont (Yahoo, base de données) et calcul pandas/NumPy ne partagent pas leurs threads
+IO_EXECUTOR = BoundedExecutor("io", IO_WORKERS, IO_QUEUE)
+CPU_EXECUTOR = BoundedExecutor("cpu", CPU_WORKERS, CPU_QUEUE)
+# en mode process, chaque thread du pool "hash" délègue à un process et attend : même bornage, mêmes stats
+HASH_EXECUTOR = BoundedExecutor("hash", HASH_PROCESSES or HASH_WORKERS, HASH_QUEUE)
+_hash_processes: ProcessPoolExecutor | None = None
+_hash_processes_lock = threading.Lock()
+
+
+def _hash_process_pool() -> ProcessPoolExecutor:
+    global _hash_processes
+    with _hash_processes_lock:
+        if _hash_processes is None:
+            _hash_processes = ProcessPoolExecutor(max_workers=HASH_PROCESSES,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+        return _hash_processes
+
+
+async def run_io(fn, *args, **kwargs):
+    return await asyncio.wrap_future(IO_EXECUTOR.submit(fn, *args, **kwargs))
+
+async def run_cpu(fn, *args, **kwargs):
+    return await asyncio.wrap_future(CPU_EXECUTOR.submit(fn, *args, **kwargs))
+
+async def run_hash(fn, *args):
+    """fn doit être importable (fonction de module) si HASH_PROCESSES > 0"""
+    if HASH_PROCESSES > 0:
+        in_process = lambda: _hash_process_pool().submit(fn, *args).result()
+        return await asyncio.wrap_future(HASH_EXECUTOR.submit(in_process))
+    return await asyncio.wrap_future(HASH_EXECUTOR.submit(fn, *args))
+
+def shutdown_hashing():
+    if _hash_processes is not None:
+        _hash_processes.shutdown(wait=False, cancel_futures=True)
+
+def executor_stats() -> list:
+    return [IO_EXECUTOR.stats(), CPU_EXECUTOR.stats(), {**HASH_EXECUTOR.stats(), "processes": HASH_PROCESSES}]
@@ -0,0 +1,150 @@
+# app/src/services/fundamentals.py
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pandas as pd
+import yfinance as yf
+
+from app.src.services.history import DATA_DIR
+from app.src.services.cache import get_cache
+
+FUNDAMENTALS_DIR = DATA_DIR / "fundamentals"
+FUNDAMENTALS_DIR.mkdir(exist_ok=True)
+
+# publications trimestrielles : une semaine de cache par défaut
+FUNDAMENTALS_TTL_HOURS = float(os.getenv("FUNDAMENTALS_TTL_HOURS", "168"))
+FUNDAMENTALS_MAX_WORKERS = int(os.getenv("FUNDAMENTALS_MAX_WORKERS", "4"))
+# après un échec (réseau, réponse incomplète) : ancien snapshot servi, nouvel essai après ce délai
+FUNDAMENTALS_RETRY_MINUTES = float(os.getenv("FUNDAMENTALS_RETRY_MINUTES", "15"))
+
+# champs de .info utilisés par les indicateurs
+INFO_FIELDS = [
+    "longName", "sector", "industry", "quoteType", "payoutRatio", "sharesOutstanding",
+    "marketCap", "trailingEps", "trailingPE", "bookValue", "exchange", "fullExchangeName",
+]
+
+# champs sans lesquels un .info est une réponse partielle (limitation de débit, erreur transitoire)
+REQUIRED_INFO = ["longName", "quoteType"]
+REQUIRED_EQUITY_INFO = ["sector", "marketCap"]  # les indices, ETF et devises n'en ont pas
+
+# lignes conservées pour chaque état financier yfinance
+STATEMENT_ROWS = {
+    "income_stmt": ["Diluted EPS", "EBITDA", "Net Income"],
+    "quarterly_income_stmt": ["Net Income"],
+    "balance_sheet": ["Stockholders Equity"],
+    "quarterly_balance_sheet": ["Stockholders Equity"],
+    "cashflow": ["Free Cash Flow"],
+    "quarterly_cashflow": ["Free Cash Flow"],
+}
+
+# copie mémoire des snapshots, expirée en même temps que le fichier
+_memory = get_cache("fundamentals", ttl=FUNDAMENTALS_TTL_HOURS * 3600, max_bytes=64 * 2**20)
+
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _path(ticker: str):
+    return FUNDAMENTALS_DIR / f"{ticker.upper()}.json"
+
+def _lock_for(ticker: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(ticker.upper(), threading.Lock())
+
+def _rows(frame, rows: list) -> pd.DataFrame:
+    if not isinstance(frame, pd.DataFrame) or frame.empty:
+        return pd.DataFrame()
+    return frame.loc[[r for r in rows if r in frame.index]]
+
+
+def _download(ticker: str) -> dict:
+    """Un seul passage sur yfinance : .info puis chaque état financier une fois"""
+    t = yf.Ticker(ticker)
+    info = t.info or {}
+    return {
+        "ticker": ticker.upper(),
+        "fetched_at": time.time(),
+        "info": {k: info[k] for k in INFO_FIELDS if k in info},
+        "statements": {name: _rows(getattr(t, name), rows) for name, rows in STATEMENT_ROWS.items()},
+    }
+
+def _missing_fields(info: dict) -> list:
+    required = REQUIRED_INFO + (REQUIRED_EQUITY_INFO if info.get("quoteType") == "EQUITY" else [])
+    return [k for k in required if info.get(k) in (None, "")]
+
+def _save(snapshot: dict):
+    payload = {
+        **snapshot,
+        "statements": {name: df.to_json(orient="split", date_format="iso")
+                       for name, df in snapshot["statements"].items()},
+    }
+    path = _path(snapshot["ticker"])
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, default=str))
+    os.replace(tmp, path)
+
+def _load(ticker: str) -> dict | None:
+    path = _path(ticker)
+    if not path.exists():
+        return None
+    try:
+        payload = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    statements = {}
+    for name, raw in payload["statements"].items():
+        df = pd.read_json(StringIO(raw), orient="split")
+        if not df.empty:
+            df.columns = pd.to_datetime(df.columns)
+        statements[name] = df
+    return {**payload, "statements": statements}
+
+
+def fundamentals_snapshot(ticker: str, ttl_hours: float = FUNDAMENTALS_TTL_HOURS) -> dict:
+    """
+    - {ticker, fetched_at, info, statements} persisté sous data_cache/fundamentals
+    - Re-téléchargé en un appel groupé quand il a plus de ttl_hours
+    - Un .info incomplet n'est pas enregistré ; un snapshot périmé reste servi si Yahoo
+      ne répond pas ou répond partiellement, nouvel essai après FUNDAMENTALS_RETRY_MINUTES
+    """
+    key = ticker.upper()
+    snapshot = _memory.get(key)
+    if snapshot is not None and (snapshot.get("stale") or time.time() - snapshot["fetched_at"] < ttl_hours * 3600):
+        return snapshot
+    with _lock_for(ticker):
+        snapshot = _load(ticker)
+        if snapshot and time.time() - snapshot["fetched_at"] < ttl_hours * 3600:
+            expires_in = snapshot["fetched_at"] + FUNDAMENTALS_TTL_HOURS * 3600 - time.time()
+            _memory.set(key, snapshot, ttl=max(0.0, expires_in))
+            return snapshot
+        fresh = None
+        try:
+            fresh = _download(ticker)
+            missing = _missing_fields(fresh["info"])
+            if missing:
+                raise ValueError(f"réponse incomplète, champs manquants: {missing}")
+        except Exception as e:
+            print(f"❌ Fondamentaux {ticker}: {e}")
+            fallback = snapshot or fresh
+            if fallback is None:
+                raise
+            # servi tel quel (sans être enregistré) jusqu'au prochain essai
+            fallback = {**fallback, "stale": True}
+            _memory.set(key, fallback, ttl=FUNDAMENTALS_RETRY_MINUTES * 60)
+            return fallback
+        _save(fresh)
+        _memory.set(key, fresh, ttl=FUNDAMENTALS_TTL_HOURS * 3600)
+        return fresh
+
+def fundamentals_snapshots(tickers: list, max_workers: int = FUNDAMENTALS_MAX_WORKERS) -> dict:
+    """Snapshots de plusieurs tickers, téléchargements en parallèle (borné)"""
+    tickers = list(dict.fromkeys(t.upper() for t in tickers if t))
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        return dict(zip(tickers, pool.map(fundamentals_snapshot, tickers)))
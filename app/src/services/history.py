@@ -0,0 +1,337 @@
+# app/src/services/history.py
+from __future__ import annotations
+import json
+import os
+import pathlib
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+import yfinance as yf
+
+DATA_DIR = pathlib.Path("data_cache")
+DATA_DIR.mkdir(exist_ok=True)
+
+# dataset Parquet partitionné : history/interval=1d/ticker=AAPL/year=2024/part-0.parquet
+DATASET_DIR = DATA_DIR / "history"
+DATASET_DIR.mkdir(exist_ok=True)
+# une entrée par (ticker, intervalle) : un rafraîchissement ne réécrit que la sienne
+MANIFEST_DIR = DATASET_DIR / "_manifest"
+MANIFEST_DIR.mkdir(exist_ok=True)
+# ancien manifest global, lu en repli tant qu'une entrée n'a pas été réécrite
+MANIFEST_PATH = DATASET_DIR / "_manifest.json"
+
+# fraîcheur : les barres journalières bougent une fois par séance, l'intraday en continu
+DAILY_MAX_AGE_HOURS = float(os.getenv("HISTORY_DAILY_MAX_AGE_HOURS", "12"))
+INTRADAY_MAX_AGE_MINUTES = float(os.getenv("HISTORY_INTRADAY_MAX_AGE_MINUTES", "5"))
+# écart relatif toléré sur la barre de contrôle avant de considérer l'historique comme ré-ajusté
+ADJUSTMENT_TOLERANCE = float(os.getenv("HISTORY_ADJUSTMENT_TOLERANCE", "1e-4"))
+# tickers rafraîchis en parallèle par history_close_matrix
+HISTORY_MAX_WORKERS = int(os.getenv("HISTORY_MAX_WORKERS", "8"))
+
+# profondeur maximale servie par Yahoo pour un premier téléchargement intraday
+INTRADAY_PERIOD = {"1m": "7d", "2m": "60d", "5m": "60d", "15m": "60d", "30m": "60d",
+                   "60m": "730d", "90m": "60d", "1h": "730d"}
+
+KEEP = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# lectures mmap : les colonnes demandées sont décodées depuis les pages mappées, sans copie du fichier
+_FS = fs.LocalFileSystem(use_mmap=True)
+_PARTITIONING = ds.partitioning(
+    pa.schema([("ticker", pa.string()), ("year", pa.int32())]), flavor="hive"
+)
+
+_manifest_lock = threading.Lock()
+_ticker_locks: dict[str, threading.Lock] = {}
+
+
+# ---------- manifest : dernière barre connue par (ticker, intervalle) ----------
+def _key(ticker: str, interval: str) -> str:
+    return f"{ticker.upper()}|{interval}"
+
+def _tmp_path(path: pathlib.Path) -> pathlib.Path:
+    # propre au process et au thread : plusieurs workers peuvent écrire la même cible
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def _entry_path(key: str) -> pathlib.Path:
+    return MANIFEST_DIR / f"{quote(key, safe='')}.json"
+
+def _read_legacy_manifest() -> dict:
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def _read_manifest_entry(key: str) -> dict | None:
+    path = _entry_path(key)
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return _read_legacy_manifest().get(key)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest_entry(key: str, entry: dict):
+    """Écriture atomique de la seule entrée du ticker (fichier temporaire puis os.replace)"""
+    path = _entry_path(key)
+    tmp = _tmp_path(path)
+    tmp.write_text(json.dumps(entry))
+    os.replace(tmp, path)
+
+def _lock_for(key: str) -> threading.Lock:
+    with _manifest_lock:
+        return _ticker_locks.setdefault(key, threading.Lock())
+
+def history_last_bar(ticker: str, interval: str = "1d") -> pd.Timestamp | None:
+    """Dernière barre en cache pour ce ticker (sans accès réseau)"""
+    entry = _read_manifest_entry(_key(ticker, interval))
+    return pd.Timestamp(entry["last_bar"]) if entry else None
+
+
+# ---------- partitions ----------
+def _interval_dir(interval: str) -> pathlib.Path:
+    return DATASET_DIR / f"interval={interval}"
+
+def _ticker_dir(ticker: str, interval: str) -> pathlib.Path:
+    # encodage URI : "^IXIC" ou "GC=F" restent des noms de partition hive valides
+    return _interval_dir(interval) / f"ticker={quote(ticker.upper(), safe='')}"
+
+def _year_path(ticker: str, interval: str, year: int) -> pathlib.Path:
+    return _ticker_dir(ticker, interval) / f"year={year}" / "part-0.parquet"
+
+def _partition_files(tickers: list, interval: str, start=None, end=None) -> list:
+    """Fichiers des partitions (ticker, année) qui recoupent [start, end]"""
+    lo = pd.Timestamp(start).year if start is not None else None
+    hi = pd.Timestamp(end).year if end is not None else None
+    files = []
+    for ticker in tickers:
+        for year_dir in sorted(_ticker_dir(ticker, interval).glob("year=*")):
+            year = int(year_dir.name.split("=", 1)[1])
+            if (lo is not None and year < lo) or (hi is not None and year > hi):
+                continue
+            files.extend(str(f) for f in year_dir.glob("*.parquet"))
+    return files
+
+def _write_years(ticker: str, interval: str, bars: pd.DataFrame):
+    """Fusionne les barres dans leurs partitions annuelles ; seules les années touchées sont réécrites"""
+    for year, chunk in bars.groupby(bars["Date"].dt.year):
+        path = _year_path(ticker, interval, int(year))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            chunk = _merge(pd.read_parquet(path), chunk)
+        tmp = _tmp_path(path)
+        pq.write_table(pa.Table.from_pandas(chunk, preserve_index=False), tmp)
+        os.replace(tmp, path)
+
+
+# ---------- téléchargement ----------
+def _max_age_seconds(interval: str) -> float:
+    if interval in ("1d", "5d", "1wk", "1mo", "3mo"):
+        return DAILY_MAX_AGE_HOURS * 3600
+    return INTRADAY_MAX_AGE_MINUTES * 60
+
+def _fetch(ticker: str, interval: str, start: pd.Timestamp | None) -> tuple[pd.DataFrame, str | None]:
+    """Barres Yahoo avec Date en heure locale naïve + fuseau de la place"""
+    t = yf.Ticker(ticker)
+    if start is None:
+        df = t.history(period=INTRADAY_PERIOD.get(interval, "max"), interval=interval)
+    else:
+        # on repart du jour de la dernière barre : elle peut être incomplète (séance en cours)
+        df = t.history(start=start.strftime("%Y-%m-%d"), interval=interval)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["Date"]), None
+    df = df.reset_index().rename(columns={"Datetime": "Date"})
+    dates = pd.to_datetime(df["Date"])
+    tz = str(dates.dt.tz) if dates.dt.tz is not None else None
+    # un seul type de colonne pour tous les tickers du dataset : heure locale sans fuseau
+    df["Date"] = dates.dt.tz_localize(None) if tz else dates
+    return df[[c for c in KEEP if c in df.columns]], tz
+
+def _stored_anchor(ticker: str, interval: str, last_bar: pd.Timestamp) -> tuple[pd.Timestamp, float] | None:
+    """Dernière barre complète en cache avant last_bar (date, clôture) : point de contrôle des ajustements"""
+    table = read_history([ticker], interval, start=last_bar - pd.Timedelta(days=14), columns=["Close"])
+    df = table.to_pandas()
+    df = df[(df["Date"] < last_bar) & df["Close"].notna()] if not df.empty else df
+    if df.empty:
+        return None
+    return df["Date"].iloc[-1], float(df["Close"].iloc[-1])
+
+def _adjusted_since(anchor: tuple[pd.Timestamp, float] | None, fresh: pd.DataFrame) -> bool:
+    """
+    Les clôtures Yahoo sont ajustées à la date du téléchargement : après un split ou un dividende,
+    la barre de contrôle rechargée ne vaut plus la valeur stockée -> tout l'historique est à refaire
+    """
+    if anchor is None or fresh.empty or "Close" not in fresh.columns:
+        return False
+    date, stored = anchor
+    match = fresh.loc[fresh["Date"] == date, "Close"]
+    if match.empty or pd.isna(match.iloc[0]):
+        return False
+    return abs(float(match.iloc[0]) / stored - 1) > ADJUSTMENT_TOLERANCE
+
+def _rewrite_all(ticker: str, interval: str, bars: pd.DataFrame):
+    """
+    Remplace toutes les partitions du ticker (historique ré-ajusté) sans les retirer sous les lecteurs :
+    toutes les années sont d'abord écrites à côté (.tmp, ignorés par read_history), puis substituées
+    par os.replace ; les années absentes du nouvel historique sont supprimées en dernier
+    """
+    staged = []
+    try:
+        for year, chunk in bars.groupby(bars["Date"].dt.year):
+            path = _year_path(ticker, interval, int(year))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = _tmp_path(path)
+            pq.write_table(pa.Table.from_pandas(chunk, preserve_index=False), tmp)
+            staged.append((tmp, path))
+    except Exception:
+        for tmp, _ in staged:
+            tmp.unlink(missing_ok=True)
+        raise
+    for tmp, path in staged:
+        os.replace(tmp, path)
+    kept = {path.parent for _, path in staged}
+    for year_dir in _ticker_dir(ticker, interval).glob("year=*"):
+        if year_dir not in kept:
+            shutil.rmtree(year_dir, ignore_errors=True)
+
+def _merge(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+    if fresh.empty:
+        return cached
+    merged = pd.concat([cached, fresh], ignore_index=True)
+    merged = merged.drop_duplicates(subset="Date", keep="last").sort_values("Date")
+    return merged.reset_index(drop=True)
+
+
+def refresh_history(ticker: str, interval: str = "1d", max_age: float | None = None) -> dict | None:
+    """
+    - Rien à faire si la série a été vérifiée il y a moins de max_age secondes
+    - Sinon ne télécharge que les barres depuis la dernière en cache et réécrit leurs années
+    - Premier appel : historique complet
+    Retourne l'entrée de manifest ({last_bar, checked_at, tz}) ou None si aucune donnée
+    """
+    key = _key(ticker, interval)
+    max_age = _max_age_seconds(interval) if max_age is None else max_age
+
+    with _lock_for(key):
+        entry = _read_manifest_entry(key)
+        if entry and time.time() - entry["checked_at"] < max_age:
+            return entry
+
+        start = pd.Timestamp(entry["last_bar"]) if entry else None
+        try:
+            # on recharge aussi la barre complète précédente pour détecter un ajustement (split, dividende)
+            anchor = _stored_anchor(ticker, interval, start) if start is not None else None
+            fresh, tz = _fetch(ticker, interval, anchor[0] if anchor else start)
+            if _adjusted_since(anchor, fresh):
+                print(f"🔁 {ticker} {interval}: historique ré-ajusté par Yahoo, rechargement complet")
+                full, tz = _fetch(ticker, interval, None)
+                if not full.empty:
+                    _rewrite_all(ticker, interval, full)
+                    entry = {"last_bar": full["Date"].iloc[-1].isoformat(), "checked_at": time.time(),
+                             "tz": tz or entry.get("tz")}
+                    _write_manifest_entry(key, entry)
+                    return entry
+        except Exception as e:
+            if entry:
+                print(f"❌ Rafraîchissement {ticker} {interval}: {e}")
+                return entry
+            raise
+
+        if fresh.empty:
+            if entry:
+                # pas de nouvelle barre (week-end, jour férié) : on note seulement la vérification
+                entry = {**entry, "checked_at": time.time()}
+                _write_manifest_entry(key, entry)
+            return entry
+        _write_years(ticker, interval, fresh)
+        last_bar = fresh["Date"].iloc[-1] if start is None else max(start, fresh["Date"].iloc[-1])
+        entry = {
+            "last_bar": last_bar.isoformat(),
+            "checked_at": time.time(),
+            "tz": tz or (entry or {}).get("tz"),
+        }
+        _write_manifest_entry(key, entry)
+        return entry
+
+
+# ---------- lecture ----------
+def read_history(tickers: list, interval: str = "1d", start=None, end=None,
+                 columns: list | None = None) -> pa.Table:
+    """
+    Table Arrow multi-tickers (colonne ticker) lue depuis le dataset :
+    élagage des partitions (ticker, année) puis filtre Date poussé au lecteur Parquet
+    """
+    predicate = None
+    if start is not None:
+        predicate = ds.field("Date") >= pd.Timestamp(start).to_datetime64()
+    if end is not None:
+        upper = ds.field("Date") <= pd.Timestamp(end).to_datetime64()
+        predicate = upper if predicate is None else predicate & upper
+    if columns is not None:
+        columns = list(dict.fromkeys(["Date", *columns, "ticker"]))
+    for attempt in range(2):
+        files = _partition_files(tickers, interval, start, end)
+        if not files:
+            return pa.table({"Date": pa.array([], pa.timestamp("ns")), "ticker": pa.array([], pa.string())})
+        try:
+            dataset = ds.dataset(files, format="parquet", filesystem=_FS,
+                                 partitioning=_PARTITIONING, partition_base_dir=str(_interval_dir(interval)))
+            table = dataset.to_table(columns=columns, filter=predicate)
+            break
+        except FileNotFoundError:
+            # année retirée par _rewrite_all entre le listage et la lecture : on relit la liste
+            if attempt:
+                raise
+    return table.sort_by([("ticker", "ascending"), ("Date", "ascending")])
+
+
+def load_history(ticker: str, interval: str = "1d", max_age: float | None = None,
+                 start=None, lookback: pd.DateOffset | None = None,
+                 columns: list | None = None) -> pd.DataFrame:
+    """
+    DataFrame d'un ticker (Date dans le fuseau de sa place), rafraîchi au besoin.
+    lookback : fenêtre relative à la dernière barre (ex. pd.DateOffset(years=1))
+    """
+    entry = refresh_history(ticker, interval, max_age)
+    if entry is None:
+        return pd.DataFrame(columns=["Date"])
+    if lookback is not None:
+        start = pd.Timestamp(entry["last_bar"]) - lookback
+    elif start is not None:
+        start = pd.Timestamp(start)
+        if start.tzinfo is not None:
+            start = start.tz_convert(entry.get("tz") or "UTC").tz_localize(None)
+
+    table = read_history([ticker], interval, start=start, columns=columns)
+    df = table.drop(["ticker", "year"] if "year" in table.column_names else ["ticker"]) \
+        .to_pandas(split_blocks=True, self_destruct=True)
+    if entry.get("tz"):
+        df["Date"] = df["Date"].dt.tz_localize(entry["tz"])
+    return df
+
+
+def history_close_matrix(tickers: list, start=None, end=None,
+                         max_workers: int = HISTORY_MAX_WORKERS) -> pd.DataFrame:
+    """
+    Clôtures (dates x tickers) alignées sur la date locale de chaque place, en une lecture.
+    Les tickers sont rafraîchis en parallèle (au plus max_workers téléchargements Yahoo en vol).
+    """
+    if tickers:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+            list(pool.map(refresh_history, tickers))
+    table = read_history(tickers, "1d", start=start, end=end, columns=["Close"])
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    if df.empty:
+        return pd.DataFrame(columns=list(tickers), dtype=float)
+    df["Date"] = df["Date"].dt.normalize()
+    return df.pivot_table(index="Date", columns="ticker", values="Close", aggfunc="last") \
+        .reindex(columns=list(tickers))
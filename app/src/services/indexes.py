@@ -0,0 +1,121 @@
+# app/src/services/indexes.py
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta
+
+from app.db import session_scope
+from app.src.services.compute import get_indexes_list, iter_batch_quotes, quote_rows, update_indexes_metrics
+
+# cadence du rafraîchissement de la table indexes (0 = désactivé)
+INDEX_REFRESH_SECONDS = int(os.getenv("INDEX_REFRESH_SECONDS", "300"))
+
+
+class IndexRefresher:
+    """
+    - Rafraîchit la table indexes dans un thread de fond toutes les `interval` secondes
+    - trigger() demande un rafraîchissement anticipé sans bloquer l'appelant
+    - as_of : date du dernier rafraîchissement ayant écrit au moins une cotation
+    - subscribe() : file asyncio recevant {"event": "update", "rows"} à chaque lot de cotations
+      écrit en base, {"event": "error", "detail"} si rien n'a pu être écrit,
+      puis {"event": "done", "as_of"} en fin de rafraîchissement
+    """
+
+    def __init__(self, interval: int = INDEX_REFRESH_SECONDS):
+        self.interval = interval
+        self.as_of: datetime | None = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._listeners: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._listeners_lock = threading.Lock()
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="index-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def is_stale(self) -> bool:
+        if self.as_of is None:
+            return True
+        return datetime.now() - self.as_of > timedelta(seconds=self.interval)
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def trigger(self):
+        self._wake.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """À appeler depuis la boucle asyncio qui lira la file"""
+        queue = asyncio.Queue()
+        with self._listeners_lock:
+            self._listeners[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._listeners_lock:
+            self._listeners.pop(queue, None)
+
+    def _publish(self, event: dict):
+        with self._listeners_lock:
+            listeners = list(self._listeners.items())
+        for queue, loop in listeners:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:  # boucle fermée
+                self.unsubscribe(queue)
+
+    def refresh(self) -> bool:
+        """
+        Un seul rafraîchissement à la fois : un appel concurrent est ignoré.
+        as_of n'avance que si des lignes ont été écrites : après une panne (Yahoo, base),
+        les données restent périmées et le prochain /home relance un rafraîchissement.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        written = 0
+        try:
+            # un lot de cotations est écrit et publié dès qu'il arrive ; une seule session,
+            # la connexion retourne au pool à chaque commit, pendant les téléchargements
+            with session_scope() as db:
+                for tickers, quotes in iter_batch_quotes(get_indexes_list(db)):
+                    rows = quote_rows(tickers, quotes)
+                    if update_indexes_metrics(rows, db):
+                        written += 1
+                        self._publish({"event": "update", "rows": [r for r in rows if r["price"] is not None]})
+            if not written:
+                raise RuntimeError("aucune cotation écrite")
+            self.as_of = datetime.now()
+            return True
+        except Exception as e:
+            print(f"❌ Rafraîchissement des indices: {e}")
+            self._publish({"event": "error", "detail": str(e)})
+            return False
+        finally:
+            self._lock.release()
+            self._publish({"event": "done", "as_of": self.as_of.isoformat() if self.as_of else None})
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+refresher = IndexRefresher()
@@ -0,0 +1,152 @@
+# app/src/services/indicators.py
+import asyncio
+import math
+import os
+
+import numpy as np
+
+from app.src.services.compute import ticker_benchmark
+from app.src.services.fundamentals import fundamentals_snapshot
+from app.src.services.history import refresh_history
+from app.src.services.cache import get_cache
+from app.src.services.executors import ExecutorSaturated, run_io, run_cpu
+from app.src.services.coalesce import SingleFlight
+from app.src.services.compute_pool import COMPUTE_POOL, run_compute
+from app.src.services.metric_graph import evaluate, resolve_inputs, dependencies
+
+
+def _native(value):
+    """Scalaire NumPy -> type Python ; NaN et ±Inf -> None (comme orjson à la sérialisation)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    elif isinstance(value, np.ndarray):
+        return [_native(v) for v in value.tolist()]
+    elif isinstance(value, dict):
+        return {k: _native(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_native(v) for v in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def clean_indicators(ticker: str, p: float = 0.05, n: int = 14, rf_ann: float = 0.02,
+                     metrics: list | None = None, inputs: dict | None = None) -> dict:
+    """
+    Métriques demandées (toutes par défaut) en types Python natifs, en une passe :
+    NaN et ±Inf -> None ; inputs : sortie de resolve_inputs
+    """
+    return {key: _native(value)
+            for key, value in evaluate(ticker, metrics, p=p, n=n, rf_ann=rf_ann, inputs=inputs).items()}
+
+
+def indicator_version(ticker: str, metrics: list | None = None) -> tuple:
+    """
+    Version des données d'entrée : dernière barre du ticker et de son benchmark,
+    date du snapshot de fondamentaux. Change dès qu'une nouvelle barre ou publication arrive.
+    Pour un sous-ensemble de métriques, seules les entrées de son sous-graphe comptent (None sinon).
+    """
+    needed = dependencies(metrics)
+    ticker_bar = market_bar = fetched_at = None
+    if "history" in needed:
+        ticker_bar = (refresh_history(ticker) or {}).get("last_bar")
+    if "benchmark_history" in needed:
+        market = ticker_benchmark(ticker)['index']
+        market_bar = (refresh_history(market) or {}).get("last_bar")
+    if needed & {"info", "statements"}:
+        fetched_at = fundamentals_snapshot(ticker)["fetched_at"]
+    return ticker_bar, market_bar, fetched_at
+
+
+# tickers calculés simultanément par un batch (borne les appels Yahoo en vol)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# résultats par (ticker, p, n, rf_ann, version) ; le TTL borne l'âge du prix affiché
+_results = get_cache("indicators", ttl=900, max_bytes=32 * 2**20)
+
+# requêtes simultanées sur la même clé : un seul calcul partagé
+indicator_flight = SingleFlight("indicators")
+# idem pour la lecture de version (refresh_history / fundamentals_snapshot) d'un même ticker
+version_flight = SingleFlight("indicator_version")
+VERSION_INPUTS = frozenset({"history", "benchmark_history", "info", "statements"})
+
+
+async def _version(ticker: str, metrics: list | None = None) -> tuple:
+    """indicator_version partagée entre requêtes simultanées ayant les mêmes entrées"""
+    key = (ticker, frozenset(dependencies(metrics) & VERSION_INPUTS))
+    return await version_flight.do(key, lambda: run_io(indicator_version, ticker, metrics))
+
+
+async def _compute(key: tuple, ticker: str, p: float, n: int, rf_ann: float,
+                   metrics: list | None = None) -> dict:
+    inputs = await run_io(resolve_inputs, ticker, metrics)
+    if COMPUTE_POOL.enabled:
+        data = await run_compute(ticker, p, n, rf_ann, inputs, metrics)
+    else:
+        data = await run_cpu(clean_indicators, ticker, p, n, rf_ann, metrics, inputs)
+    _results.set(key, data)
+    return data
+
+
+async def compute_indicators(ticker: str, p: float = 0.05, n: int = 14, rf_ann: float = 0.02) -> dict:
+    """
+    - Résultat en cache tant que la version des données (indicator_version) n'a pas bougé
+    - Sinon téléchargements sur le pool I/O, puis calcul dans un process de COMPUTE_POOL
+      (pool CPU du process web si COMPUTE_PROCESSES=0)
+    Retourne {data, as_of, cached} ; data peut être partagé entre requêtes : ne pas le modifier.
+    """
+    version = await _version(ticker)
+    key = (ticker, p, n, rf_ann, *version)
+    data = _results.get(key)
+    cached = data is not None
+    if not cached:
+        data = await indicator_flight.do(key, lambda: _compute(key, ticker, p, n, rf_ann))
+    return {"data": data, "as_of": version[0], "cached": cached}
+
+
+async def compute_metrics(ticker: str, metrics: list, p: float = 0.05, n: int = 14,
+                          rf_ann: float = 0.02) -> dict:
+    """
+    compute_indicators restreint à quelques métriques : seules leurs entrées sont
+    téléchargées et seuls leurs nœuds évalués. Même cache, clé suffixée par les métriques.
+    """
+    metrics = list(dict.fromkeys(metrics))
+    version = await _version(ticker, metrics)
+    key = (ticker, p, n, rf_ann, *version, tuple(metrics))
+    data = _results.get(key)
+    cached = data is not None
+    if not cached:
+        data = await indicator_flight.do(key, lambda: _compute(key, ticker, p, n, rf_ann, metrics))
+    return {"data": data, "as_of": version[0], "cached": cached}
+
+
+async def _batch_item(ticker: str, p: float, n: int, rf_ann: float, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        try:
+            result = await compute_indicators(ticker, p, n, rf_ann)
+        except KeyError as e:
+            return {"ticker": ticker, "status": 404, "error": f"Ticker '{ticker}' introuvable ou données manquantes: {e}"}
+        except ExecutorSaturated as e:
+            return {"ticker": ticker, "status": 503, "error": f"Serveur saturé, réessayez: {e}"}
+        except Exception as e:
+            return {"ticker": ticker, "status": 500, "error": f"Erreur lors du calcul des indicateurs: {e}"}
+    return {"ticker": ticker, "status": 200, **result}
+
+
+async def stream_indicators(tickers: list, p: float = 0.05, n: int = 14, rf_ann: float = 0.02,
+                            concurrency: int = BATCH_CONCURRENCY):
+    """
+    - compute_indicators pour chaque ticker (dédoublonnés), au plus `concurrency` à la fois
+    - Produit un dict par ticker dès qu'il est prêt, dans l'ordre de fin
+    - Une erreur sur un ticker est rapportée dans sa ligne (status, error) sans arrêter le batch
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    slots = asyncio.Semaphore(max(1, concurrency))
+    tasks = [asyncio.ensure_future(_batch_item(t, p, n, rf_ann, slots)) for t in tickers]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # client déconnecté : on n'engage pas de calculs pour rien
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,144 @@
+# app/src/services/live_quotes.py
+"""
+Diffusion des cotations en direct : une seule boucle d'interrogation Yahoo par ticker suivi,
+quel que soit le nombre de connexions abonnées. Chaque abonné ne garde que la dernière
+cotation non envoyée par ticker : un client lent reçoit moins de ticks, jamais une file sans fin.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+
+from app.src.services.compute import _yf_ticker
+from app.src.services.executors import run_io
+
+LIVE_QUOTE_INTERVAL = float(os.getenv("LIVE_QUOTE_INTERVAL", "5"))
+LIVE_MAX_TICKERS = int(os.getenv("LIVE_MAX_TICKERS", "100"))  # par connexion
+LIVE_SEND_TIMEOUT = float(os.getenv("LIVE_SEND_TIMEOUT", "10"))  # au-delà le client est déconnecté
+
+
+def poll_quote(ticker: str) -> dict | None:
+    """Dernier prix (barres 1 min du jour, sinon fast_info) et clôture de veille"""
+    t = _yf_ticker(ticker)
+    fi = t.fast_info
+    eve_price = fi.get("previous_close")
+    bars = t.history(period="1d", interval="1m")
+    price = float(bars["Close"].iloc[-1]) if not bars.empty else fi.get("last_price")
+    if price is None:
+        return None
+    return {
+        "ticker": ticker,
+        "price": price,
+        "eve_price": eve_price,
+        "performance": (price - eve_price) / eve_price * 100 if eve_price else None,
+    }
+
+
+class Subscriber:
+    """Une connexion : tickers suivis et dernières cotations en attente d'envoi (conflation)"""
+
+    def __init__(self):
+        self.tickers: set[str] = set()
+        self._pending: dict[str, dict] = {}
+        self._ready = asyncio.Event()
+        self.conflated = 0
+
+    def offer(self, quote: dict):
+        if quote["ticker"] in self._pending:
+            self.conflated += 1
+        self._pending[quote["ticker"]] = quote
+        self._ready.set()
+
+    async def next_batch(self) -> list:
+        await self._ready.wait()
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class QuoteHub:
+    """
+    - subscribe / unsubscribe : à appeler depuis la boucle asyncio (pas de verrou nécessaire)
+    - Une tâche d'interrogation par ticker, démarrée au premier abonné, arrêtée au dernier départ
+    - Un nouvel abonné reçoit tout de suite la dernière cotation connue
+    """
+
+    def __init__(self, interval: float = LIVE_QUOTE_INTERVAL, fetch=poll_quote):
+        self.interval = interval
+        self._fetch = fetch
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._last: dict[str, dict] = {}
+        self.connections = 0
+        self.polls = self.errors = self.fanned_out = 0
+        self.conflated = self.slow_disconnects = 0  # mis à jour à la fermeture des connexions
+
+    def subscribe(self, sub: Subscriber, tickers: list):
+        for ticker in tickers:
+            if ticker in sub.tickers:
+                continue
+            sub.tickers.add(ticker)
+            self._subscribers.setdefault(ticker, set()).add(sub)
+            if ticker in self._last:
+                sub.offer(self._last[ticker])
+            if ticker not in self._tasks:
+                self._tasks[ticker] = asyncio.create_task(self._poll(ticker))
+
+    def unsubscribe(self, sub: Subscriber, tickers: list | None = None):
+        for ticker in list(sub.tickers if tickers is None else tickers):
+            sub.tickers.discard(ticker)
+            subs = self._subscribers.get(ticker)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[ticker]
+
+    async def _poll(self, ticker: str):
+        seq = 0
+        try:
+            while self._subscribers.get(ticker):
+                try:
+                    quote = await run_io(self._fetch, ticker)
+                    self.polls += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Cotation live {ticker}: {e}")
+                    quote = None
+                if quote is not None:
+                    seq += 1
+                    previous = self._last.get(ticker)
+                    quote = {**quote, "seq": seq, "ts": time.time()}
+                    self._last[ticker] = quote
+                    if previous is None or previous["price"] != quote["price"]:
+                        subs = list(self._subscribers.get(ticker, ()))
+                        for sub in subs:
+                            sub.offer(quote)
+                        self.fanned_out += len(subs)
+                await asyncio.sleep(self.interval)
+        finally:
+            self._tasks.pop(ticker, None)
+            if ticker not in self._subscribers:
+                self._last.pop(ticker, None)
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "tickers": len(self._tasks),
+            "subscriptions": sum(len(s) for s in self._subscribers.values()),
+            "interval": self.interval,
+            "polls": self.polls,
+            "errors": self.errors,
+            "fanned_out": self.fanned_out,
+            "conflated": self.conflated,
+            "slow_disconnects": self.slow_disconnects,
+        }
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+hub = QuoteHub()
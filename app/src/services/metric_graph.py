@@ -0,0 +1,401 @@
+# app/src/services/metric_graph.py
+"""
+Indicateurs de ticker_indicators sous forme de graphe de nœuds nommés.
+Chaque nœud déclare ses entrées ; évaluer une métrique ne calcule que son
+sous-graphe, les nœuds partagés (historiques, info, états financiers...) une seule fois.
+Les nœuds io=True sont les seuls à accéder au réseau ou au disque.
+"""
+from __future__ import annotations
+import warnings
+
+import numpy as np
+
+from app.src.services.compute import _yf_ticker, _yrl_history, _history_close, _dividends, \
+    ticker_benchmark, ticker_market, ttm_sum, safe_df, earnings_yield_from_info, \
+    trailing_12m_dividend, estimate_g_sgr, equity_duration_proxy, rate_beta
+from app.src.services.fundamentals import fundamentals_snapshot, STATEMENT_ROWS
+from app.src.services.risk import close_by_date, simple_returns, total_return, volatility, \
+    max_drawdown, var_cvar, rsi, benchmark_stats
+
+
+class Node:
+    __slots__ = ("name", "deps", "fn", "io")
+
+    def __init__(self, name: str, deps: tuple, fn, io: bool):
+        self.name, self.deps, self.fn, self.io = name, deps, fn, io
+
+
+NODES: dict[str, Node] = {}
+METRICS: list[str] = []  # sorties publiques, dans l'ordre historique de ticker_indicators
+
+
+def node(name: str, *deps: str, io: bool = False, metric: bool = False):
+    def register(fn):
+        NODES[name] = Node(name, deps, fn, io)
+        if metric:
+            METRICS.append(name)
+        return fn
+    return register
+
+def metric(name: str, *deps: str):
+    return node(name, *deps, metric=True)
+
+
+# ---------- entrées (réseau / caches) ----------
+@node("info", io=True)
+def _info(ctx):
+    return fundamentals_snapshot(ctx.ticker)["info"]
+
+@node("statements", io=True)
+def _statements(ctx):
+    statements = fundamentals_snapshot(ctx.ticker)["statements"]
+    return {name: safe_df(statements.get(name)) for name in STATEMENT_ROWS}
+
+@node("quote", io=True)
+def _quote(ctx):
+    fi = _yf_ticker(ctx.ticker).fast_info
+    return {"price": getattr(fi, "last_price", None), "previous_close": fi.get("previous_close")}
+
+@node("benchmark", io=True)
+def _benchmark(ctx):
+    return ticker_benchmark(ctx.ticker)['index']
+
+@node("exchange", io=True)
+def _exchange(ctx):
+    return ticker_market(ctx.ticker)
+
+@node("history", io=True)
+def _history(ctx):
+    return _yrl_history(ctx.ticker)
+
+@node("benchmark_history", "benchmark", io=True)
+def _benchmark_history(ctx, market):
+    return _yrl_history(market)
+
+@node("dividends", io=True)
+def _dividends_in(ctx):
+    dividends = _dividends(ctx.ticker)
+    if dividends is None or dividends.empty:
+        hist = _yf_ticker(ctx.ticker).history(period="10y", auto_adjust=False)
+        dividends = hist["Dividends"]
+    return dividends
+
+@node("rate_history", "benchmark", io=True)
+def _rate_history(ctx, market):
+    return _history_close(ctx.ticker), _history_close(market)
+
+
+# ---------- nœuds intermédiaires ----------
+@node("close", "history")
+def _close(ctx, history):
+    return close_by_date(history).sort_index()
+
+@node("market_close", "benchmark_history")
+def _market_close(ctx, history):
+    return close_by_date(history).dropna().sort_index()
+
+@node("returns", "close")
+def _returns(ctx, close):
+    return simple_returns(close)
+
+@node("market_returns", "close", "market_close")
+def _market_returns(ctx, close, market_close):
+    return market_close.pct_change().reindex(close.index).to_numpy(dtype=float)
+
+@node("total_return", "close")
+def _total_return(ctx, close):
+    return total_return(close)[0]
+
+@node("volatility", "returns")
+def _volatility(ctx, returns):
+    return volatility(returns)
+
+@node("var_cvar", "returns")
+def _var_cvar(ctx, returns):
+    return var_cvar(returns, ctx.p)
+
+@node("benchmark_stats", "returns", "market_returns")
+def _benchmark_stats(ctx, returns, market_returns):
+    return benchmark_stats(returns, market_returns, ctx.rf_ann)
+
+@node("price", "quote")
+def _price(ctx, quote):
+    return quote["price"]
+
+@node("eve_price", "quote", "history")
+def _eve_price(ctx, quote, history):
+    eve_price = quote["previous_close"]
+    if eve_price is None:
+        try:
+            if not history.empty:
+                eve_price = history["Close"].iloc[-2]
+        except Exception:
+            pass
+    return eve_price
+
+# FCF TTM (trimestriel)
+@node("fcf_ttm", "statements")
+def _fcf_ttm(ctx, statements):
+    return ttm_sum(statements["quarterly_cashflow"], "Free Cash Flow")
+
+# Net Income TTM (fallback annuel)
+@node("ni_ttm", "statements")
+def _ni_ttm(ctx, statements):
+    fin_a = statements["income_stmt"]
+    ni_ttm = ttm_sum(statements["quarterly_income_stmt"], "Net Income")
+    if np.isnan(ni_ttm) and not fin_a.empty and "Net Income" in fin_a.index:
+        ni_ttm = float(fin_a.loc["Net Income"].iloc[0])
+    return ni_ttm
+
+# Equity (dernier bilan)
+@node("equity", "statements")
+def _equity(ctx, statements):
+    bs_a, bs_q = statements["balance_sheet"], statements["quarterly_balance_sheet"]
+    if not bs_a.empty and "Stockholders Equity" in bs_a.index:
+        return float(bs_a.loc["Stockholders Equity"].iloc[0])
+    if not bs_q.empty and "Stockholders Equity" in bs_q.index:
+        return float(bs_q.loc["Stockholders Equity"].iloc[0])
+    return None
+
+# ROE ≈ NI_TTM / Equity
+@node("roe_ratio", "ni_ttm", "equity")
+def _roe_ratio(ctx, ni_ttm, equity):
+    return (ni_ttm / equity) if (not np.isnan(ni_ttm) and not np.isnan(equity) and equity != 0) else None
+
+@node("earning_yield_ratio", "info", "price")
+def _earning_yield_ratio(ctx, info, price):
+    return earnings_yield_from_info(info, price)
+
+@node("dividend_yield_ratio", "dividends", "price")
+def _dividend_yield_ratio(ctx, dividends, price):
+    div_ttm = trailing_12m_dividend(dividends)
+    return (div_ttm / price) if (div_ttm and price) else None
+
+# FCF yield = FCF / MarketCap
+@node("fcf_yield_ratio", "fcf_ttm", "info")
+def _fcf_yield_ratio(ctx, fcf_ttm, info):
+    market_cap = info.get("marketCap", None)
+    return (fcf_ttm / market_cap) if (
+            not np.isnan(fcf_ttm) and not np.isnan(market_cap) and market_cap > 0) else None
+
+@node("g_sgr", "roe_ratio", "info")
+def _g_sgr(ctx, roe, info):
+    return estimate_g_sgr(roe, info["payoutRatio"])
+
+
+# ---------- métriques publiques (ordre de la réponse) ----------
+@metric("Full Name", "info")
+def _full_name(ctx, info):
+    return info['longName']
+
+@metric("sector", "info")
+def _sector(ctx, info):
+    return info.get("sector")
+
+@metric("industry", "info")
+def _industry(ctx, info):
+    return info.get("industry")
+
+@metric("type", "info")
+def _type(ctx, info):
+    return info.get("quoteType")
+
+@metric("Price", "price")
+def _price_out(ctx, price):
+    return round(price, 2)
+
+@metric("Ticker eve price", "eve_price")
+def _eve_price_out(ctx, eve_price):
+    return round(eve_price, 2)
+
+@metric("Ticker performance", "price", "eve_price")
+def _performance(ctx, price, eve_price):
+    return round((eve_price - price) / eve_price * 100, 2)
+
+@metric("market", "benchmark")
+def _market(ctx, market):
+    return market
+
+@metric("Benchmark", "exchange")
+def _exchange_out(ctx, exchange):
+    return exchange
+
+@metric("eps", "statements")
+def _eps(ctx, statements):
+    return statements["income_stmt"].loc['Diluted EPS', :].iloc[0]
+
+@metric("payout ratio", "info")
+def _payout_ratio(ctx, info):
+    return info["payoutRatio"]
+
+@metric("ebitda", "statements")
+def _ebitda(ctx, statements):
+    return statements["income_stmt"].loc['EBITDA', :].iloc[0]
+
+@metric("shares outstanding", "info")
+def _shares_outstanding(ctx, info):
+    return info['sharesOutstanding']
+
+@metric("ticker total return", "total_return")
+def _total_return_out(ctx, value):
+    return round(value, 4)
+
+@metric("market return", "market_close")
+def _market_return(ctx, market_close):
+    if market_close.empty:
+        return np.nan
+    return round(market_close.iloc[-1] / market_close.iloc[0] - 1, 4)
+
+@metric("price earning ratio", "price", "eps")
+def _pe(ctx, price, eps):
+    return round(price / eps, 2)
+
+@metric("book value", "info")
+def _book_value(ctx, info):
+    return info['bookValue']
+
+@metric("price to book ratio", "price", "book value")
+def _pb(ctx, price, book_value):
+    return round(price / book_value, 2)
+
+@metric("expected return", "benchmark_stats")
+def _expected_return(ctx, stats):
+    return round(stats["expected return"][0], 4)
+
+@metric("cagr", "close", "total_return")
+def _cagr(ctx, close, ticker_total_return):
+    returns = close.pct_change().dropna()
+    n_years = (returns.index[-1] - returns.index[0]).days / 365.25
+    growth_rate = (1 + ticker_total_return) ** (1 / n_years) - 1 if n_years > 0 else None
+    return round(growth_rate, 4)
+
+@metric("roe", "roe_ratio")
+def _roe(ctx, roe):
+    return round(roe * 100, 2)
+
+@metric("dividend yield", "dividend_yield_ratio")
+def _dividend_yield(ctx, value):
+    return value
+
+# FCF annuel, seulement si le TTM trimestriel manque
+@metric("financial cash flow", "statements", "fcf_ttm")
+def _financial_cash_flow(ctx, statements, fcf_ttm):
+    cf_a = statements["cashflow"]
+    if np.isnan(fcf_ttm) and not cf_a.empty and "Free Cash Flow" in cf_a.index:
+        return float(cf_a.loc["Free Cash Flow"].iloc[0])
+    return None
+
+# P/CF (par action) -> Price / (FCF/share)
+@metric("Price to Cash Flow Ratio", "fcf_ttm", "info", "price")
+def _price_to_cash_flow(ctx, fcf_ttm, info, price):
+    shares_outstanding = info['sharesOutstanding']
+    if (not np.isnan(fcf_ttm)) and (not np.isnan(shares_outstanding)) and shares_outstanding > 0:
+        fcf_per_share = fcf_ttm / shares_outstanding
+        if fcf_per_share != 0:
+            return price / fcf_per_share
+    return None
+
+@metric("earning yield", "earning_yield_ratio")
+def _earning_yield(ctx, value):
+    return round(value * 100, 2)
+
+@metric("financial cash flow yield", "fcf_yield_ratio")
+def _fcf_yield(ctx, value):
+    return value
+
+@metric("duration dividends", "dividend_yield_ratio", "g_sgr")
+def _duration_div(ctx, value, g):
+    return equity_duration_proxy(value, g)
+
+@metric("duration financial cash flow", "fcf_yield_ratio", "g_sgr")
+def _duration_fcf(ctx, value, g):
+    return equity_duration_proxy(value, g)
+
+@metric("duration earning", "earning_yield_ratio", "g_sgr")
+def _duration_earning(ctx, value, g):
+    return equity_duration_proxy(value, g)
+
+# Sensibilité aux taux (rate beta, 10 ans)
+@metric("market sensibility", "rate_history")
+def _rate_beta(ctx, rate_history):
+    stock_close, market_close = rate_history
+    return rate_beta(stock_close, market_close)
+
+@metric("annual volatility", "volatility")
+def _annual_volatility(ctx, vol):
+    return vol[1][0]
+
+@metric("daily volatility", "volatility")
+def _daily_volatility(ctx, vol):
+    return vol[0][0]
+
+@metric("drawdown", "close")
+def _drawdown(ctx, close):
+    return max_drawdown(close)[0]
+
+@metric("var95", "var_cvar")
+def _var95(ctx, var):
+    return var[0][0]
+
+@metric("cvar95", "var_cvar")
+def _cvar95(ctx, var):
+    return var[1][0]
+
+@metric("rsi", "close")
+def _rsi(ctx, close):
+    return rsi(close, ctx.n)[0]
+
+
+def _stat(key: str):
+    metric(key, "benchmark_stats")(lambda ctx, stats: stats[key][0])
+
+for _key in ("daily alpha", "ticker beta 1year", "R²", "alpha 1year percent", "tracking error",
+             "information ratio", "treynor", "sharpe ratio", "sortino"):
+    _stat(_key)
+del _key
+
+
+# ---------- évaluation ----------
+class Context:
+    """Valeurs déjà calculées pour un (ticker, p, n, rf_ann) ; `inputs` pré-remplit des nœuds"""
+
+    def __init__(self, ticker: str, p: float = 0.05, n: int = 14, rf_ann: float = 0.02,
+                 inputs: dict | None = None):
+        self.ticker, self.p, self.n, self.rf_ann = ticker, p, n, rf_ann
+        self.values = dict(inputs or {})
+
+    def get(self, name: str):
+        if name not in self.values:
+            current = NODES[name]
+            self.values[name] = current.fn(self, *(self.get(dep) for dep in current.deps))
+        return self.values[name]
+
+
+def dependencies(names: list | None = None) -> set:
+    """Fermeture des nœuds nécessaires aux métriques demandées"""
+    pending = list(METRICS if names is None else names)
+    seen = set()
+    while pending:
+        name = pending.pop()
+        if name not in seen:
+            seen.add(name)
+            pending.extend(NODES[name].deps)
+    return seen
+
+
+def resolve_inputs(ticker: str, names: list | None = None) -> dict:
+    """Charge uniquement les entrées I/O du sous-graphe (à exécuter sur le pool I/O)"""
+    ctx = Context(ticker)
+    for name in dependencies(names):
+        if NODES[name].io:
+            ctx.get(name)
+    return {name: value for name, value in ctx.values.items() if NODES[name].io}
+
+
+def evaluate(ticker: str, names: list | None = None, p: float = 0.05, n: int = 14,
+             rf_ann: float = 0.02, inputs: dict | None = None) -> dict:
+    """{métrique: valeur} pour les métriques demandées (toutes par défaut)"""
+    ctx = Context(ticker, p, n, rf_ann, inputs)
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {name: ctx.get(name) for name in (METRICS if names is None else names)}
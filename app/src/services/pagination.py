@@ -0,0 +1,45 @@
+# app/src/services/pagination.py
+"""
+Pagination par curseur (keyset) et validation de cache :
+- le curseur encode la clé de tri (created_at, id) de la dernière ligne renvoyée
+- la page suivante reprend strictement après cette clé : coût constant quelle que soit la profondeur
+- ETag calculé sur le contenu de la page : If-None-Match identique -> 304
+"""
+from __future__ import annotations
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime
+
+WALLET_PAGE_SIZE = int(os.getenv("WALLET_PAGE_SIZE", "100"))
+WALLET_PAGE_MAX = int(os.getenv("WALLET_PAGE_MAX", "500"))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """ValueError si le curseur n'a pas été produit par encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"curseur invalide: {cursor}") from e
+
+
+def page_etag(rows: list, next_cursor: str | None) -> str:
+    """ETag faible : même contenu (et même suite) -> même valeur"""
+    payload = json.dumps([rows, next_cursor], default=str, separators=(",", ":"))
+    return f'W/"{hashlib.sha1(payload.encode()).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip() for t in if_none_match.split(",")}
+    # comparaison faible : W/"x" et "x" désignent la même représentation
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
@@ -0,0 +1,277 @@
+# app/src/services/portfolio.py
+"""
+Valorisation du portefeuille (table wallet) d'un utilisateur :
+- positions agrégées par ticker (quantité, coût d'achat, secteur) gardées en cache par utilisateur,
+  avec la version du wallet (nombre de lignes, dernier id) vérifiée à chaque lecture
+- secteur et nom depuis ticker_metrics, sinon depuis le snapshot de fondamentaux (ticker non suivi)
+- ajout / suppression d'une ligne wallet : la position est mise à jour en place, sans relire la table
+- valorisation vectorisée (NumPy) sur les cotations du cache "quotes" : valeur, poids, P&L, secteurs
+- risque du portefeuille (VaR, CVaR, volatilité, contributions) sur un instantané de la covariance EWMA
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.src.services.cache import get_cache
+from app.src.services.compute import batch_quotes
+from app.src.services.covariance import covariance_for
+from app.src.services.executors import run_io
+from app.src.services.fundamentals import FUNDAMENTALS_MAX_WORKERS, fundamentals_snapshot
+from app.src.services.risk import portfolio_risk
+
+UNKNOWN_SECTOR = "Unknown"
+
+# user_id -> (version, positions) ; une écriture d'un autre worker change la version en base
+_positions_cache = get_cache("positions", ttl=300, max_bytes=16 * 2**20)
+
+# ids croissants : tout ajout ou suppression change (count, max(id)) ; lecture sur l'index user_id
+WALLET_VERSION_SQL = text("SELECT count(*), max(id) FROM wallet WHERE user_id = :uid")
+
+# une ligne par ticker ; secteur et nom depuis la dernière ligne ticker_metrics (NULL si non suivi) ;
+# la version est lue dans la même requête, donc sur le même instantané que les positions
+POSITIONS_SQL = text("""
+    SELECT p.ticker, p.quantity, p.cost, p.priced_quantity, m.full_name, m.sector, v.n, v.last_id
+    FROM (
+        SELECT ticker,
+               sum(quantity) AS quantity,
+               COALESCE(sum(quantity * price_at_buy), 0) AS cost,
+               COALESCE(sum(quantity) FILTER (WHERE price_at_buy IS NOT NULL), 0) AS priced_quantity
+        FROM wallet
+        WHERE user_id = :uid
+        GROUP BY ticker
+    ) p
+    LEFT JOIN LATERAL (
+        SELECT tm.full_name, tm.sector
+        FROM ticker_metrics tm
+        WHERE tm.ticker = p.ticker
+        ORDER BY tm.as_of DESC
+        LIMIT 1
+    ) m ON true
+    CROSS JOIN (SELECT count(*) AS n, max(id) AS last_id FROM wallet WHERE user_id = :uid) v
+""")
+
+
+def _position(row) -> dict:
+    return {
+        "quantity": float(row["quantity"] or 0),
+        "cost": float(row["cost"] or 0),
+        "priced_quantity": float(row["priced_quantity"] or 0),
+        "full_name": row.get("full_name") or row["ticker"],
+        "sector": row.get("sector") or UNKNOWN_SECTOR,
+    }
+
+
+def _describe(ticker: str) -> dict:
+    """Nom et secteur depuis le snapshot de fondamentaux ; {} si Yahoo ne connaît pas le ticker"""
+    try:
+        info = fundamentals_snapshot(ticker)["info"]
+    except Exception as e:
+        print(f"❌ Description {ticker}: {e}")
+        return {}
+    return {"full_name": info.get("longName") or info.get("shortName"), "sector": info.get("sector")}
+
+
+def _describe_all(tickers: list) -> dict:
+    with ThreadPoolExecutor(max_workers=max(1, min(FUNDAMENTALS_MAX_WORKERS, len(tickers)))) as pool:
+        return dict(zip(tickers, pool.map(_describe, tickers)))
+
+
+async def describe_rows(rows: list) -> list:
+    """Complète en place full_name / sector des lignes sans ticker_metrics (tickers non suivis)"""
+    missing = [r for r in rows if r.get("sector") is None or r.get("full_name") is None]
+    if missing:
+        described = await run_io(_describe_all, list(dict.fromkeys(r["ticker"] for r in missing)))
+        for r in missing:
+            d = described.get(r["ticker"]) or {}
+            r["full_name"] = r.get("full_name") or d.get("full_name")
+            r["sector"] = r.get("sector") or d.get("sector")
+    return rows
+
+
+async def load_positions(db: AsyncSession, user_id: int) -> dict:
+    """{ticker: position} depuis le cache si la version du wallet n'a pas bougé, sinon une requête agrégée"""
+    version = tuple((await db.execute(WALLET_VERSION_SQL, {"uid": user_id})).one())
+    cached = _positions_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    rows = (await db.execute(POSITIONS_SQL, {"uid": user_id})).mappings().all()
+    if rows:
+        version = (rows[0]["n"], rows[0]["last_id"])
+    rows = await describe_rows([dict(r) for r in rows])
+    positions = {r["ticker"]: _position(r) for r in rows}
+    _positions_cache.set(user_id, (version, positions))
+    return positions
+
+
+def apply_wallet_row(user_id: int, row, sign: int = 1):
+    """
+    Répercute une ligne wallet ajoutée (sign=1) ou supprimée (sign=-1) sur les positions en cache,
+    avec la version attendue en base. row : id, ticker, quantity, price_at_buy
+    (+ full_name, sector pour un ajout). À appeler après le commit.
+    Si le cache contenait déjà la ligne, la version calculée ne correspond pas : relu à la prochaine lecture.
+    """
+    cached = _positions_cache.get(user_id)
+    if cached is None:
+        return  # rien en cache : le prochain chargement lira la table
+    (count, last_id), positions = cached
+    if sign > 0:
+        version = (count + 1, max(last_id or 0, row["id"]))
+    elif row["id"] != last_id:
+        version = (count - 1, last_id)
+    else:
+        _positions_cache.invalidate(user_id)  # nouveau max(id) inconnu
+        return
+    positions = dict(positions)
+    quantity = sign * float(row["quantity"])
+    price_at_buy = row.get("price_at_buy")
+    current = positions.get(row["ticker"])
+    position = dict(current) if current else _position({**row, "quantity": 0, "cost": 0, "priced_quantity": 0})
+    position["quantity"] += quantity
+    if price_at_buy is not None:
+        position["cost"] += quantity * float(price_at_buy)
+        position["priced_quantity"] += quantity
+    if abs(position["quantity"]) < 1e-12:
+        positions.pop(row["ticker"], None)
+    else:
+        positions[row["ticker"]] = position
+    _positions_cache.set(user_id, (version, positions))
+
+
+def value_positions(positions: dict, quotes: dict) -> tuple[list, dict]:
+    """
+    Valorisation vectorisée : une opération NumPy par grandeur, quel que soit le nombre de positions.
+    Retourne (lignes par ticker triées par valeur décroissante, synthèse avec répartition sectorielle).
+    Une position sans cotation garde price / market_worth à None et n'entre pas dans les totaux.
+    """
+    tickers = list(positions)
+    n = len(tickers)
+    quantity = np.fromiter((positions[t]["quantity"] for t in tickers), float, n)
+    cost = np.fromiter((positions[t]["cost"] for t in tickers), float, n)
+    priced_quantity = np.fromiter((positions[t]["priced_quantity"] for t in tickers), float, n)
+    price = np.fromiter(((quotes.get(t) or {}).get("price") or np.nan for t in tickers), float, n)
+    eve_price = np.fromiter(((quotes.get(t) or {}).get("eve_price") or np.nan for t in tickers), float, n)
+
+    quoted = ~np.isnan(price)
+    market_worth = quantity * price
+    total = float(np.nansum(market_worth))
+    weight = market_worth / total if total else np.full(n, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_price = np.where(priced_quantity != 0, cost / priced_quantity, np.nan)
+        pnl = priced_quantity * price - cost
+        pnl = np.where(priced_quantity != 0, pnl, np.nan)
+        pnl_pct = pnl / cost * 100
+        performance = (price / eve_price - 1) * 100
+    day_change = quantity * (price - eve_price)
+
+    sectors = np.array([positions[t]["sector"] for t in tickers], dtype=object)
+    labels, inverse = np.unique(sectors, return_inverse=True) if n else (np.array([]), np.array([], int))
+    sector_worth = np.bincount(inverse, weights=np.where(quoted, market_worth, 0.0), minlength=len(labels))
+
+    def num(x):
+        return None if x is None or not np.isfinite(x) else round(float(x), 6)
+
+    rows = [{
+        "ticker": t,
+        "full_name": positions[t]["full_name"],
+        "sector": positions[t]["sector"],
+        "quantity": num(quantity[i]),
+        "price": num(price[i]),
+        "market_worth": num(market_worth[i]),
+        "weight": num(weight[i]),
+        "price_at_buy": num(avg_price[i]),
+        "pnl": num(pnl[i]),
+        "pnl_pct": num(pnl_pct[i]),
+        "performance": num(performance[i]),
+    } for i, t in enumerate(tickers)]
+    rows.sort(key=lambda r: r["market_worth"] if r["market_worth"] is not None else -np.inf, reverse=True)
+
+    has_cost = quoted & (priced_quantity != 0)
+    total_cost = float(cost[has_cost].sum())
+    total_pnl = float(np.nansum(pnl[has_cost]))
+    total_day = float(np.nansum(day_change))
+    summary = {
+        "market_worth": num(total),
+        "cost": num(total_cost),
+        "pnl": num(total_pnl),
+        "pnl_pct": num(total_pnl / total_cost * 100) if total_cost else None,
+        "day_change": num(total_day),
+        "day_change_pct": num(total_day / (total - total_day) * 100) if total - total_day else None,
+        "positions": n,
+        "quoted": int(quoted.sum()),
+        "sectors": sorted(({
+            "sector": str(label),
+            "market_worth": num(sector_worth[i]),
+            "weight": num(sector_worth[i] / total) if total else None,
+        } for i, label in enumerate(labels)), key=lambda s: s["market_worth"] or 0, reverse=True),
+        "as_of": datetime.now().isoformat(timespec="seconds"),
+    }
+    return rows, summary
+
+
+async def current_price(ticker: str) -> float | None:
+    """Dernier prix du ticker (cache "quotes" d'abord) ; None si la cotation échoue"""
+    quote = (await run_io(batch_quotes, [ticker])).get(ticker) or {}
+    return quote.get("price")
+
+
+async def portfolio_valuation(db: AsyncSession, user_id: int) -> tuple[list, dict]:
+    """Positions (cache ou table) valorisées sur les cotations (cache "quotes", téléchargées si absentes)"""
+    positions = await load_positions(db, user_id)
+    quotes = await run_io(batch_quotes, list(positions)) if positions else {}
+    return value_positions(positions, quotes)
+
+
+async def portfolio_risk_report(db: AsyncSession, user_id: int, p: float = 0.05, horizon: int = 1) -> dict:
+    """
+    Risque des positions cotées, pondérées par leur valeur de marché :
+    - sous-bloc de la covariance EWMA partagée (cache "covariance", mise à jour incrémentale),
+      copié sous son verrou : une mise à jour concurrente ne le modifie pas
+    - les tickers sans historique sont exclus et les poids renormalisés (covered_weight = part couverte)
+    """
+    rows, summary = await portfolio_valuation(db, user_id)
+    rows = [r for r in rows if r["market_worth"] is not None]
+    report = {"market_worth": summary["market_worth"], "p": p, "horizon": horizon,
+              "positions": [], "covered_weight": None, "as_of": None}
+    if not rows:
+        return report
+
+    state = await run_io(covariance_for, [r["ticker"] for r in rows])
+    index = {t: i for i, t in enumerate(state.tickers)}
+    worth = np.array([r["market_worth"] for r in rows])
+    covered = np.array([state.covered[index[r["ticker"]]] for r in rows], dtype=bool)
+    if not covered.any() or not worth[covered].sum():
+        return report
+    cols = np.array([index[r["ticker"]] for r in rows])[covered]
+    weights = worth[covered] / worth[covered].sum()
+    risk = portfolio_risk(weights, state.cov[np.ix_(cols, cols)], p, horizon)
+
+    def num(x):
+        return None if x is None or not np.isfinite(x) else round(float(x), 6)
+
+    total = float(worth[covered].sum())
+    kept = [r for r, c in zip(rows, covered) if c]
+    report.update({
+        "covered_weight": num(total / worth.sum()),
+        "daily_volatility": num(risk["daily volatility"]),
+        "annual_volatility": num(risk["annual volatility"]),
+        "var_pct": num(risk["var"]),
+        "cvar_pct": num(risk["cvar"]),
+        "var_amount": num(risk["var"] / 100 * total),
+        "cvar_amount": num(risk["cvar"] / 100 * total),
+        "ewma_lambda": state.lam,
+        "bars": state.bars,
+        "as_of": state.last_date.date().isoformat() if state.last_date is not None else None,
+        "positions": sorted(({
+            "ticker": r["ticker"],
+            "weight": num(weights[i]),
+            "marginal": num(risk["marginal"][i]),
+            "contribution": num(risk["contribution"][i]),
+            "contribution_pct": num(risk["contribution_pct"][i]),
+        } for i, r in enumerate(kept)),
+            key=lambda x: x["contribution"] or 0, reverse=True),
+    })
+    return report
@@ -0,0 +1,41 @@
+# app/src/services/responses.py
+"""
+Sérialisation JSON rapide (orjson) :
+- scalaires et tableaux NumPy sérialisés nativement (OPT_SERIALIZE_NUMPY), NaN / ±Inf -> null
+- Decimal (colonnes numeric), Timestamp pandas et autres types via _default
+- FastJSONResponse : renvoyée directement par une route, elle court-circuite la re-validation
+  Pydantic du response_model ; à réserver aux données produites par l'application
+"""
+from __future__ import annotations
+from decimal import Decimal
+
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def ndjson_line(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
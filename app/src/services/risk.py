@@ -0,0 +1,208 @@
+# app/src/services/risk.py
+"""
+Statistiques de risque vectorisées : une matrice de clôtures (dates x tickers)
+et la clôture du benchmark, toutes les colonnes calculées en une passe NumPy.
+Chaque colonne n'utilise que ses propres séances (NaN = pas de cotation ce jour-là),
+les statistiques relatives au benchmark utilisent les séances communes.
+"""
+from __future__ import annotations
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+N_TRADING = 252
+
+
+def close_by_date(df: pd.DataFrame) -> pd.Series:
+    """Clôtures d'un historique (colonnes Date/Close) indexées par date locale de la place"""
+    dates = pd.to_datetime(df["Date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return pd.Series(df["Close"].to_numpy(dtype=float), index=dates.dt.normalize())
+
+
+def _prices(close) -> np.ndarray:
+    px = np.asarray(close, dtype=float)
+    return px[:, None] if px.ndim == 1 else px
+
+def _previous(px: np.ndarray) -> np.ndarray:
+    """Dernière clôture connue avant chaque ligne, colonne par colonne"""
+    filled = pd.DataFrame(px).ffill().to_numpy()
+    return np.vstack([np.full((1, px.shape[1]), np.nan), filled[:-1]])
+
+def simple_returns(close) -> np.ndarray:
+    px = _prices(close)
+    r = px / _previous(px) - 1
+    r[np.isnan(px)] = np.nan
+    return r
+
+def _first_last(px: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    valid = ~np.isnan(px)
+    cols = np.arange(px.shape[1])
+    first = px[valid.argmax(axis=0), cols]
+    last = px[px.shape[0] - 1 - valid[::-1].argmax(axis=0), cols]
+    return first, last
+
+
+# ---------- briques ----------
+def total_return(close) -> np.ndarray:
+    first, last = _first_last(_prices(close))
+    return last / first - 1
+
+def volatility(returns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Volatilité journalière et annuelle des log-rendements"""
+    daily = np.nanstd(np.log1p(returns), axis=0, ddof=1)
+    return daily, daily * np.sqrt(N_TRADING)
+
+def max_drawdown(close, window: int = N_TRADING) -> np.ndarray:
+    """Pire repli (%) sur les `window` dernières séances de chaque ticker"""
+    px = _prices(close)
+    valid = ~np.isnan(px)
+    rank_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    px = np.where(valid & (rank_from_end <= window), px, np.nan)
+    peak = np.fmax.accumulate(px, axis=0)
+    return np.nanmin(px / peak - 1.0, axis=0) * 100
+
+def var_cvar(returns: np.ndarray, p: float = 0.05) -> tuple[np.ndarray, np.ndarray]:
+    q = np.nanpercentile(returns, 100 * p, axis=0)
+    tail = np.where(returns <= q, returns, np.nan)
+    return q * 100, np.nanmean(tail, axis=0) * 100
+
+def rsi(close, n: int = 14) -> np.ndarray:
+    """RSI de Wilder (moyennes exponentielles alpha = 1/n) à la dernière séance"""
+    px = _prices(close)
+    delta = px - _previous(px)
+    delta[np.isnan(px)] = np.nan
+    ewm = dict(alpha=1 / n, adjust=False, ignore_na=True)
+    avg_gain = pd.DataFrame(np.clip(delta, 0.0, None)).ewm(**ewm).mean().to_numpy()[-1]
+    avg_loss = pd.DataFrame(-np.clip(delta, None, 0.0)).ewm(**ewm).mean().to_numpy()[-1]
+    rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+def benchmark_stats(returns: np.ndarray, market_returns: np.ndarray, rf_ann: float = 0.02) -> dict:
+    """
+    OLS r_ticker = a + b * r_marché, R², tracking error, information ratio, Treynor,
+    CAPM, Sharpe et Sortino, sur les séances communes de chaque colonne avec le benchmark
+    """
+    common = ~np.isnan(returns) & ~np.isnan(market_returns)[:, None]
+    x = np.where(common, market_returns[:, None], np.nan)
+    y = np.where(common, returns, np.nan)
+
+    mx, my = np.nanmean(x, axis=0), np.nanmean(y, axis=0)
+    dx, dy = x - mx, y - my
+    sxx = np.nansum(dx * dx, axis=0)
+    sxy = np.nansum(dx * dy, axis=0)
+    syy = np.nansum(dy * dy, axis=0)
+    beta = sxy / sxx
+    alpha = my - beta * mx
+    r2 = 1 - (syy - beta * sxy) / syy
+
+    te = np.nanstd(y - x, axis=0, ddof=1) * np.sqrt(N_TRADING) * 100
+    er_ann = (1 + my) ** N_TRADING - 1
+    market_annual = (1 + mx) ** N_TRADING - 1
+    ir = np.where(te != 0, (er_ann - market_annual) / (te / 100), np.nan)
+    treynor = np.where(beta != 0, (er_ann - rf_ann) / beta, np.nan)
+
+    # Sharpe / Sortino : même définition que ticker_indicators (excès du benchmark)
+    rf_daily = (1 + rf_ann) ** (1 / N_TRADING) - 1
+    excess = x - rf_daily
+    mean_excess = np.nanmean(excess, axis=0)
+    sharpe = mean_excess / np.nanstd(excess, axis=0, ddof=1) * np.sqrt(N_TRADING)
+    semidev = np.sqrt(np.nanmean(np.minimum(excess, 0) ** 2, axis=0))
+    sortino = np.where(semidev != 0, mean_excess * np.sqrt(N_TRADING) / semidev, np.nan)
+
+    return {
+        "daily alpha": alpha,
+        "ticker beta 1year": beta,
+        "R²": r2,
+        "alpha 1year percent": ((1 + alpha) ** N_TRADING - 1) * 100,
+        "tracking error": te,
+        "information ratio": ir,
+        "treynor": treynor,
+        "sharpe ratio": sharpe,
+        "sortino": sortino,
+        "expected return": rf_ann + beta * (market_annual - rf_ann),
+    }
+
+
+# ---------- moteur ----------
+def risk_metrics(close: pd.DataFrame, market_close: pd.Series,
+                 p: float = 0.05, n: int = 14, rf_ann: float = 0.02) -> pd.DataFrame:
+    """
+    - close : clôtures (dates x tickers), index de dates
+    - market_close : clôtures du benchmark (ses propres séances)
+    Retourne un DataFrame (tickers x métriques) avec les clés de ticker_indicators
+    """
+    close = close.sort_index()
+    market_close = market_close.dropna().sort_index()
+    market_returns = market_close.pct_change().reindex(close.index).to_numpy(dtype=float)
+
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        returns = simple_returns(close)
+        daily_vol, annual_vol = volatility(returns)
+        var, cvar = var_cvar(returns, p)
+        metrics = {
+            "ticker total return": total_return(close),
+            "market return": np.full(close.shape[1], market_close.iloc[-1] / market_close.iloc[0] - 1)
+            if len(market_close) else np.full(close.shape[1], np.nan),
+            "annual volatility": annual_vol,
+            "daily volatility": daily_vol,
+            "drawdown": max_drawdown(close),
+            "var95": var,
+            "cvar95": cvar,
+            "rsi": rsi(close, n),
+            **benchmark_stats(returns, market_returns, rf_ann),
+        }
+    return pd.DataFrame(metrics, index=close.columns)
+
+
+# ---------- portefeuille ----------
+def ewma_covariance(returns: np.ndarray, lam: float = 0.94) -> np.ndarray:
+    """
+    Covariance EWMA (RiskMetrics, moyenne nulle) de rendements (dates x tickers) en une passe :
+    poids (1 - lam) * lam^k sur la k-ième séance avant la dernière, normalisés.
+    Séance sans cotation = rendement nul (le mouvement est compté à la cotation suivante)
+    """
+    r = np.nan_to_num(np.asarray(returns, dtype=float))
+    if not len(r):
+        return np.zeros((r.shape[1], r.shape[1]))
+    return (r * ewma_weights(len(r), lam)[:, None]).T @ r
+
+def ewma_weights(n: int, lam: float = 0.94) -> np.ndarray:
+    """Poids normalisés des n séances, la dernière en dernier"""
+    w = (1 - lam) * lam ** np.arange(n - 1, -1, -1)
+    return w / w.sum()
+
+def ewma_update(cov: np.ndarray, r: np.ndarray, lam: float = 0.94) -> np.ndarray:
+    """Une séance de plus, en place : cov = lam * cov + (1 - lam) * r rᵀ"""
+    r = np.nan_to_num(np.asarray(r, dtype=float))
+    cov *= lam
+    cov += (1 - lam) * np.outer(r, r)
+    return cov
+
+def portfolio_risk(weights: np.ndarray, cov: np.ndarray, p: float = 0.05, horizon: int = 1) -> dict:
+    """
+    Risque paramétrique (normal) d'un portefeuille de poids `weights` :
+    - volatilité journalière / annuelle, VaR et CVaR (en %) à l'horizon de `horizon` séances
+    - contributions marginales : d(sigma)/d(w_i), w_i * marginal (somme = sigma) et part en %
+    """
+    w = np.asarray(weights, dtype=float)
+    sigma_w = cov @ w
+    sigma = float(np.sqrt(max(w @ sigma_w, 0.0)))
+    z = NormalDist().inv_cdf(p)
+    sigma_h = sigma * np.sqrt(horizon)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal = sigma_w / sigma if sigma else np.full(len(w), np.nan)
+    contribution = w * marginal
+    return {
+        "daily volatility": sigma * 100,
+        "annual volatility": sigma * np.sqrt(N_TRADING) * 100,
+        "var": z * sigma_h * 100,
+        "cvar": -NormalDist().pdf(z) / p * sigma_h * 100,
+        "marginal": marginal * 100,
+        "contribution": contribution * 100,
+        "contribution_pct": contribution / sigma * 100 if sigma else np.full(len(w), np.nan),
+    }
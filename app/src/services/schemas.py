@@ -49,11 +49,69 @@ class WalletRowOut(BaseModel):
     id: int
     ticker: str
     quantity: float
+    price_at_buy: Optional[float] = None
     created_at: str
 
 class WalletCreateIn(BaseModel):
     ticker: str
     quantity: float
+    price_at_buy: Optional[float] = Field(None, gt=0)  # cotation courante si absent
+
+class PortfolioPosition(BaseModel):
+    """Position agrégée d'un ticker du portefeuille"""
+    ticker: str
+    full_name: str
+    sector: str
+    quantity: float
+    price: Optional[float] = None
+    market_worth: Optional[float] = None
+    weight: Optional[float] = None
+    price_at_buy: Optional[float] = None  # prix d'achat moyen
+    pnl: Optional[float] = None
+    pnl_pct: Optional[float] = None
+    performance: Optional[float] = None  # variation du jour en %
+
+class SectorWeight(BaseModel):
+    sector: str
+    market_worth: Optional[float] = None
+    weight: Optional[float] = None
+
+class PortfolioSummary(BaseModel):
+    """Synthèse du portefeuille valorisé aux dernières cotations"""
+    market_worth: Optional[float] = None
+    cost: Optional[float] = None
+    pnl: Optional[float] = None
+    pnl_pct: Optional[float] = None
+    day_change: Optional[float] = None
+    day_change_pct: Optional[float] = None
+    positions: int
+    quoted: int  # positions ayant une cotation
+    sectors: List[SectorWeight]
+    as_of: str
+
+class RiskContribution(BaseModel):
+    ticker: str
+    weight: Optional[float] = None
+    marginal: Optional[float] = None  # d(volatilité)/d(poids), en %
+    contribution: Optional[float] = None  # poids * marginal ; somme = volatilité journalière
+    contribution_pct: Optional[float] = None
+
+class PortfolioRisk(BaseModel):
+    """Risque paramétrique du portefeuille sur la covariance EWMA des rendements journaliers"""
+    market_worth: Optional[float] = None
+    p: float
+    horizon: int  # en séances
+    covered_weight: Optional[float] = None  # part de la valeur ayant un historique
+    daily_volatility: Optional[float] = None
+    annual_volatility: Optional[float] = None
+    var_pct: Optional[float] = None
+    cvar_pct: Optional[float] = None
+    var_amount: Optional[float] = None
+    cvar_amount: Optional[float] = None
+    ewma_lambda: Optional[float] = None
+    bars: Optional[int] = None
+    as_of: Optional[str] = None  # dernière séance intégrée à la covariance
+    positions: List[RiskContribution]
 
 class RefreshIn(BaseModel):
     token: str
@@ -64,13 +122,23 @@ class Indice(BaseModel):
     full_name: str
     price: float
     performance: float
+    as_of: Optional[str] = None  # date du dernier rafraîchissement des cotations
 
 class TickerResponse(BaseModel):
     """Modèle de réponse pour les indicateurs d'un ticker"""
     ticker: str
     timestamp: str
+    as_of: Optional[str] = None  # dernière barre journalière utilisée
+    cached: bool = False  # servi depuis le cache de résultats
     data: Dict[str, Any]
 
+class IndicatorsBatchIn(BaseModel):
+    """Corps de POST /indicators/batch"""
+    tickers: List[str] = Field(min_length=1, max_length=500)
+    p: float = Field(0.05, ge=0.01, le=0.5)
+    n: int = Field(14, ge=5, le=100)
+    rf_ann: float = Field(0.02, ge=0.0, le=0.2)
+
 class ErrorResponse(BaseModel):
     """Modèle de réponse d'erreur"""
     error: str
@@ -0,0 +1,138 @@
+# app/src/services/ticker_metrics.py
+"""
+Table ticker_metrics : métriques de marché d'un ticker calculées une fois et partagées
+par tous les utilisateurs qui le suivent. stocks ne garde que les données propres à l'utilisateur.
+"""
+from __future__ import annotations
+import os
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.src.services.indicators import compute_indicators
+
+# âge maximal d'une ligne avant recalcul (add_favorite d'un ticker déjà suivi = pas de calcul)
+TICKER_METRICS_TTL_MINUTES = float(os.getenv("TICKER_METRICS_TTL_MINUTES", "15"))
+
+# colonne de ticker_metrics -> clé de ticker_indicators
+METRIC_COLUMNS = {
+    "full_name": "Full Name",
+    "sector": "sector",
+    "industry": "industry",
+    "type": "type",
+    "market": "market",
+    "benchmark": "Benchmark",
+    "price": "Price",
+    "performance": "Ticker performance",
+    "eve_price": "Ticker eve price",
+    "eps": "eps",
+    "total_return": "ticker total return",
+    "market_return": "market return",
+    "expected_return_capm": "expected return",
+    "cagr": "cagr",
+    "ebitda": "ebitda",
+    "pe_ratio": "price earning ratio",
+    "book_value": "book value",
+    "pb_ratio": "price to book ratio",
+    "roe": "roe",
+    "fin_cash_flow_yield": "financial cash flow yield",
+    "duration_dividend": "duration dividends",
+    "duration_fin_cash_flow": "duration financial cash flow",
+    "duration_earnings": "duration earning",
+    "rsi": "rsi",
+    "daily_risk": "daily volatility",
+    "annual_risk": "annual volatility",
+    "max_drawdown": "drawdown",
+    "var95": "var95",
+    "cvar95": "cvar95",
+    "annual_volatility": "annual volatility",
+    "beta_1y": "ticker beta 1year",
+    "daily_alpha": "daily alpha",
+    "alpha_1y_pct": "alpha 1year percent",
+    "r_square_1y": "R²",
+    "tracking_error_1y": "tracking error",
+    "ir_1y": "information ratio",
+    "treynor": "treynor",
+    "sharpe_1y": "sharpe ratio",
+    "sortino_1y": "sortino",
+    "shares_outstanding": "shares outstanding",
+}
+
+_UPSERT = text(f"""
+    INSERT INTO ticker_metrics (ticker, as_of, {", ".join(METRIC_COLUMNS)}, updated_at)
+    VALUES (:ticker, :as_of, {", ".join(f":{c}" for c in METRIC_COLUMNS)}, now())
+    ON CONFLICT (ticker, as_of) DO UPDATE
+    SET {", ".join(f"{c} = EXCLUDED.{c}" for c in METRIC_COLUMNS)}, updated_at = now()
+""")
+
+# dernière ligne de chaque ticker (parcours inverse de la clé primaire), jointe aux lignes de l'utilisateur
+FAVORITES_SQL = """
+    SELECT s.ticker, COALESCE(m.full_name, s.ticker) AS full_name, m.price, m.performance
+    FROM stocks s
+    LEFT JOIN LATERAL (
+        SELECT tm.full_name, tm.price, tm.performance
+        FROM ticker_metrics tm
+        WHERE tm.ticker = s.ticker
+        ORDER BY tm.as_of DESC
+        LIMIT 1
+    ) m ON true
+    WHERE s.user_id = :uid AND s.favorite = true
+"""
+
+
+# colonnes varchar(32) (migration 001) : equity_duration_proxy renvoie un float ou '+Inf'
+TEXT_COLUMNS = {"duration_dividend", "duration_fin_cash_flow", "duration_earnings"}
+
+
+def _column_value(column: str, value):
+    if column in TEXT_COLUMNS and value is not None:
+        return str(value)
+    return value
+
+
+def metrics_row(ticker: str, data: dict, as_of: date | None = None) -> dict:
+    """Paramètres d'écriture d'une ligne ticker_metrics depuis un dict d'indicateurs"""
+    return {
+        "ticker": ticker.upper(),
+        "as_of": as_of or date.today(),
+        **{column: _column_value(column, data.get(key)) for column, key in METRIC_COLUMNS.items()},
+    }
+
+
+async def upsert_ticker_metrics(db: AsyncSession, ticker: str, data: dict, as_of: date | None = None):
+    """Écrit (ou remplace) la ligne du jour ; le commit reste à l'appelant"""
+    await db.execute(_UPSERT, metrics_row(ticker, data, as_of))
+
+
+async def is_fresh(db: AsyncSession, ticker: str, max_age_minutes: float = TICKER_METRICS_TTL_MINUTES) -> bool:
+    row = (await db.execute(
+        text("""
+            SELECT 1 FROM ticker_metrics
+            WHERE ticker = :t AND updated_at > now() - :m * interval '1 minute'
+            LIMIT 1
+        """),
+        {"t": ticker.upper(), "m": max_age_minutes},
+    )).first()
+    return row is not None
+
+
+async def refresh_ticker_metrics(db: AsyncSession, ticker: str,
+                                 max_age_minutes: float = TICKER_METRICS_TTL_MINUTES) -> bool:
+    """
+    Recalcule les métriques du ticker si sa dernière ligne est plus vieille que max_age_minutes.
+    Termine la transaction en cours avant le calcul : la connexion n'est pas gardée pendant les téléchargements.
+    """
+    if await is_fresh(db, ticker, max_age_minutes):
+        return False
+    await db.commit()
+    result = await compute_indicators(ticker.upper(), p=0.05, n=14, rf_ann=0.02)
+    await upsert_ticker_metrics(db, ticker, result["data"])
+    return True
+
+
+async def favorite_rows(db: AsyncSession, user_id: int, ticker: str | None = None) -> list:
+    """Favoris de l'utilisateur (ticker, full_name, price, performance), éventuellement un seul ticker"""
+    sql = FAVORITES_SQL + (" AND s.ticker = :t" if ticker else "")
+    params = {"uid": user_id, "t": ticker.upper()} if ticker else {"uid": user_id}
+    return [dict(r) for r in (await db.execute(text(sql), params)).mappings().all()]
@@ -0,0 +1,66 @@
+# benchmarks/bench_auth_dependency.py  python -m benchmarks.bench_auth_dependency [ITERATIONS]
+"""
+Coût par requête de la dépendance d'authentification, sans serveur :
+- ancien chemin : jwt.decode (HMAC + exp) et modèle Pydantic à chaque appel
+- get_current_user sans cache (cache "tokens" vidé à chaque appel)
+- get_current_user avec cache (même token, cas d'une page qui enchaîne les /api/me/*)
+Le passage par le threadpool de l'ancienne dépendance synchrone n'est pas compté ici.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+from pydantic import BaseModel
+
+from app.deps import _verified_tokens, get_current_user
+from app.security import create_token_pair, decode_token
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+
+class PydanticUser(BaseModel):
+    id: int
+    email: str | None = None
+
+
+def legacy(creds: HTTPAuthorizationCredentials) -> PydanticUser:
+    payload = decode_token(creds.credentials)
+    return PydanticUser(id=int(payload["sub"]))
+
+
+async def uncached(creds: HTTPAuthorizationCredentials):
+    _verified_tokens.invalidate()
+    return await get_current_user(creds)
+
+
+def per_call_us(samples: list) -> str:
+    return f"{statistics.median(samples) * 1e6:>9.2f}"
+
+
+async def measure(fn, creds, is_async: bool) -> list:
+    samples = []
+    for _ in range(ITERATIONS):
+        t0 = time.perf_counter()
+        if is_async:
+            await fn(creds)
+        else:
+            fn(creds)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def main():
+    access, _ = create_token_pair(42)
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access)
+    print(f"{'chemin':<28} {'µs/appel':>9}")
+    for label, fn, is_async in (("jwt.decode + Pydantic", legacy, False),
+                                ("get_current_user sans cache", uncached, True),
+                                ("get_current_user en cache", get_current_user, True)):
+        print(f"{label:<28} {per_call_us(await measure(fn, creds, is_async))}")
+    print(_verified_tokens.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
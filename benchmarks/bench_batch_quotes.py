@@ -0,0 +1,45 @@
+# benchmarks/bench_batch_quotes.py  python -m benchmarks.bench_batch_quotes
+"""
+Coût par ticker des cotations de /home : boucle série (fast_info + historique
+ticker par ticker, comme avant) contre batch_quotes (yf.download par lots).
+Nécessite un accès réseau à Yahoo Finance.
+"""
+import time
+
+from app.src.services.cache import invalidate
+from app.src.services.compute import INDEX_TICKERS, batch_quotes, _yf_ticker
+
+SIZES = [1, 5, 10, 20, 40]
+
+
+def serial_quotes(tickers: list) -> dict:
+    quotes = {}
+    for ticker in tickers:
+        try:
+            t = _yf_ticker(ticker)
+            price = t.fast_info.last_price
+            hist = t.history(period="5d", interval="1d")
+            quotes[ticker] = {"price": price, "eve_price": hist["Close"].iloc[-2]}
+        except Exception:
+            pass
+    return quotes
+
+
+def timed(fn, tickers: list) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    quotes = fn(tickers)
+    return time.perf_counter() - t0, len(quotes)
+
+
+if __name__ == "__main__":
+    universe = [v["index"] for v in INDEX_TICKERS.values()]
+    print(f"{'n':>4} {'série s':>9} {'ms/ticker':>10} {'batch s':>9} {'ms/ticker':>10} {'ok':>6}")
+    for n in SIZES:
+        tickers = universe[:n]
+        # caches froids pour chaque taille : sinon le préfixe déjà coté est relu depuis "quotes" (TTL 60 s)
+        _yf_ticker.cache_clear()
+        invalidate("quotes")
+        serial_s, _ = timed(serial_quotes, tickers)
+        batch_s, ok = timed(batch_quotes, tickers)
+        print(f"{n:>4} {serial_s:>9.2f} {serial_s / n * 1000:>10.1f} "
+              f"{batch_s:>9.2f} {batch_s / n * 1000:>10.1f} {ok:>3}/{n}")
@@ -0,0 +1,79 @@
+# benchmarks/bench_compute_pool.py  python -m benchmarks.bench_compute_pool
+"""
+Débit du calcul d'indicateurs (jobs/s) sur des entrées synthétiques pré-téléchargées :
+threads du process (chemin run_cpu, limité par le GIL) contre ComputePool
+(process + mémoire partagée) pour 1, 2, 4... process.
+Vérifie au passage que les deux chemins donnent le même résultat.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.src.services.compute_pool import ComputePool
+from app.src.services.indicators import clean_indicators
+
+JOBS = 64
+
+
+def synthetic_inputs(seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=2600)
+    market = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+    stock = 50 * np.exp(np.cumsum(rng.normal(0, 0.015, len(days)) + np.diff(np.log(market), prepend=np.log(market[0]))))
+
+    def history(close):
+        dates = days[-260:].tz_localize("America/New_York")
+        return pd.DataFrame({"Date": dates, "Open": close[-260:], "High": close[-260:], "Low": close[-260:],
+                             "Close": close[-260:], "Volume": rng.integers(100_000, 1_000_000, 260)})
+
+    quarters = pd.date_range(end=days[-1], periods=4, freq="QS")
+    statement = lambda rows: pd.DataFrame(rng.uniform(1e8, 1e9, (len(rows), 4)), index=rows, columns=quarters)
+    return {
+        "info": {"longName": "Synthetic Inc.", "sector": "Technology", "industry": "Software",
+                 "quoteType": "EQUITY", "payoutRatio": 0.3, "sharesOutstanding": 1e9,
+                 "marketCap": 5e10, "trailingEps": 2.5, "trailingPE": 20.0, "bookValue": 12.0},
+        "statements": {
+            "income_stmt": statement(["Diluted EPS", "EBITDA", "Net Income"]),
+            "quarterly_income_stmt": statement(["Net Income"]),
+            "balance_sheet": statement(["Stockholders Equity"]),
+            "quarterly_balance_sheet": statement(["Stockholders Equity"]),
+            "cashflow": statement(["Free Cash Flow"]),
+            "quarterly_cashflow": statement(["Free Cash Flow"]),
+        },
+        "quote": {"price": float(stock[-1]), "previous_close": float(stock[-2])},
+        "benchmark": "^GSPC",
+        "exchange": "NMS",
+        "history": history(stock),
+        "benchmark_history": history(market),
+        "dividends": pd.Series(0.2, index=days[::63]),
+        "rate_history": (pd.Series(stock, index=days), pd.Series(market, index=days)),
+    }
+
+
+def throughput(submit, jobs: int) -> tuple[float, dict]:
+    t0 = time.perf_counter()
+    futures = [submit() for _ in range(jobs)]
+    results = [f.result() for f in futures]
+    return jobs / (time.perf_counter() - t0), results[-1]
+
+
+if __name__ == "__main__":
+    inputs = synthetic_inputs()
+    cores = os.cpu_count() or 2
+    sizes = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    print(f"{'workers':>8} {'threads j/s':>12} {'process j/s':>12} {'identique':>10}")
+    for workers in sizes:
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            threaded, expected = throughput(
+                lambda: threads.submit(clean_indicators, "SYN", 0.05, 14, 0.02, None, inputs), JOBS)
+
+        pool = ComputePool("bench", workers, JOBS)
+        throughput(lambda: pool.submit("SYN", 0.05, 14, 0.02, inputs), workers)  # démarrage des process hors mesure
+        processed, result = throughput(lambda: pool.submit("SYN", 0.05, 14, 0.02, inputs), JOBS)
+        pool.shutdown()
+
+        print(f"{workers:>8} {threaded:>12.1f} {processed:>12.1f} {str(result == expected):>10}")
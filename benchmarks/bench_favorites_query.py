@@ -0,0 +1,94 @@
+# benchmarks/bench_favorites_query.py  python -m benchmarks.bench_favorites_query [USERS] [FAVORITES]
+"""
+Ancien schéma (40 métriques recopiées sur chaque ligne stocks) contre ticker_metrics
+(une ligne par ticker et par date, jointe en LATERAL) sur des tables temporaires :
+taille sur disque, lecture de la liste de favoris d'un utilisateur, rafraîchissement d'un ticker.
+Utilise la base configurée par DB_* (app/db.py) ; rien n'est écrit hors des tables temporaires.
+"""
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.src.services.ticker_metrics import METRIC_COLUMNS, FAVORITES_SQL
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+FAVORITES = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+TICKERS = 500
+DAYS = 30
+READS = 500
+
+TEXT_COLUMNS = {"full_name", "sector", "industry", "type", "market", "benchmark",
+                "duration_dividend", "duration_fin_cash_flow", "duration_earnings"}
+METRICS_DDL = ", ".join(f"{c} {'varchar(255)' if c in TEXT_COLUMNS else 'numeric'}" for c in METRIC_COLUMNS)
+METRICS_VALUES = ", ".join("md5(t)" if c in TEXT_COLUMNS else "random() * 100" for c in METRIC_COLUMNS)
+
+SETUP = [
+    # ancien schéma
+    f"CREATE TEMP TABLE wide_stocks (id serial PRIMARY KEY, user_id int NOT NULL, ticker varchar(32) NOT NULL, "
+    f"favorite boolean NOT NULL, {METRICS_DDL})",
+    # nouveau schéma
+    "CREATE TEMP TABLE stocks (id serial PRIMARY KEY, user_id int NOT NULL, ticker varchar(32) NOT NULL, "
+    "favorite boolean NOT NULL)",
+    f"CREATE TEMP TABLE ticker_metrics (ticker varchar(32) NOT NULL, as_of date NOT NULL, {METRICS_DDL}, "
+    "updated_at timestamp NOT NULL DEFAULT now(), PRIMARY KEY (ticker, as_of))",
+    # favoris : FAVORITES tickers tirés parmi TICKERS pour chaque utilisateur
+    "CREATE TEMP TABLE picks AS SELECT u AS user_id, 'T' || (floor(random() * :tickers))::int AS t "
+    "FROM generate_series(1, :users) u, generate_series(1, :favorites)",
+    f"INSERT INTO wide_stocks (user_id, ticker, favorite, {', '.join(METRIC_COLUMNS)}) "
+    f"SELECT user_id, t, true, {METRICS_VALUES} FROM picks",
+    "INSERT INTO stocks (user_id, ticker, favorite) SELECT user_id, t, true FROM picks",
+    f"INSERT INTO ticker_metrics (ticker, as_of, {', '.join(METRIC_COLUMNS)}) "
+    f"SELECT t, current_date - d, {METRICS_VALUES} "
+    "FROM (SELECT 'T' || i AS t FROM generate_series(0, :tickers - 1) i) x, generate_series(0, :days - 1) d",
+    "CREATE INDEX ON wide_stocks (user_id, favorite)",
+    "CREATE INDEX ON stocks (user_id, favorite)",
+    "ANALYZE wide_stocks", "ANALYZE stocks", "ANALYZE ticker_metrics",
+]
+
+WIDE_READ = "SELECT ticker, full_name, price, performance FROM wide_stocks WHERE favorite = true AND user_id = :uid"
+
+
+def timed_reads(conn, sql: str) -> list:
+    samples = []
+    for uid in random.sample(range(1, USERS + 1), min(READS, USERS)):
+        t0 = time.perf_counter()
+        conn.execute(text(sql), {"uid": uid}).all()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def size_mb(conn, *tables) -> float:
+    return sum(conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": t}).scalar() for t in tables) / 2**20
+
+
+def refresh_ms(conn, sql: str) -> float:
+    t0 = time.perf_counter()
+    conn.execute(text(sql))
+    return (time.perf_counter() - t0) * 1000
+
+
+if __name__ == "__main__":
+    params = {"users": USERS, "favorites": FAVORITES, "tickers": TICKERS, "days": DAYS}
+    with engine.connect() as conn:
+        for statement in SETUP:
+            conn.execute(text(statement), params)
+
+        wide = timed_reads(conn, WIDE_READ)
+        normalized = timed_reads(conn, FAVORITES_SQL)
+        # rafraîchir T0 : toutes les lignes des utilisateurs qui le suivent contre une ligne
+        wide_refresh = refresh_ms(conn, "UPDATE wide_stocks SET price = price + 1, rsi = random() WHERE ticker = 'T0'")
+        new_refresh = refresh_ms(conn, "UPDATE ticker_metrics SET price = price + 1, rsi = random() "
+                                       "WHERE ticker = 'T0' AND as_of = current_date")
+
+        print(f"{USERS} utilisateurs x {FAVORITES} favoris, {TICKERS} tickers, {DAYS} jours d'historique")
+        print(f"{'schéma':<16} {'taille MB':>10} {'lecture p50':>12} {'p99 ms':>8} {'refresh ms':>11}")
+        for label, samples, size, refresh in (
+                ("stocks large", wide, size_mb(conn, "wide_stocks"), wide_refresh),
+                ("ticker_metrics", normalized, size_mb(conn, "stocks", "ticker_metrics"), new_refresh)):
+            q = statistics.quantiles(samples, n=100)
+            print(f"{label:<16} {size:>10.1f} {q[49]:>12.2f} {q[98]:>8.2f} {refresh:>11.1f}")
+        conn.rollback()
@@ -0,0 +1,94 @@
+# benchmarks/bench_json_responses.py  python -m benchmarks.bench_json_responses [REPEAT]
+"""
+Sérialisation d'une réponse d'indicateurs et d'un batch NDJSON, ancien chemin contre orjson :
+- ancien : convert_numpy_types, seconde passe NaN/Inf, TickerResponse validé puis re-validé
+  comme response_model, jsonable_encoder et json.dumps (JSONResponse)
+- nouveau : clean en une passe puis FastJSONResponse / ndjson_line (orjson, NumPy natif)
+Débit en Mo/s d'octets produits, sur des valeurs NumPy synthétiques (sans réseau).
+"""
+import json
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.src.services.compute import convert_numpy_types
+from app.src.services.indicators import _native
+from app.src.services.metric_graph import METRICS
+from app.src.services.responses import FastJSONResponse, ndjson_line
+from app.src.services.schemas import TickerResponse
+
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+BATCH_SIZES = [10, 100, 500]
+
+
+def raw_indicators(seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    values = {}
+    for i, name in enumerate(METRICS):
+        if i % 9 == 0:
+            values[name] = f"text-{seed}-{i}"
+        elif i % 7 == 0:
+            values[name] = np.int64(rng.integers(0, 10**9))
+        elif i % 13 == 0:
+            values[name] = np.float64(np.nan if i % 2 else np.inf)
+        else:
+            values[name] = np.float64(rng.normal())
+    return values
+
+
+def legacy_clean(raw: dict) -> dict:
+    data = convert_numpy_types(raw)
+    for key, value in data.items():
+        if isinstance(value, float):
+            if np.isnan(value):
+                data[key] = None
+            elif np.isinf(value):
+                data[key] = "Infinity" if value > 0 else "-Infinity"
+    return data
+
+
+def legacy_single(raw: dict) -> bytes:
+    model = TickerResponse(ticker="AAPL", timestamp=datetime.now().isoformat(), as_of=None,
+                           cached=True, data=legacy_clean(raw))
+    validated = TickerResponse.model_validate(model.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_single(raw: dict) -> bytes:
+    data = {k: _native(v) for k, v in raw.items()}
+    return FastJSONResponse({"ticker": "AAPL", "timestamp": datetime.now().isoformat(), "as_of": None,
+                             "cached": True, "data": data}).body
+
+
+def legacy_batch(items: list) -> bytes:
+    return "".join(json.dumps({"ticker": f"T{i}", "status": 200, "data": legacy_clean(raw)},
+                              default=str, ensure_ascii=False) + "\n" for i, raw in enumerate(items)).encode()
+
+
+def fast_batch(items: list) -> bytes:
+    return b"".join(ndjson_line({"ticker": f"T{i}", "status": 200, "data": {k: _native(v) for k, v in raw.items()}})
+                    for i, raw in enumerate(items))
+
+
+def throughput(fn, payload, repeat: int) -> tuple[float, int]:
+    size = len(fn(payload))
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    elapsed = time.perf_counter() - t0
+    return size * repeat / elapsed / 2**20, size
+
+
+if __name__ == "__main__":
+    print(f"{'charge':<14} {'octets':>9} {'ancien Mo/s':>12} {'orjson Mo/s':>12} {'gain':>6}")
+    rows = [("1 ticker", legacy_single, fast_single, raw_indicators(0), REPEAT)]
+    rows += [(f"batch {n}", legacy_batch, fast_batch, [raw_indicators(i) for i in range(n)], max(1, REPEAT // n))
+             for n in BATCH_SIZES]
+    for label, legacy, fast, payload, repeat in rows:
+        old_mbs, _ = throughput(legacy, payload, repeat)
+        new_mbs, size = throughput(fast, payload, repeat)
+        print(f"{label:<14} {size:>9} {old_mbs:>12.1f} {new_mbs:>12.1f} {new_mbs / old_mbs:>5.1f}x")
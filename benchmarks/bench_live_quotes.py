@@ -0,0 +1,79 @@
+# benchmarks/bench_live_quotes.py  python -m benchmarks.bench_live_quotes [WS_URL] [DURATION]
+"""
+Coût de /ws/quotes selon le nombre de connexions abonnées aux mêmes tickers :
+ticks reçus, latence de diffusion (ts serveur -> réception) et appels Yahoo.
+Les appels amont ne doivent pas dépendre du nombre de connexions.
+Serveur à lancer au préalable (LIVE_QUOTE_INTERVAL=1 pour des mesures plus courtes) :
+    uvicorn app.main:app --workers 1
+BENCH_TOKEN (access token) permet de lire les compteurs de /admin/executors.
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+import websockets
+
+WS_URL = sys.argv[1] if len(sys.argv) > 1 else "ws://localhost:8000/ws/quotes"
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+TOKEN = os.getenv("BENCH_TOKEN")
+CONNECTIONS = [1, 10, 100, 1000]
+TICKERS = ["AAPL", "MSFT", "NVDA", "BTC-USD", "ETH-USD", "EURUSD=X"]
+
+
+async def viewer(ready: asyncio.Event, stop: asyncio.Event, lags: list, seqs: dict):
+    async with websockets.connect(WS_URL, max_queue=None) as ws:
+        await ws.send(json.dumps({"subscribe": TICKERS}))
+        ready.set()
+        while not stop.is_set():
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            received = time.time()
+            for quote in json.loads(raw):
+                if isinstance(quote, dict) and "ts" in quote:
+                    lags.append((received - quote["ts"]) * 1000)
+                    seqs[quote["ticker"]] = max(seqs.get(quote["ticker"], 0), quote["seq"])
+
+
+async def upstream_polls() -> int | None:
+    if not TOKEN:
+        return None
+    base = WS_URL.replace("ws://", "http://").replace("wss://", "https://").rsplit("/ws/", 1)[0]
+    async with httpx.AsyncClient(base_url=base, headers={"Authorization": f"Bearer {TOKEN}"}) as client:
+        return (await client.get("/admin/executors")).json()["live_quotes"]["polls"]
+
+
+async def run(n: int):
+    stop = asyncio.Event()
+    lags: list = []
+    seqs: dict = {}
+    readies = [asyncio.Event() for _ in range(n)]
+    t0 = time.perf_counter()
+    viewers = [asyncio.create_task(viewer(r, stop, lags, seqs)) for r in readies]
+    await asyncio.gather(*(r.wait() for r in readies))
+    connect_s = time.perf_counter() - t0
+
+    polls_before = await upstream_polls()
+    await asyncio.sleep(DURATION)
+    polls_after = await upstream_polls()
+    stop.set()
+    await asyncio.gather(*viewers, return_exceptions=True)
+
+    polls = polls_after - polls_before if polls_before is not None else "?"
+    q = statistics.quantiles(lags, n=100) if len(lags) > 1 else [float("nan")] * 99
+    print(f"{n:>6} {connect_s:>10.2f} {len(lags):>10} {q[49]:>9.1f} {q[98]:>9.1f} {polls!s:>8} {max(seqs.values(), default=0):>6}")
+
+
+async def main():
+    print(f"{'conn':>6} {'connect s':>10} {'ticks':>10} {'p50 ms':>9} {'p99 ms':>9} {'polls':>8} {'seq':>6}")
+    for n in CONNECTIONS:
+        await run(n)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
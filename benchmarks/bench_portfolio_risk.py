@@ -0,0 +1,61 @@
+# benchmarks/bench_portfolio_risk.py  python -m benchmarks.bench_portfolio_risk
+"""
+Risque de portefeuille de 10 à 1 000 positions sur des clôtures synthétiques (sans réseau) :
+- reconstruction de la covariance EWMA depuis tout l'historique (ce qu'on évite à chaque requête)
+- mise à jour incrémentale d'une séance (EwmaCovariance.update)
+- VaR / CVaR / contributions sur la matrice en cache (portfolio_risk)
+Vérifie que reconstruction et mise à jour incrémentale donnent la même matrice.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.src.services.covariance import EwmaCovariance
+from app.src.services.risk import ewma_covariance, portfolio_risk, simple_returns
+
+SIZES = [10, 100, 500, 1000]
+DAYS = 500
+REPEAT = 5
+
+
+def synthetic_closes(n_tickers: int, n_days: int = DAYS + 1, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # séances terminées seulement : EwmaCovariance ignore la barre du jour
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=n_days)
+    factor = rng.normal(0, 0.01, (n_days, 1)) * rng.uniform(0.5, 1.5, n_tickers)
+    shocks = factor + rng.normal(0, 0.015, (n_days, n_tickers))
+    return pd.DataFrame(50 * np.exp(np.cumsum(shocks, axis=0)), index=dates,
+                        columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+
+def best_ms(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+if __name__ == "__main__":
+    print(f"{'n':>5} {'reconstruction ms':>18} {'+1 séance ms':>13} {'risque ms':>10} {'écart rel.':>11}")
+    for n in SIZES:
+        close = synthetic_closes(n)
+        weights = np.full(n, 1 / n)
+
+        rebuild_ms = best_ms(lambda: ewma_covariance(simple_returns(close)))
+
+        state = EwmaCovariance(list(close.columns))
+        state.build(close.iloc[:-1])
+        snapshot = (state.cov.copy(), state.last_close.copy(), state.last_date)
+
+        def one_bar():
+            state.cov, state.last_close, state.last_date = snapshot[0].copy(), snapshot[1].copy(), snapshot[2]
+            state.update(close.iloc[-1:])
+        update_ms = best_ms(one_bar)
+        risk_ms = best_ms(lambda: portfolio_risk(weights, state.cov))
+
+        full = ewma_covariance(simple_returns(close))
+        gap = np.abs(state.cov - full).max() / np.abs(full).max()
+        print(f"{n:>5} {rebuild_ms:>18.1f} {update_ms:>13.2f} {risk_ms:>10.2f} {gap:>11.2e}")
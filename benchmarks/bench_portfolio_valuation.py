@@ -0,0 +1,55 @@
+# benchmarks/bench_portfolio_valuation.py  python -m benchmarks.bench_portfolio_valuation
+"""
+Coût de la valorisation du portefeuille selon le nombre de positions (cotations fictives,
+sans réseau ni base) : value_positions vectorisée contre une boucle Python ligne à ligne,
+et mise à jour incrémentale d'une position (apply_wallet_row) contre un rechargement complet.
+"""
+import random
+import statistics
+import time
+
+from app.src.services.portfolio import _positions_cache, apply_wallet_row, value_positions
+
+SIZES = [10, 100, 1000, 10_000]
+REPEAT = 50
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy", "Industrials", "Unknown"]
+
+
+def fake(n: int) -> tuple[dict, dict]:
+    positions, quotes = {}, {}
+    for i in range(n):
+        quantity = random.uniform(1, 100)
+        price_at_buy = random.uniform(10, 500)
+        positions[f"T{i}"] = {"quantity": quantity, "cost": quantity * price_at_buy, "priced_quantity": quantity,
+                              "full_name": f"T{i}", "sector": random.choice(SECTORS)}
+        quotes[f"T{i}"] = {"price": price_at_buy * random.uniform(0.8, 1.2), "eve_price": price_at_buy}
+    return positions, quotes
+
+
+def row_by_row(positions: dict, quotes: dict) -> dict:
+    """Référence : une position à la fois"""
+    total, sectors = 0.0, {}
+    for ticker, p in positions.items():
+        worth = p["quantity"] * quotes[ticker]["price"]
+        total += worth
+        sectors[p["sector"]] = sectors.get(p["sector"], 0.0) + worth
+    return {"total": total, "sectors": {s: w / total for s, w in sectors.items()}}
+
+
+def median_ms(fn, *args) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    print(f"{'positions':>9} {'vectorisé ms':>13} {'ligne à ligne ms':>17} {'incrément ms':>13}")
+    for n in SIZES:
+        positions, quotes = fake(n)
+        _positions_cache.set(0, positions)
+        row = {"ticker": "T0", "quantity": 1.0, "price_at_buy": 100.0}
+        print(f"{n:>9} {median_ms(value_positions, positions, quotes):>13.3f} "
+              f"{median_ms(row_by_row, positions, quotes):>17.3f} {median_ms(apply_wallet_row, 0, row):>13.3f}")
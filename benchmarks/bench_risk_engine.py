@@ -0,0 +1,124 @@
+# benchmarks/bench_risk_engine.py  python -m benchmarks.bench_risk_engine
+"""
+Moteur de risque : une passe sur (dates x N tickers) contre N appels au calcul mono-ticker
+d'origine (pandas + np.linalg.lstsq, tel que ticker_indicators le faisait avant le moteur),
+sur des clôtures synthétiques d'un an avec des séances manquantes.
+Rapporte l'écart absolu maximal par métrique entre les deux chemins et échoue au-delà de TOLERANCE.
+La référence aligne ticker et benchmark par date (l'ancien code les alignait par position de ligne).
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.src.services.risk import N_TRADING, risk_metrics
+
+SIZES = [1, 10, 100, 500]
+TOLERANCE = 1e-8  # relative à max(1, |valeur|)
+P, N, RF_ANN = 0.05, 14, 0.02
+
+
+def synthetic_closes(n_tickers: int, n_days: int = 260, seed: int = 0) -> tuple[pd.DataFrame, pd.Series]:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days)
+    market = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days))), index=dates)
+    shocks = rng.normal(0, 0.015, (n_days, n_tickers)) + rng.uniform(0.5, 1.5, n_tickers) * \
+        np.log(market).diff().fillna(0).to_numpy()[:, None]
+    close = pd.DataFrame(50 * np.exp(np.cumsum(shocks, axis=0)), index=dates,
+                         columns=[f"T{i:03d}" for i in range(n_tickers)])
+    # quelques séances manquantes pour exercer l'alignement
+    close.iloc[rng.integers(1, n_days, n_tickers), np.arange(n_tickers)] = np.nan
+    return close, market
+
+
+def baseline_metrics(close: pd.Series, market_close: pd.Series,
+                     p: float = P, n: int = N, rf_ann: float = RF_ANN) -> dict:
+    """Formules mono-ticker d'origine (pandas / lstsq), sur les séances propres du ticker"""
+    close = close.dropna()
+    ticker_return = close.pct_change()
+    market_return = market_close.pct_change()
+    common = ticker_return.dropna().index.intersection(market_return.dropna().index)
+    ticker_series = ticker_return.loc[common]
+    market_series = market_return.loc[common]
+
+    px_1y = close.iloc[-N_TRADING:]
+    drawdown = (px_1y / px_1y.cummax() - 1.0).min() * 100
+
+    returns = ticker_return.dropna()
+    q = np.percentile(returns, 100 * p)
+    var95 = q * 100
+    cvar95 = returns[returns <= q].mean() * 100
+
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0.0).ewm(alpha=1 / n, adjust=False).mean()
+    avg_loss = (-delta.clip(upper=0.0)).ewm(alpha=1 / n, adjust=False).mean()
+    rsi = (100 - (100 / (1 + avg_gain / avg_loss.replace(0, np.nan)))).iloc[-1]
+
+    x = np.vstack([np.ones(len(market_series)), market_series.values]).T
+    y = ticker_series.values
+    coef = np.linalg.lstsq(x, y, rcond=None)[0]
+    daily_alpha, beta = coef[0], coef[1]
+    r2 = 1 - ((y - x @ coef) ** 2).sum() / ((y - y.mean()) ** 2).sum()
+
+    te = (ticker_series - market_series).std() * np.sqrt(N_TRADING) * 100
+    er_ann = (1 + ticker_series.mean()) ** N_TRADING - 1
+    market_annual = (1 + market_series.mean()) ** N_TRADING - 1
+    rf_daily = (1 + rf_ann) ** (1 / N_TRADING) - 1
+    excess = market_series - rf_daily
+    semidev = np.sqrt((excess.clip(upper=0) ** 2).mean())
+    log_return = np.log1p(returns)
+    volatility_daily = log_return.std(ddof=1)
+
+    return {
+        "ticker total return": close.iloc[-1] / close.iloc[0] - 1,
+        "market return": market_close.iloc[-1] / market_close.iloc[0] - 1,
+        "annual volatility": volatility_daily * np.sqrt(N_TRADING),
+        "daily volatility": volatility_daily,
+        "drawdown": drawdown,
+        "var95": var95,
+        "cvar95": cvar95,
+        "rsi": rsi,
+        "daily alpha": daily_alpha,
+        "ticker beta 1year": beta,
+        "R²": r2,
+        "alpha 1year percent": ((1 + daily_alpha) ** N_TRADING - 1) * 100,
+        "tracking error": te,
+        "information ratio": (er_ann - market_annual) / (te / 100) if te != 0 else np.nan,
+        "treynor": (er_ann - rf_ann) / beta if beta != 0 else np.nan,
+        "sharpe ratio": excess.mean() / excess.std() * np.sqrt(N_TRADING),
+        "sortino": excess.mean() * np.sqrt(N_TRADING) / semidev if semidev != 0 else np.nan,
+        "expected return": rf_ann + beta * (market_annual - rf_ann),
+    }
+
+
+def metric_gaps(reference: pd.DataFrame, engine: pd.DataFrame) -> pd.Series:
+    """Écart absolu maximal par métrique, rapporté à max(1, |référence|)"""
+    ref = reference[engine.columns].to_numpy(dtype=float)
+    got = engine.to_numpy(dtype=float)
+    both_nan = np.isnan(ref) & np.isnan(got)
+    gap = np.where(both_nan, 0.0, np.abs(ref - got) / np.maximum(1.0, np.abs(ref)))
+    return pd.Series(np.nan_to_num(gap, nan=np.inf).max(axis=0), index=engine.columns)
+
+
+if __name__ == "__main__":
+    worst = pd.Series(dtype=float)
+    print(f"{'n':>5} {'référence ms':>13} {'moteur ms':>10} {'écart max':>10}")
+    for n in SIZES:
+        close, market = synthetic_closes(n)
+
+        t0 = time.perf_counter()
+        reference = pd.DataFrame({c: baseline_metrics(close[c], market) for c in close.columns}).T
+        reference_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        engine = risk_metrics(close, market, P, N, RF_ANN)
+        engine_ms = (time.perf_counter() - t0) * 1000
+
+        gaps = metric_gaps(reference, engine)
+        worst = gaps if worst.empty else np.maximum(worst, gaps)
+        print(f"{n:>5} {reference_ms:>13.1f} {engine_ms:>10.1f} {gaps.max():>10.2e}")
+
+    print(f"\n{'métrique':<22} {'écart max':>10}")
+    for metric, gap in worst.items():
+        print(f"{metric:<22} {gap:>10.2e}{'  ❌' if gap > TOLERANCE else ''}")
+    assert (worst <= TOLERANCE).all(), f"écarts au-delà de {TOLERANCE}: {list(worst[worst > TOLERANCE].index)}"
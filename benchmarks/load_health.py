@@ -0,0 +1,59 @@
+# benchmarks/load_health.py  python -m benchmarks.load_health [BASE_URL] [CONCURRENCY]
+"""
+Latence de /health pendant que des requêtes /ticker/{t}/metric/rsi sont en vol.
+Si le calcul des indicateurs bloquait la boucle d'événements, le p99 de /health
+exploserait pendant la phase de charge. Serveur à lancer au préalable :
+    uvicorn app.main:app --workers 1
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+TICKERS = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "MC.PA", "AIR.PA", "SAP.DE"]
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> list:
+    samples = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/health")
+        samples.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.02)
+    return samples
+
+
+async def hammer(client: httpx.AsyncClient, i: int):
+    ticker = TICKERS[i % len(TICKERS)]
+    try:
+        await client.get(f"/ticker/{ticker}/metric/rsi", timeout=120)
+    except httpx.HTTPError:
+        pass
+
+
+def summary(label: str, samples: list):
+    q = statistics.quantiles(samples, n=100)
+    print(f"{label:<12} n={len(samples):>5}  p50={q[49]:7.2f} ms  p99={q[98]:7.2f} ms  max={max(samples):7.2f} ms")
+
+
+async def main():
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=30) as client:
+        stop = asyncio.Event()
+        idle = asyncio.create_task(probe_health(client, stop))
+        await asyncio.sleep(3)
+        stop.set()
+        summary("au repos", await idle)
+
+        stop = asyncio.Event()
+        loaded = asyncio.create_task(probe_health(client, stop))
+        await asyncio.gather(*(hammer(client, i) for i in range(CONCURRENCY)))
+        stop.set()
+        summary("en charge", await loaded)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
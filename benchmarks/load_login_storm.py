@@ -0,0 +1,77 @@
+# benchmarks/load_login_storm.py  python -m benchmarks.load_login_storm [BASE_URL] [LOGINS] [DURATION]
+"""
+Rafale de logins (bcrypt) et latence des autres routes pendant ce temps :
+logins/s et p99 du login, p99 de /api/me/wallet, /api/me/balance et /health
+au repos puis pendant la rafale. Le hachage tourne dans le pool "hash" (HASH_WORKERS,
+HASH_PROCESSES, BCRYPT_ROUNDS) : les autres routes ne doivent pas se dégrader.
+Serveur à lancer au préalable :
+    uvicorn app.main:app --workers 1
+BENCH_EMAIL / BENCH_PASSWORD : compte existant utilisé pour les logins.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+LOGINS = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+DURATION = float(sys.argv[3]) if len(sys.argv) > 3 else 15
+CREDENTIALS = {"email": os.environ.get("BENCH_EMAIL", ""), "password": os.environ.get("BENCH_PASSWORD", "")}
+PROBES = ["/api/me/wallet", "/api/me/balance", "/health"]
+
+
+async def timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> float | None:
+    t0 = time.perf_counter()
+    try:
+        r = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        return None
+    return (time.perf_counter() - t0) * 1000 if r.status_code < 500 else None
+
+
+async def loop(client: httpx.AsyncClient, method: str, url: str, stop: asyncio.Event, samples: list,
+               pause: float = 0.0, **kwargs):
+    while not stop.is_set():
+        ms = await timed(client, method, url, **kwargs)
+        if ms is not None:
+            samples.append(ms)
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def phase(client: httpx.AsyncClient, logins: int) -> tuple[list, dict]:
+    stop = asyncio.Event()
+    login_samples, probe_samples = [], {url: [] for url in PROBES}
+    tasks = [asyncio.create_task(loop(client, "POST", "/auth/login", stop, login_samples, json=CREDENTIALS))
+             for _ in range(logins)]
+    tasks += [asyncio.create_task(loop(client, "GET", url, stop, probe_samples[url], pause=0.02))
+              for url in PROBES]
+    await asyncio.sleep(DURATION)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return login_samples, probe_samples
+
+
+def p99(samples: list) -> str:
+    return f"{statistics.quantiles(samples, n=100)[98]:8.1f}" if len(samples) > 1 else f"{'-':>8}"
+
+
+async def main():
+    limits = httpx.Limits(max_connections=LOGINS + len(PROBES) + 1)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=120, limits=limits) as client:
+        r = await client.post("/auth/login", json=CREDENTIALS)
+        r.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+
+        print(f"{'phase':<10} {'logins/s':>9} {'login p99':>10} " + " ".join(f"{u + ' p99':>22}" for u in PROBES))
+        for label, logins in (("repos", 0), ("rafale", LOGINS)):
+            login_samples, probe_samples = await phase(client, logins)
+            print(f"{label:<10} {len(login_samples) / DURATION:>9.1f} {p99(login_samples):>10} "
+                  + " ".join(f"{p99(probe_samples[u]):>22}" for u in PROBES))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+# benchmarks/load_me_routes.py  python -m benchmarks.load_me_routes [BASE_URL] [DURATION]
+"""
+Capacité d'un worker sur les routes /api/me/* à concurrence croissante :
+requêtes/s, p50 et p99 de GET /api/me/balance et GET /api/me/wallet.
+Avec la session synchrone, chaque requête en vol occupe un thread du threadpool
+(40 par défaut) : le débit plafonne et la latence monte au-delà ; avec la session
+asynchrone, la limite devient DB_POOL_SIZE + DB_MAX_OVERFLOW connexions.
+Lancer une fois sur le commit précédent et une fois sur celui-ci pour comparer :
+    uvicorn app.main:app --workers 1
+BENCH_TOKEN (access token) ou BENCH_EMAIL / BENCH_PASSWORD pour s'authentifier.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+CONCURRENCY = [1, 10, 50, 100, 200]
+ROUTES = ["/api/me/balance", "/api/me/wallet"]
+
+
+async def token(client: httpx.AsyncClient) -> str:
+    if os.getenv("BENCH_TOKEN"):
+        return os.environ["BENCH_TOKEN"]
+    r = await client.post("/auth/login", json={"email": os.environ["BENCH_EMAIL"],
+                                               "password": os.environ["BENCH_PASSWORD"]})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+async def user(client: httpx.AsyncClient, i: int, stop: asyncio.Event, samples: list, errors: list):
+    route = ROUTES[i % len(ROUTES)]
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(route)
+            if r.status_code >= 500:
+                errors.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        samples.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(client: httpx.AsyncClient, concurrency: int):
+    stop, samples, errors = asyncio.Event(), [], []
+    tasks = [asyncio.create_task(user(client, i, stop, samples, errors)) for i in range(concurrency)]
+    await asyncio.sleep(DURATION)
+    stop.set()
+    await asyncio.gather(*tasks)
+    q = statistics.quantiles(samples, n=100) if len(samples) > 1 else [0.0] * 99
+    print(f"{concurrency:>11} {len(samples) / DURATION:>8.0f} {q[49]:>9.2f} {q[98]:>9.2f} {len(errors):>8}")
+
+
+async def main():
+    limits = httpx.Limits(max_connections=max(CONCURRENCY), max_keepalive_connections=max(CONCURRENCY))
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60, limits=limits) as client:
+        client.headers["Authorization"] = f"Bearer {await token(client)}"
+        print(f"{'concurrence':>11} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'erreurs':>8}")
+        for concurrency in CONCURRENCY:
+            await run(client, concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,4 +7,5 @@ export type Indice = {
   full_name: string;
   price: number;
   performance: number;
+  as_of?: string | null;
 };